@@ -38,7 +38,7 @@ __docformat__ = 'epytext en'
 ## Imports
 ######################################################################
 
-import re, os.path, pickle
+import re, os.path, pickle, weakref
 from epydoc import log
 import epydoc
 import builtins
@@ -49,7 +49,7 @@ import epydoc.markup.pyval_repr
 ######################################################################
 # Dotted Names
 ######################################################################
-class DottedName:
+class DottedName(object):
     """
     A sequence of identifiers, separated by periods, used to name a
     Python variable, value, or argument.  The identifiers that make up
@@ -60,7 +60,15 @@ class DottedName:
         epydoc.apidoc.DottedName
         >>> name[1]
         'api_doc'
+
+    C{DottedName}s are immutable, and are X{interned}: while a
+    C{DottedName} is in use, the constructor returns the same
+    C{DottedName} object for any other name with the same
+    identifiers.  Each C{DottedName} caches its hash value, its
+    string form, and its container (see L{container()}).
     """
+    __slots__ = ('_identifiers', '_hash', '_str', '_container',
+                 '__weakref__')
     UNREACHABLE = "??"
     _IDENTIFIER_RE = re.compile("""(?x)
         (%s |             # UNREACHABLE marker, or..
@@ -81,8 +89,19 @@ class DottedName:
     _ok_identifiers = set()
     """A cache of identifier strings that have been checked against
     _IDENTIFIER_RE and found to be acceptable."""
-    
-    def __init__(self, *pieces, **options):
+
+    _interned = weakref.WeakValueDictionary()
+    """A dictionary mapping each identifier tuple to the unique
+    C{DottedName} with those identifiers.  Its entries are removed
+    when their C{DottedName}s are no longer used."""
+
+    _interned_strings = weakref.WeakValueDictionary()
+    """A dictionary mapping strings that have been used to construct
+    a C{DottedName} (on their own) to the resulting C{DottedName}.
+    Its entries are removed when their C{DottedName}s are no longer
+    used."""
+
+    def __new__(cls, *pieces, **options):
         """
         Construct a new dotted name from the given sequence of pieces,
         each of which can be either a C{string} or a C{DottedName}.
@@ -101,31 +120,64 @@ class DottedName:
         @kwparam strict: if true, then raise an L{InvalidDottedName}
         if the given name is invalid.
         """
-        if len(pieces) == 1 and isinstance(pieces[0], tuple):
-            self._identifiers = pieces[0] # Optimization
-            return
+        if len(pieces) == 1:
+            piece = pieces[0]
+            if isinstance(piece, DottedName):
+                return piece
+            elif isinstance(piece, tuple):
+                return cls._intern(piece) # Optimization
+            elif isinstance(piece, str):
+                name = cls._interned_strings.get(piece)
+                if name is not None:
+                    return name
         if len(pieces) == 0:
             raise DottedName.InvalidDottedName('Empty DottedName')
-        self._identifiers = []
+        identifiers = []
         for piece in pieces:
             if isinstance(piece, DottedName):
-                self._identifiers += piece._identifiers
+                identifiers += piece._identifiers
             elif isinstance(piece, str):
-                for subpiece in piece.split('.'):
-                    if piece not in self._ok_identifiers:
-                        if not self._IDENTIFIER_RE.match(subpiece):
+                subpieces = piece.split('.')
+                if piece not in cls._ok_identifiers:
+                    for subpiece in subpieces:
+                        if not cls._IDENTIFIER_RE.match(subpiece):
                             if options.get('strict'):
                                 raise DottedName.InvalidDottedName(
                                     'Bad identifier %r' % (piece,))
                             else:
                                 log.warning("Identifier %r looks suspicious; "
                                             "using it anyway." % piece)
-                        self._ok_identifiers.add(piece)
-                    self._identifiers.append(subpiece)
+                                break
+                    cls._ok_identifiers.add(piece)
+                identifiers += subpieces
             else:
                 raise TypeError('Bad identifier %r: expected '
                                 'DottedName or str' % (piece,))
-        self._identifiers = tuple(self._identifiers)
+        name = cls._intern(tuple(identifiers))
+        if len(pieces) == 1:
+            cls._interned_strings[pieces[0]] = name
+        return name
+
+    @classmethod
+    def _intern(cls, identifiers):
+        """
+        Return the unique C{DottedName} whose identifiers are given
+        by the tuple C{identifiers}, creating it if necessary.  The
+        identifiers are I{not} checked to see if they are valid.
+        """
+        name = cls._interned.get(identifiers)
+        if name is None:
+            name = object.__new__(cls)
+            name._identifiers = identifiers
+            name._hash = hash(identifiers)
+            name._str = None
+            name._container = None
+            cls._interned[identifiers] = name
+        return name
+
+    def __reduce__(self):
+        # Unpickled names are interned, and their hash is recomputed.
+        return (DottedName, (self._identifiers,))
 
     def __repr__(self):
         idents = [repr(ident) for ident in self._identifiers]
@@ -139,7 +191,9 @@ class DottedName:
             >>> print(DottedName('epydoc', 'api_doc', 'DottedName'))
             epydoc.apidoc.DottedName
         """
-        return '.'.join(self._identifiers)
+        if self._str is None:
+            self._str = '.'.join(self._identifiers)
+        return self._str
 
     def __add__(self, other):
         """
@@ -170,15 +224,17 @@ class DottedName:
         """
         if isinstance(i, slice):
             pieces = self._identifiers[i.start:i.stop]
-            if pieces:
-                return DottedName(pieces)
-            else:
+            if not pieces:
                 return []
+            elif len(pieces) == len(self._identifiers)-1 and not i.start:
+                return self.container()
+            else:
+                return DottedName._intern(pieces)
         else:
             return self._identifiers[i]
 
     def __hash__(self):
-        return hash(self._identifiers)
+        return self._hash
 
     def __cmp__(self, other):
         """
@@ -205,12 +261,16 @@ class DottedName:
         return r <= 0
 
     def __eq__(self, other):
+        if self is other:
+            return True
         r = self.__cmp__(other)
         if not isinstance(r, int):
             return r
         return r == 0
 
     def __ne__(self, other):
+        if self is other:
+            return False
         r = self.__cmp__(other)
         if not isinstance(r, int):
             return r
@@ -243,8 +303,9 @@ class DottedName:
         """
         if len(self._identifiers) == 1:
             return None
-        else:
-            return DottedName(*self._identifiers[:-1])
+        if self._container is None:
+            self._container = DottedName._intern(self._identifiers[:-1])
+        return self._container
 
     def dominates(self, name, strict=False):
         """
@@ -345,6 +406,27 @@ UNKNOWN = _Sentinel('UNKNOWN')
 information about an object is unknown.  This is used as the
 default value for all instance variables."""
 
+_NOT_FOUND = _Sentinel('NOT_FOUND')
+"""A special value used by L{DocIndex._find()} to indicate that a
+name could not be found."""
+
+_AMBIGUOUS = _Sentinel('AMBIGUOUS')
+"""A special value used by L{DocIndex._find()} to indicate that a
+name is an ambiguous module-level class name."""
+
+_RELEASED_ATTRIBS = [
+    'docstring', 'descr', 'summary', 'other_docs', 'metadata',
+    'extra_docstring_fields', 'type_descr', 'arg_descrs', 'arg_types',
+    'return_descr', 'return_type', 'exception_descrs', 'pyval',
+    'parse_repr', 'toktree', '_deferred_parse', '_ValueDoc__pyval_repr',
+    '_ValueDoc__summary_pyval_repr', '_ValueDoc__pickle_state']
+"""The attributes that are discarded by L{APIDoc.release()}."""
+
+_COMPACTED_ATTRIBS = ['decorators']
+"""The list-valued attributes that are not discarded by
+L{APIDoc.release()}, but are replaced by the empty tuple when they are
+empty."""
+
 
 ######################################################################
 # API Documentation Objects: Abstract Base Classes
@@ -449,7 +531,12 @@ class APIDoc(object):
                 if key[0] != '_' and not hasattr(self.__class__, key):
                     raise TypeError('%s got unexpected arg %r' %
                                     (self.__class__.__name__, key))
-        self.__dict__.update(kwargs)
+        # Add the attributes one at a time, rather than using
+        # __dict__.update(), so that the instance dictionary can keep
+        # sharing its keys with other instances of the class.
+        instance_dict = self.__dict__
+        for key, val in kwargs.items():
+            instance_dict[key] = val
 
     def _debug_setattr(self, attr, val):
         """
@@ -469,7 +556,7 @@ class APIDoc(object):
         if not hasattr(self, attr):
             raise AttributeError('%s does not define attribute %r' %
                             (self.__class__.__name__, attr))
-        self.__dict__[attr] = val
+        object.__setattr__(self, attr, val)
 
     if epydoc.DEBUG:
         __setattr__ = _debug_setattr
@@ -494,6 +581,7 @@ class APIDoc(object):
         
             >>> valdoc.specialize_to(RoutineDoc)
         """
+        self.parse_deferred_docstring()
         if not issubclass(cls, self.__class__):
             raise ValueError('Can not specialize to %r' % cls)
         # Update the class.
@@ -522,7 +610,11 @@ class APIDoc(object):
         try:
             name_cmp = (lhs > rhs) - (lhs < rhs)
         except TypeError:
-            name_cmp = (hash(lhs) > hash(rhs)) - (hash(lhs) < hash(rhs))
+            # Names that are not DottedNames (e.g., UNKNOWN) sort after
+            # all DottedNames, so that the order of named docs does not
+            # depend on where objects happen to be allocated.
+            name_cmp = (isinstance(rhs, DottedName) -
+                        isinstance(lhs, DottedName))
         if name_cmp == 0:
             return -1
         else:
@@ -652,6 +744,91 @@ class APIDoc(object):
         """
         return []
 
+    def defer_docstring_parse(self, parse):
+        """
+        Postpone processing this C{APIDoc}'s docstring until the
+        information that it provides is needed.  The first time that
+        any attribute whose value is extracted from docstrings (such
+        as C{descr}, C{summary}, or C{arg_descrs}) is read or
+        modified, C{parse(self)} will be called to fill it in.
+
+        Until then, the class of this C{APIDoc} (and of any
+        C{APIDoc}s that it has been merged with) is replaced by a
+        subclass whose docstring attributes are
+        L{_DocstringAttribute} descriptors (see
+        L{_deferred_docstring_class()}); so the attributes of other
+        C{APIDoc}s are not affected.
+
+        @param parse: A function that processes the docstring of the
+            C{APIDoc} that it is called with (see
+            L{docstringparser.defer_parse_docstring()
+            <epydoc.docstringparser.defer_parse_docstring>}).
+        """
+        self.__dict__['_deferred_parse'] = parse
+        for apidoc in self.__mergeset or [self]:
+            apidoc.__class__ = _deferred_docstring_class(apidoc.__class__)
+
+    def parse_deferred_docstring(self):
+        """
+        If this C{APIDoc}'s docstring was deferred (see
+        L{defer_docstring_parse()}), then process it now.
+        """
+        parse = self.__dict__.get('_deferred_parse')
+        if parse is None: return # not deferred, or being processed.
+        # Mark the docstring as being processed while parse() runs.
+        self.__dict__['_deferred_parse'] = None
+        try:
+            parse(self)
+        finally:
+            del self.__dict__['_deferred_parse']
+            self.__restore_class()
+
+    def __restore_class(self):
+        """
+        Undo the class replacement made by L{defer_docstring_parse()},
+        once this C{APIDoc}'s docstring is no longer deferred.
+        """
+        for apidoc in self.__mergeset or [self]:
+            cls = apidoc.__class__
+            apidoc.__class__ = cls.__dict__.get('_docstring_base', cls)
+
+    def release(self):
+        """
+        Discard the information about this C{APIDoc} that is only
+        needed to describe it: its docstring and the descriptions
+        extracted from it; and, for values, the Python value and its
+        representations.  These attributes are reset to their default
+        values.  Names and links to other C{APIDoc}s are kept, so a
+        released C{APIDoc} can still be linked to.  This is used to
+        free memory once an C{APIDoc}'s documentation has been
+        written.
+
+        The instance dictionary (which is shared with any C{APIDoc}s
+        that this one has been merged with) is also pruned: attributes
+        that are set to their class's default value are removed, so
+        that the class attribute is used instead; and the empty lists
+        listed in L{_COMPACTED_ATTRIBS} are replaced by the (shared)
+        empty tuple.
+        """
+        if self.__dict__.get('_deferred_parse') is not None:
+            self.__restore_class()
+        instance_dict = self.__dict__
+        for attrib in _RELEASED_ATTRIBS:
+            instance_dict.pop(attrib, None)
+        cls = self.__class__
+        for attrib, val in list(instance_dict.items()):
+            if attrib[0] == '_': continue
+            if val is getattr(cls, attrib, _NOT_FOUND):
+                del instance_dict[attrib]
+            elif (type(val) is list and not val and
+                  attrib in _COMPACTED_ATTRIBS):
+                instance_dict[attrib] = ()
+
+    def __getstate__(self):
+        # Deferred docstrings can not be pickled.
+        self.parse_deferred_docstring()
+        return self.__dict__
+
 def reachable_valdocs(root, **filters):
     """
     Return a list of all C{ValueDoc}s that can be reached, directly or
@@ -664,16 +841,16 @@ def reachable_valdocs(root, **filters):
         description.
     """
     apidoc_queue = list(root)
+    seen = set(apidoc_queue)
     val_set = set()
-    var_set = set()
     while apidoc_queue:
         api_doc = apidoc_queue.pop()
         if isinstance(api_doc, ValueDoc):
             val_set.add(api_doc)
-        else:
-            var_set.add(api_doc)
-        apidoc_queue.extend([v for v in api_doc.apidoc_links(**filters)
-                             if v not in val_set and v not in var_set])
+        for linked_doc in api_doc.apidoc_links(**filters):
+            if linked_doc not in seen:
+                seen.add(linked_doc)
+                apidoc_queue.append(linked_doc)
     return val_set
 
 ######################################################################
@@ -939,6 +1116,7 @@ class ValueDoc(APIDoc):
         # as a private attribute, so we can reuse it later, since
         # merged objects need to share a single dictionary.
         if not hasattr(self, '_ValueDoc__pickle_state'):
+            self.parse_deferred_docstring()
             # Make sure __pyval_repr & __summary_pyval_repr are cached:
             self.pyval_repr(), self.summary_pyval_repr()
             # Construct the dictionary; leave out 'pyval'.
@@ -1396,9 +1574,25 @@ class ClassDoc(NamespaceDoc):
                 return True
         return False
 
-    def mro(self, warn_about_bad_bases=False):
+    def mro(self, warn_about_bad_bases=False, cache=None):
+        """
+        Return a list of this class and its ancestors, in method
+        resolution order.
+
+        @param cache: A dictionary that is used to memoize the mros
+            of this class and its ancestors.  The same dictionary may
+            be passed to later calls, for any class, as long as the
+            class hierarchy is not modified.  (Any warnings about bad
+            bases are still reported by each call.)
+        """
         if self.is_newstyle_class():
             try:
+                if cache is not None:
+                    mro, bad_bases = self._cached_c3_mro(cache)
+                    if warn_about_bad_bases:
+                        for (cls, base) in bad_bases:
+                            cls._report_bad_base(base)
+                    return list(mro)
                 return self._c3_mro(warn_about_bad_bases)
             except ValueError as e:  # (inconsistent hierarchy)
                 log.error('Error finding mro for %s: %s' %
@@ -1434,6 +1628,40 @@ class ClassDoc(NamespaceDoc):
         w = [warn_about_bad_bases]*len(bases)
         return self._c3_merge([[self]] + [ClassDoc._c3_mro(b, w_) for b, w_ in zip(bases, w)] + [list(bases)])
 
+    def _cached_c3_mro(self, cache):
+        """
+        Return a tuple C{(mro, bad_bases)}, where C{mro} is the class
+        precedence list computed by L{_c3_mro()}, and C{bad_bases}
+        is a list of the C{(class, base)} pairs that it would report
+        as bad bases, in order.  The results for this class and its
+        ancestors are memoized in C{cache}.
+
+        @raise ValueError: If the class hierarchy is inconsistent.
+        """
+        result = cache.get(self)
+        if result is None:
+            bases = [base for base in self.bases if isinstance(base, ClassDoc)]
+            bad_bases = []
+            if len(bases) != len(self.bases):
+                for base in self.bases:
+                    if (not isinstance(base, ClassDoc) or
+                        base.proxy_for is not None):
+                        bad_bases.append( (self, base) )
+            # Mark this class as in progress, in case its bases are
+            # cyclic; and record failures, so they're not recomputed.
+            cache[self] = ValueError
+            base_mros = []
+            for base in bases:
+                base_mro, base_bad_bases = base._cached_c3_mro(cache)
+                base_mros.append(base_mro)
+                bad_bases += base_bad_bases
+            result = cache[self] = (
+                self._c3_merge([[self]] + base_mros + [list(bases)]),
+                bad_bases)
+        if result is ValueError:
+            raise ValueError("Inconsistent hierarchy")
+        return result
+
     def _report_bad_base(self, base):
         if not isinstance(base, ClassDoc):
             if not isinstance(base, GenericValueDoc):
@@ -1452,19 +1680,35 @@ class ClassDoc(NamespaceDoc):
         """
         Helper function for L{_c3_mro}.
         """
+        # Two APIDocs are equal iff they share a __dict__; so compare
+        # classes by the ids of their __dict__s.  Keep track of the
+        # position of each sequence's head, and of the number of
+        # times that each class occurs in the sequences' tails.
+        seqs = [[(id(cls.__dict__), cls) for cls in seq] for seq in seqs]
+        heads = [0]*len(seqs)
+        tails = {}
+        for seq in seqs:
+            for (key, cls) in seq[1:]:
+                tails[key] = tails.get(key, 0) + 1
         res = []
         while 1:
-          nonemptyseqs=[seq for seq in seqs if seq]
-          if not nonemptyseqs: return res
-          for seq in nonemptyseqs: # find merge candidates among seq heads
-              cand = seq[0]
-              nothead=[s for s in nonemptyseqs if cand in s[1:]]
-              if nothead: cand=None #reject candidate
-              else: break
-          if not cand: raise ValueError("Inconsistent hierarchy")
-          res.append(cand)
-          for seq in nonemptyseqs: # remove cand
-              if seq[0] == cand: del seq[0]
+          # find merge candidates among seq heads
+          cand = None
+          nonempty = False
+          for i, seq in enumerate(seqs):
+              if heads[i] == len(seq): continue
+              nonempty = True
+              if not tails.get(seq[heads[i]][0]):
+                  cand = seq[heads[i]]
+                  break
+          if not nonempty: return res
+          if cand is None: raise ValueError("Inconsistent hierarchy")
+          res.append(cand[1])
+          for i, seq in enumerate(seqs): # remove cand
+              if heads[i] < len(seq) and seq[heads[i]][0] == cand[0]:
+                  heads[i] += 1
+                  if heads[i] < len(seq):
+                      tails[seq[heads[i]][0]] -= 1
     
     def select_variables(self, group=None, value_type=None, inherited=None,
                          public=None, imported=None, detailed=None):
@@ -1765,6 +2009,84 @@ class PropertyDoc(ValueDoc):
 
         return False
 
+######################################################################
+## Docstring Attributes
+######################################################################
+
+class _DocstringAttribute(object):
+    """
+    A descriptor for an C{APIDoc} attribute whose value is extracted
+    from docstrings.  Reading or modifying the attribute of an
+    C{APIDoc} whose docstring has been deferred (see
+    L{APIDoc.defer_docstring_parse()}) processes the docstring first.
+    Otherwise, the attribute behaves like an ordinary instance
+    variable, whose default value is C{default}.
+    """
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+
+    def __get__(self, api_doc, cls=None):
+        if api_doc is None: return self.default
+        instance_dict = api_doc.__dict__
+        if '_deferred_parse' in instance_dict:
+            api_doc.parse_deferred_docstring()
+        return instance_dict.get(self.name, self.default)
+
+    def __set__(self, api_doc, val):
+        if '_deferred_parse' in api_doc.__dict__:
+            api_doc.parse_deferred_docstring()
+        api_doc.__dict__[self.name] = val
+
+_DOCSTRING_ATTRIBUTES = [
+    (APIDoc, ['descr', 'summary', 'other_docs', 'metadata',
+              'extra_docstring_fields']),
+    (VariableDoc, ['type_descr', 'is_instvar']),
+    (NamespaceDoc, ['sort_spec', 'group_specs']),
+    (RoutineDoc, ['posargs', 'posarg_defaults', 'vararg', 'kwarg',
+                  'arg_descrs', 'arg_types', 'return_descr', 'return_type',
+                  'exception_descrs']),
+    (PropertyDoc, ['type_descr']),
+    ]
+"""The attributes whose values are extracted from docstrings (or
+may be modified by docstring fields), listed by the class that
+defines them."""
+
+_deferred_docstring_classes = {}
+"""A dictionary mapping from each C{APIDoc} class to the subclass that
+is used by L{_deferred_docstring_class()}."""
+
+def _deferred_docstring_class(cls):
+    """
+    Return a subclass of C{cls} whose attributes listed in
+    L{_DOCSTRING_ATTRIBUTES} are L{_DocstringAttribute} descriptors.
+    L{APIDoc.defer_docstring_parse()} changes the class of an
+    C{APIDoc} to this subclass while its docstring is deferred, so
+    that the attributes of other C{APIDoc}s are not slowed down.  The
+    subclass has the same name as C{cls}; and its C{_docstring_base}
+    attribute is C{cls}.  If C{cls} is already such a subclass, then
+    it is returned unchanged.
+    """
+    if '_docstring_base' in cls.__dict__:
+        return cls
+    if cls not in _deferred_docstring_classes:
+        namespace = {'__module__': cls.__module__, '_docstring_base': cls,
+                     '__reduce_ex__': _reduce_deferred_ex}
+        for base, attribs in _DOCSTRING_ATTRIBUTES:
+            if issubclass(cls, base):
+                for attrib in attribs:
+                    namespace[attrib] = _DocstringAttribute(
+                        attrib, getattr(cls, attrib))
+        _deferred_docstring_classes[cls] = type(cls.__name__, (cls,),
+                                                namespace)
+    return _deferred_docstring_classes[cls]
+
+def _reduce_deferred_ex(api_doc, protocol):
+    # Deferred docstrings can not be pickled; and parsing the
+    # docstring restores the class, which can be.
+    api_doc.parse_deferred_docstring()
+    return object.__reduce_ex__(api_doc, protocol)
+
 ######################################################################
 ## Index
 ######################################################################
@@ -1879,6 +2201,40 @@ class DocIndex:
         """A cache for the L{get_vardoc()} and L{get_valdoc()} methods,
         to increase speed."""
 
+        self._reachable_cache = {}
+        """A cache for the L{reachable_valdocs()} method, mapping each
+        set of filters to the C{ValueDoc}s that are reachable using
+        those filters.  It is cleared by L{invalidate_caches()}."""
+
+        self._reachable_cache_root = None
+        """The ids of the L{root} C{ValueDoc}s that were used to fill
+        L{_reachable_cache}.  If the L{root} list is modified, then the
+        cache is cleared."""
+
+        self._find_cache = {}
+        """A cache for the L{find()} method, mapping each C{(name,
+        context)} key to the result of looking C{name} up in
+        C{context}.  It is shared by all the docstring linkers that
+        use this index, and is discarded by L{invalidate_caches()}."""
+
+        self._name_index = None
+        """An index used by L{_get()} to look up names without walking
+        down from the root set, or C{None} if it has not been built
+        yet.  See L{_build_name_index()}.  It is discarded by
+        L{invalidate_caches()}.
+        @type: C{dict} from L{DottedName} to C{(VariableDoc, ValueDoc)}"""
+
+        self._unindexed_names = None
+        """A set of names whose descendants can not be looked up using
+        L{_name_index}, because looking them up requires following a
+        variable whose value has a different canonical name.  See
+        L{_build_name_index()}."""
+
+        self._roots_by_name = None
+        """A dictionary mapping each name to the list of elements of
+        the root set that have that name, in order.  This is built by
+        L{_build_name_index()}."""
+
     #////////////////////////////////////////////////////////////
     # Lookup methods
     #////////////////////////////////////////////////////////////
@@ -1918,27 +2274,109 @@ class DocIndex:
         val = self._get_cache.get(name)
         if val is not None: return val
 
-        # Look for an element in the root set whose name is a prefix
-        # of `name`.  If we can't find one, then return None.
-        for root_valdoc in self.root:
-            if root_valdoc.canonical_name.dominates(name):
+        # Check the name index.
+        if self._name_index is None:
+            self._build_name_index()
+        val = self._name_index.get(name)
+        if val is not None:
+            for i in range(1, len(name)):
+                if name[:i] in self._unindexed_names:
+                    val = None
+                    break
+        if val is None:
+            val = self._walk_to(name)
+        self._get_cache[name] = val
+        return val
+
+    def _walk_to(self, name):
+        """
+        Look for the C{(VariableDoc, ValueDoc)} pair with the given
+        name, by walking down the variable/submodule chain from the
+        first element of the root set whose name is a prefix of
+        C{name} (and for which this succeeds).
+        """
+        if self._name_index is None:
+            self._build_name_index()
+        for i in range(1, len(name)+1):
+            for root_valdoc in self._roots_by_name.get(name[:i], ()):
                 # Starting at the root valdoc, walk down the variable/
                 # submodule chain until we find the requested item.
                 var_doc = None
                 val_doc = root_valdoc
-                for identifier in name[len(root_valdoc.canonical_name):]:
+                for identifier in name[i:]:
                     if val_doc is None: break
                     var_doc, val_doc = self._get_from(val_doc, identifier)
                 else:
                     # If we found it, then return.
                     if var_doc is not None or val_doc is not None:
-                        self._get_cache[name] = (var_doc, val_doc)
                         return var_doc, val_doc
 
         # We didn't find it.
-        self._get_cache[name] = (None, None)
         return None, None
 
+    def _build_name_index(self):
+        """
+        Initialize L{_name_index}, by walking down the variable/
+        submodule chain from each element of the root set, and
+        recording the C{(VariableDoc, ValueDoc)} pair that L{_get()}
+        would find for each name.  The walk only descends into values
+        whose canonical name matches the name used to reach them, so
+        it visits each C{APIDoc} at most once for each root.  Names
+        that can only be reached through other values (e.g., through
+        imported modules) are not indexed; their prefixes are recorded
+        in L{_unindexed_names}, and they are looked up by walking.
+        """
+        self._name_index = index = {}
+        self._unindexed_names = unindexed = set()
+        self._roots_by_name = {}
+        # Root names may be given as strings.
+        root_names = [DottedName(root_valdoc.canonical_name)
+                      for root_valdoc in self.root]
+        for root_name, root_valdoc in zip(root_names, self.root):
+            self._roots_by_name.setdefault(root_name, []).append(root_valdoc)
+        # The first root whose walk succeeds is the one that is used,
+        # so visit the roots in reverse order.
+        for root_name, root_valdoc in reversed(list(zip(root_names,
+                                                        self.root))):
+            index[root_name] = (None, root_valdoc)
+            queue = [(root_name, root_valdoc)]
+            while queue:
+                name, val_doc = queue.pop()
+                for identifier, var_doc, child in self._children(val_doc):
+                    child_name = name + identifier
+                    index[child_name] = (var_doc, child)
+                    if child is None: continue
+                    if child.canonical_name == child_name:
+                        queue.append( (child_name, child) )
+                    elif isinstance(child, NamespaceDoc):
+                        unindexed.add(child_name)
+
+    def _children(self, val_doc):
+        """
+        Return a list of C{(identifier, var_doc, val_doc)} tuples,
+        giving the result of L{_get_from()} for each identifier that
+        it can find in C{val_doc}.
+        """
+        children = []
+        if (isinstance(val_doc, NamespaceDoc) and
+            val_doc.variables not in (None, UNKNOWN)):
+            for identifier, var_doc in val_doc.variables.items():
+                child = var_doc.value
+                if child is UNKNOWN: child = None
+                children.append( (identifier, var_doc, child) )
+        if (isinstance(val_doc, ModuleDoc) and
+            val_doc.submodules is not UNKNOWN):
+            seen = set()
+            if val_doc.variables not in (None, UNKNOWN):
+                seen.update(val_doc.variables)
+            for submodule in val_doc.submodules:
+                identifier = DottedName(submodule.canonical_name)[-1]
+                if identifier not in seen:
+                    seen.add(identifier)
+                    if submodule is UNKNOWN: submodule = None
+                    children.append( (identifier, None, submodule) )
+        return children
+
     def _get_from(self, val_doc, identifier):
         if isinstance(val_doc, NamespaceDoc):
             child_var = val_doc.variables.get(identifier)
@@ -1951,7 +2389,7 @@ class DocIndex:
         if (isinstance(val_doc, ModuleDoc) and
             val_doc.submodules is not UNKNOWN):
             for submodule in val_doc.submodules:
-                if submodule.canonical_name[-1] == identifier:
+                if DottedName(submodule.canonical_name)[-1] == identifier:
                     var_doc = None
                     val_doc = submodule
                     if val_doc is UNKNOWN: val_doc = None
@@ -1979,16 +2417,52 @@ class DocIndex:
             if the name is not found anywhere (including builtins,
             function parameters, etc.)
         """
+        if not isinstance(name, (str, DottedName)):
+            raise TypeError("'name' should be a string or DottedName")
+
+        # The result only depends on the context's name, unless the
+        # context is a routine (whose parameters are checked).
+        if context is None:
+            key = (name, None)
+        elif isinstance(context, RoutineDoc):
+            key = (name, context.canonical_name, context)
+        else:
+            key = (name, context.canonical_name)
+
+        doc = self._find_cache.get(key, UNKNOWN)
+        if doc is UNKNOWN:
+            log.count('xref_cache_misses')
+            doc = self._find(name, context)
+            # Ambiguous names are reported (and forgotten) the first
+            # time they are looked up, so don't cache them.
+            if doc is not _AMBIGUOUS:
+                self._find_cache[key] = doc
+        else:
+            log.count('xref_cache_hits')
+
+        if doc is _NOT_FOUND:
+            if not_found_exception: raise ValueError(name)
+            return None
+        elif doc is _AMBIGUOUS:
+            return None
+        else:
+            return doc
+
+    def _find(self, name, context):
+        """
+        Look for an C{APIDoc} named C{name}, relative to C{context},
+        as described by L{find()}.  Return C{None} if C{name} is known
+        not to be documented (e.g., if it is a builtin); L{_AMBIGUOUS}
+        if C{name} is an ambiguous module-level class name; and
+        L{_NOT_FOUND} if it is not found anywhere.
+        """
         if isinstance(name, str):
             name = re.sub(r'\(.*\)$', '', name.strip())
             if re.match('^([a-zA-Z_]\w*)(\.[a-zA-Z_]\w*)*$', name):
                 name = DottedName(name)
             else:
-                if not_found_exception: raise ValueError(name)
-                return None
-        elif not isinstance(name, DottedName):
-            raise TypeError("'name' should be a string or DottedName")
-        
+                return _NOT_FOUND
+
         if context is None or context.canonical_name is None:
             container_name = []
         else:
@@ -2036,9 +2510,9 @@ class DocIndex:
             # Drop this item so that the warning is reported only once.
             # fail() will fail anyway.
             del self.mlclasses[name[-1]]
+            return _AMBIGUOUS
         else:
-            if not_found_exception: raise ValueError(name)
-            return None
+            return _NOT_FOUND
 
     def _get_module_classes(self, docs):
         """
@@ -2094,8 +2568,47 @@ class DocIndex:
             when looking for C{ValueDoc}s that can be reached from the
             root set.  See C{APIDoc.apidoc_links} for a more complete
             description.
-        """
-        return reachable_valdocs(self.root, **filters)
+
+        @note: The result for each set of filters is cached, so
+            L{invalidate_caches()} must be called whenever the links
+            between the index's C{APIDoc}s are modified.
+        """
+        root = [id(val_doc) for val_doc in self.root]
+        if root != self._reachable_cache_root:
+            self._reachable_cache = {}
+            self._reachable_cache_root = root
+        key = tuple(sorted(filters.items()))
+        val_set = self._reachable_cache.get(key)
+        if val_set is None:
+            val_set = reachable_valdocs(self.root, **filters)
+            self._reachable_cache[key] = val_set
+        return set(val_set)
+
+    def invalidate_caches(self):
+        """
+        Discard any cached information that depends on the links
+        between the C{APIDoc}s in this index.  This must be called
+        after any C{APIDoc}s are added to the index, or after their
+        links (such as their variables, bases, or values) are
+        modified.
+        """
+        self._reachable_cache = {}
+        self._find_cache = {}
+        self._name_index = None
+        self._unindexed_names = None
+        self._roots_by_name = None
+
+    def __getstate__(self):
+        # The cached sets are not pickled, since the hash values of
+        # the APIDocs they contain change when they are unpickled.
+        state = self.__dict__.copy()
+        state['_reachable_cache'] = {}
+        state['_reachable_cache_root'] = None
+        state['_find_cache'] = {}
+        state['_name_index'] = None
+        state['_unindexed_names'] = None
+        state['_roots_by_name'] = None
+        return state
 
     def container(self, api_doc):
         """
@@ -2223,6 +2736,7 @@ def pp_apidoc(api_doc, doublespace=0, depth=5, exclude=(), include=(),
 
     backpointers[pyid] = len(backpointers)
     s = '%s [%s]' % (name, backpointers[pyid])
+    api_doc.parse_deferred_docstring()
 
     # Only print(non-empty fields:)
     fields = [field for field in api_doc.__dict__.keys()
@@ -138,7 +138,7 @@ HELP_TOPICS['topics'] = wordwrap(
 
 DEFAULT_TARGET = dict(
     html='html', latex='latex', dvi='api.dvi', ps='api.ps',
-    pdf='api.pdf', pickle='api.pickle')
+    pdf='api.pdf', pickle='api.pickle', sqlite='api.sqlite')
 
 def option_defaults():
     return dict(
@@ -152,7 +152,10 @@ def option_defaults():
         external_api=[], external_api_file=[], external_api_root=[],
         redundant_details=False, src_code_tab_width=8, verbosity=0,
         include_timestamp=True, target={}, default_target=None,
-        pdfdriver='auto', show_submodule_list=True, inherit_from_object=False)
+        pdfdriver='auto', show_submodule_list=True, inherit_from_object=False,
+        parse_cache=None, jobs=1,
+        isolate_introspection=False, stats_file=None, memory_profile=False,
+        release_docs=False)
 
 
 def add_target(option, opt, value, optparser):
@@ -229,7 +232,13 @@ def parse_arguments():
 
     action_group.add_option("--pickle",
         action="append_const", dest="actions", const="pickle",
-        help="Write the documentation to a pickle file.")
+        help="Write the documentation to a binary file, which can be "
+        "given as the input name of a later run.")
+
+    action_group.add_option("--sqlite",
+        action="append_const", dest="actions", const="sqlite",
+        help="Write the names, summaries and links of the documented "
+        "objects to an SQLite database.")
 
     # Provide our own --help and --version options.
     action_group.add_option("--version",
@@ -274,6 +283,23 @@ def parse_arguments():
         help="Exclude parsing of modules whose dotted name matches "
              "the regular expression PATTERN")
 
+    generation_group.add_option("--parse-cache",
+        dest="parse_cache", metavar="DIR",
+        help="Cache the results of parsing each module, and each "
+        "docstring, in the directory DIR, and reuse them when neither the "
+        "module's source file nor the source files of the modules it "
+        "looked up have changed.")
+
+    generation_group.add_option("--jobs", "-j",
+        action="store", type="int", dest="jobs", metavar="N",
+        help="Parse the modules in each package, and the docstrings, "
+        "using N worker processes.  (default: 1)")
+
+    generation_group.add_option("--isolate-introspection",
+        action="store_true", dest="isolate_introspection",
+        help="Import and introspect modules in separate worker processes "
+        "(as many as --jobs), rather than in the epydoc process.")
+
     generation_group.add_option("--inheritance",
         dest="inheritance", metavar="STYLE",
         help="The format for showing inheritance objects.  STYLE "
@@ -309,6 +335,24 @@ def parse_arguments():
         action='store_true', dest='include_log',
         help=("Include a page with the process log (epydoc-log.html)"))
 
+    generation_group.add_option('--stats-file',
+        dest='stats_file', metavar='FILE',
+        help=("Write the time, memory use, and number of items processed "
+              "for each stage of the build to FILE, in JSON format."))
+
+    generation_group.add_option('--memory-profile',
+        action='store_true', dest='memory_profile',
+        help=("Trace epydoc's memory allocations, and report the top "
+              "allocation sites and the memory used by each kind of API "
+              "documentation object after each stage of the build."))
+
+    generation_group.add_option('--release-docs',
+        action='store_true', dest='release_docs',
+        help=("Parse docstrings as the HTML pages that display them are "
+              "written, and discard each object's documentation once all "
+              "of its pages have been written.  Only used when --html is "
+              "the only output action."))
+
     generation_group.add_option('--redundant-details',
         action='store_true', dest='redundant_details',
         help=("Include values in the details lists even if all info "
@@ -547,6 +591,8 @@ def parse_arguments():
     if not options.parse and not options.introspect:
         optparser.error("Invalid option combination: --parse-only "
                         "and --introspect-only.")
+    if options.jobs < 1:
+        optparser.error("The number of jobs must be at least 1.")
 
     # Check the list of requested graph types to make sure they're
     # acceptable.
@@ -647,6 +693,12 @@ def parse_configfiles(configfiles, options, names):
             options.exclude_parse.extend(_str_to_list(val))
         elif optname in ('exclude-introspect', 'exclude_introspect'):
             options.exclude_introspect.extend(_str_to_list(val))
+        elif optname in ('parse-cache', 'parse_cache'):
+            options.parse_cache = val
+        elif optname == 'jobs':
+            options.jobs = _str_to_int(val, optname)
+        elif optname in ('isolate-introspection', 'isolate_introspection'):
+            options.isolate_introspection = _str_to_bool(val, optname)
         elif optname == 'inheritance':
             if val.lower() not in INHERITANCE_STYLES:
                 raise ValueError('"%s" expected one of: %s.' %
@@ -660,6 +712,12 @@ def parse_configfiles(configfiles, options, names):
             options.include_source_code = _str_to_bool(val, optname)
         elif optname in ('include-log', 'include_log'):
             options.include_log = _str_to_bool(val, optname)
+        elif optname in ('stats-file', 'stats_file'):
+            options.stats_file = val
+        elif optname in ('memory-profile', 'memory_profile'):
+            options.memory_profile = _str_to_bool(val, optname)
+        elif optname in ('release-docs', 'release_docs'):
+            options.release_docs = _str_to_bool(val, optname)
         elif optname in ('redundant-details', 'redundant_details'):
             options.redundant_details = _str_to_bool(val, optname)
         elif optname in ('submodule-list', 'submodule_list'):
@@ -806,10 +864,11 @@ def main(options):
                   1,   # Inheriting documentation
                   2]   # Sorting & Grouping
         if options.load_pickle:
-            stages = [30] # Loading pickled documentation
+            stages = [10] # Loading pickled documentation
         if 'html' in options.actions: stages += [100]
         if 'check' in options.actions: stages += [10]
         if 'pickle' in options.actions: stages += [10]
+        if 'sqlite' in options.actions: stages += [10]
         if 'latex' in options.actions: stages += [60]
         if 'pdf' in options.actions: stages += [50]
         elif 'ps' in options.actions: stages += [40] # implied by pdf
@@ -832,7 +891,7 @@ def main(options):
             options.target.setdefault(key, val)
 
     # Add extensions to target filenames, where appropriate.
-    for action in ['pdf', 'ps', 'dvi', 'pickle']:
+    for action in ['pdf', 'ps', 'dvi', 'pickle', 'sqlite']:
         if action in options.target:
             if not options.target[action].endswith('.%s' % action):
                 options.target[action] += '.%s' % action
@@ -859,10 +918,32 @@ def main(options):
         else:
             log.warning("--include-log requires --html")
 
+    if options.release_docs and options.actions != ['html']:
+        log.warning("--release-docs requires --html to be the only action")
+        options.release_docs = False
+
+    if options.stats_file:
+        logger = StatsLogger(options.stats_file)
+        log.register_logger(logger)
+        loggers.append(logger)
+
+    if options.memory_profile:
+        memory_logger = MemoryProfileLogger()
+        log.register_logger(memory_logger)
+        loggers.append(memory_logger)
+
     # Set the default docformat
     from epydoc import docstringparser
     docstringparser.DEFAULT_DOCFORMAT = options.docformat
 
+    # Set the parse cache directory, and load the parsed docstrings
+    # that were cached there.
+    if options.parse_cache:
+        from epydoc import docparser
+        docparser.PARSE_CACHE_DIR = options.parse_cache
+        docstringparser.load_parsed_docstring_cache(
+            os.path.join(options.parse_cache, 'docstrings.pickle'))
+
     # Configure the external API linking
     if xlink is not None:
         try:
@@ -892,12 +973,16 @@ def main(options):
     # it contains.  Otherwise, build the docs for the input names.
     if options.load_pickle:
         assert len(options.names) == 1
+        from epydoc.docserializer import load_docindex, SerializationError
         log.start_progress('Deserializing')
         log.progress(0.1, 'Loading %r' % options.names[0])
         t0 = time.time()
-        unpickler = pickle.Unpickler(open(options.names[0], 'rb'))
-        unpickler.persistent_load = pickle_persistent_load
-        docindex = unpickler.load()
+        try:
+            with open(options.names[0], 'rb') as infile:
+                docindex = load_docindex(infile)
+        except (IOError, OSError, SerializationError) as e:
+            log.error('Unable to load %s: %s' % (options.names[0], e))
+            docindex = None
         log.debug('deserialization time: %.1f sec' % (time.time()-t0))
         log.end_progress()
     else:
@@ -912,11 +997,18 @@ def main(options):
                                    add_submodules=(options.actions!=['text']),
                                    exclude_introspect=exclude_introspect,
                                    exclude_parse=exclude_parse,
-                                   inherit_from_object=inherit_from_object)
+                                   inherit_from_object=inherit_from_object,
+                                   jobs=options.jobs,
+                                   isolate_introspection=
+                                       options.isolate_introspection,
+                                   lazy_docstrings=(options.actions==['text'] or
+                                                    options.release_docs))
+        if options.parse_cache and docindex is not None:
+            save_parse_cache(options)
 
     if docindex is None:
         for logger in loggers:
-            if log.ERROR in logger.reported_message_levels:
+            if log.ERROR in getattr(logger, 'reported_message_levels', ()):
                 sys.exit(1)
         else:
             for logger in loggers: log.remove_logger(logger)
@@ -950,6 +1042,8 @@ def main(options):
         check_docs(docindex, options)
     if 'pickle' in options.actions:
         write_pickle(docindex, options)
+    if 'sqlite' in options.actions:
+        write_sqlite(docindex, options)
     if ('latex' in options.actions or 'dvi' in options.actions or
         'ps' in options.actions or 'pdf' in options.actions):
         write_latex(docindex, options)
@@ -975,6 +1069,10 @@ def main(options):
                 logger.print_times()
                 break
 
+    # Memory profile:
+    if options.memory_profile:
+        memory_logger.print_report()
+
     # If we encountered any message types that we were requested to
     # fail on, then exit with status 2.
     if options.fail_on is not None:
@@ -998,33 +1096,42 @@ def write_html(docindex, options):
     html_writer.write(options.target['html'])
     log.end_progress()
 
+def save_parse_cache(options):
+    """Helper for saving the parsed docstring cache in the parse
+    cache directory C{options.parse_cache}, for the next run.  (The
+    parsed modules are saved there as each module is parsed.)"""
+    from epydoc import docstringparser
+    if not os.path.isdir(options.parse_cache):
+        os.makedirs(options.parse_cache)
+    docstringparser.save_parsed_docstring_cache(
+        os.path.join(options.parse_cache, 'docstrings.pickle'))
+
 def write_pickle(docindex, options):
-    """Helper for writing output to a pickle file, which can then be
-    read in at a later time.  But loading the pickle is only marginally
-    faster than building the docs from scratch, so this has pretty
-    limited application."""
+    """Helper for writing output to a binary file (in the format
+    defined by L{epydoc.docserializer}), which can then be read in at
+    a later time, by giving its name as the input name."""
+    from epydoc.docserializer import dump_docindex, SerializationError
     log.start_progress('Serializing output')
     log.progress(0.2, 'Writing %r' % options.target['pickle'])
-    outfile = open(options.target['pickle'], 'wb')
-    pickler = pickle.Pickler(outfile, protocol=0)
-    pickler.persistent_id = pickle_persistent_id
-    pickler.dump(docindex)
-    outfile.close()
+    try:
+        with open(options.target['pickle'], 'wb') as outfile:
+            dump_docindex(docindex, outfile)
+    except (IOError, OSError, SerializationError) as e:
+        log.error('Unable to write %s: %s' % (options.target['pickle'], e))
     log.end_progress()
 
-def pickle_persistent_id(obj):
-    """Helper for pickling, which allows us to save and restore UNKNOWN,
-    which is required to be identical to apidoc.UNKNOWN."""
-    if obj is UNKNOWN: return 'UNKNOWN'
-    else: return None
-
-def pickle_persistent_load(identifier):
-    """Helper for pickling, which allows us to save and restore UNKNOWN,
-    which is required to be identical to apidoc.UNKNOWN."""
-    if identifier == 'UNKNOWN':
-        return UNKNOWN
-    else:
-        raise pickle.UnpicklingError('Invalid persistent id')
+def write_sqlite(docindex, options):
+    """Helper for writing output to an SQLite database (with the
+    schema defined by L{epydoc.docstore})."""
+    import sqlite3
+    from epydoc.docstore import export_docindex
+    log.start_progress('Exporting to SQLite')
+    log.progress(0.2, 'Writing %r' % options.target['sqlite'])
+    try:
+        export_docindex(docindex, options.target['sqlite'])
+    except (IOError, OSError, sqlite3.Error) as e:
+        log.error('Unable to write %s: %s' % (options.target['sqlite'], e))
+    log.end_progress()
 
 _RERUN_LATEX_RE = re.compile(rb'(?im)^LaTeX\s+Warning:\s+Label\(s\)\s+may'
                              rb'\s+have\s+changed.\s+Rerun')
@@ -1199,6 +1306,7 @@ def write_text(docindex, options):
     s = '\n'
     for apidoc in docindex.root:
         s += plaintext_writer.write(apidoc, **options.__dict__)+'\n'
+        log.count('pages')
     log.end_progress()
     sys.stdout.write(s)
 
@@ -1554,6 +1662,207 @@ class UnifiedProgressConsoleLogger(ConsoleLogger):
     def print_times(self):
         pass
 
+class StatsLogger(log.Logger):
+    """
+    A logger used to record the wall time, CPU time, and counters (see
+    L{log.count()}) of each stage of the build (i.e., of each task
+    that reports its progress), along with the peak memory use (RSS)
+    of the epydoc process at the end of each stage.  When the logger
+    is closed, this information is written to a JSON file.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.start_time = time.time()
+        self.start_cpu_time = time.process_time()
+        self.stages = []
+        self.stage = None
+        self.counts = {}
+        self.messages = {}
+        self.reported_message_levels = set()
+
+    def log(self, level, message):
+        self.reported_message_levels.add(level)
+        if level >= log.ERROR: name = 'errors'
+        elif level >= log.WARNING: name = 'warnings'
+        elif level >= log.DOCSTRING_WARNING: name = 'docstring_warnings'
+        else: return
+        self.messages[name] = self.messages.get(name, 0) + 1
+
+    def start_progress(self, header=None):
+        self.stage = dict(name=header, counts={},
+                          wall_time=time.time(),
+                          cpu_time=time.process_time())
+
+    def end_progress(self):
+        stage, self.stage = self.stage, None
+        if stage is None or stage['name'] is None: return
+        stage['wall_time'] = time.time() - stage['wall_time']
+        stage['cpu_time'] = time.process_time() - stage['cpu_time']
+        stage['peak_rss'] = self._peak_rss()
+        self.stages.append(stage)
+
+    def count(self, name, n=1):
+        if self.stage is not None:
+            counts = self.stage['counts']
+            counts[name] = counts.get(name, 0) + n
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def _peak_rss(self):
+        """
+        Return the peak resident set size of the epydoc process, in
+        bytes; or None if it is not available on this platform.
+        """
+        try:
+            import resource
+        except ImportError:
+            return None
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            return rss
+        else:
+            return rss * 1024 # Kilobytes
+
+    def close(self):
+        if self.filename is None: return
+        import json
+        stats = dict(epydoc_version=epydoc.__version__,
+                     wall_time=time.time() - self.start_time,
+                     cpu_time=time.process_time() - self.start_cpu_time,
+                     peak_rss=self._peak_rss(),
+                     counts=self.counts, messages=self.messages,
+                     stages=self.stages)
+        try:
+            out = open(self.filename, 'w')
+            try:
+                json.dump(stats, out, indent=2, sort_keys=True)
+                out.write('\n')
+            finally:
+                out.close()
+        except IOError as e:
+            sys.stderr.write('Unable to write stats file %r: %s\n' %
+                             (self.filename, e))
+        self.filename = None
+
+class MemoryProfileLogger(log.Logger):
+    """
+    A logger that uses C{tracemalloc} to take a snapshot of epydoc's
+    memory allocations at the end of each stage of the build (i.e.,
+    of each task that reports its progress, including the output
+    writers).  For each stage, it records the traced memory, the
+    allocation sites whose memory grew the most during the stage, and
+    the memory used by each C{APIDoc} subclass's instances.  Tracing
+    starts when the logger is created, and stops when it is closed.
+    """
+    TRACEBACK_LIMIT = 1
+    """The number of frames stored for each allocation."""
+
+    TOP_SITES = 10
+    """The number of allocation sites reported for each stage."""
+
+    def __init__(self):
+        import tracemalloc
+        self.tracemalloc = tracemalloc
+        self.stages = []
+        self.stage = None
+        self.snapshot = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACEBACK_LIMIT)
+
+    def start_progress(self, header=None):
+        self.stage = header
+        self.tracemalloc.reset_peak()
+
+    def end_progress(self):
+        stage, self.stage = self.stage, None
+        if stage is None or not self.tracemalloc.is_tracing(): return
+        current, peak = self.tracemalloc.get_traced_memory()
+        snapshot = self.tracemalloc.take_snapshot().filter_traces([
+            self.tracemalloc.Filter(False, self.tracemalloc.__file__),
+            self.tracemalloc.Filter(False, '<frozen importlib._bootstrap*'),
+            self.tracemalloc.Filter(False, '<unknown>')])
+        if self.snapshot is None:
+            stats = snapshot.statistics('lineno')[:self.TOP_SITES]
+            sites = [(str(stat.traceback[0]), stat.size, stat.size)
+                     for stat in stats]
+        else:
+            stats = snapshot.compare_to(self.snapshot, 'lineno')
+            sites = [(str(stat.traceback[0]), stat.size, stat.size_diff)
+                     for stat in stats[:self.TOP_SITES]
+                     if stat.size_diff > 0]
+        del stats
+        self.snapshot = snapshot
+        self.stages.append( (stage, current, peak, sites,
+                             self._apidoc_sizes()) )
+
+    def _apidoc_sizes(self):
+        """
+        Return a dictionary mapping each C{APIDoc} subclass to a
+        tuple C{(count, size)}, where C{count} is the number of live
+        instances, and C{size} is the number of bytes used by the
+        instances, their attribute dictionaries, and the strings and
+        containers that their attributes refer to.  Attribute
+        dictionaries, strings and containers that are shared by
+        several instances (e.g., because they were merged) are only
+        counted once.
+        """
+        import gc
+        from epydoc.apidoc import APIDoc
+        sizes = {}
+        seen = set()
+        for obj in gc.get_objects():
+            if not isinstance(obj, APIDoc): continue
+            size = sys.getsizeof(obj)
+            if id(obj.__dict__) not in seen:
+                seen.add(id(obj.__dict__))
+                size += sys.getsizeof(obj.__dict__)
+                for val in obj.__dict__.values():
+                    if (isinstance(val, (str, bytes, list, tuple, dict, set))
+                        and id(val) not in seen):
+                        seen.add(id(val))
+                        size += sys.getsizeof(val)
+            count, total = sizes.get(obj.__class__, (0, 0))
+            sizes[obj.__class__] = (count+1, total+size)
+        return sizes
+
+    def close(self):
+        if self.tracemalloc.is_tracing():
+            self.tracemalloc.stop()
+        self.snapshot = None
+
+    def print_report(self):
+        print()
+        print('Memory profile:')
+        prev = 0
+        for (stage, current, peak, sites, apidoc_sizes) in self.stages:
+            print()
+            print('  %s' % stage)
+            print('    Traced memory: %s (peak %s, %s)' %
+                  (self._sizestr(current), self._sizestr(peak),
+                   self._sizestr(current-prev, '+')))
+            prev = current
+            if sites:
+                print('    Top allocation sites:')
+                for (site, size, size_diff) in sites:
+                    print('      %11s %13s  %s' %
+                          (self._sizestr(size),
+                           '(%s)' % self._sizestr(size_diff, '+'), site))
+            if apidoc_sizes:
+                print('    API documentation objects:')
+                for cls, (count, size) in sorted(apidoc_sizes.items(),
+                        key=lambda item: -item[1][1]):
+                    print('      %11s %7d  %5d bytes/object  %s' %
+                          (self._sizestr(size), count, size//count,
+                           cls.__name__))
+        print()
+
+    def _sizestr(self, size, sign=''):
+        if size < 0: sign, size = '-', -size
+        for units in ('bytes', 'KB', 'MB'):
+            if size < 1024 or units == 'MB': break
+            size /= 1024.
+        if units == 'bytes': return '%s%d %s' % (sign, size, units)
+        return '%s%.1f %s' % (sign, size, units)
+
 class HTMLLogger(log.Logger):
     """
     A logger used to generate a log of all warnings and messages to an
@@ -45,12 +45,15 @@ The remaining functions are used by these two main functions to
 perform individual steps in the creation of the documentation.
 
 @group Documentation Construction: build_doc, build_doc_index,
-    _get_docs_from_*, _report_valdoc_progress
+    _get_docs_from_*, _report_valdoc_progress, _parse_docstrings,
+    _defer_docstrings, _propagate_defining_module
 @group Merging: *MERGE*, *merge*
 @group Linking: link_imports
 @group Naming: _name_scores, _unreachable_names, assign_canonical_names,
-    _var_shadows_self, _fix_self_shadowing_var, _unreachable_name_for
-@group Inheritance: inherit_docs, _inherit_info
+    _visit_canonical_names, _var_shadows_self, _fix_self_shadowing_var,
+    _unreachable_name_for
+@group Inheritance: find_overrides, inherit_docs, _mro_definitions,
+    _base_definitions, _local_variables, _inherit_info
 """
 __docformat__ = 'epytext en'
 
@@ -69,12 +72,14 @@ __docformat__ = 'epytext en'
 
 from itertools import chain
 from sys import maxsize
-import os, os.path, builtins, imp, re, inspect
+import os, os.path, sys, builtins, imp, re, inspect, time
+import epydoc
 from epydoc.apidoc import *
+from epydoc import docparser, docstringparser, docintrospecter
 from epydoc.docintrospecter import introspect_docs
 from epydoc.docintrospecter import get_value_from_filename, get_value_from_name
 from epydoc.docparser import parse_docs, ParseError
-from epydoc.docstringparser import parse_docstring
+from epydoc.docstringparser import parse_docstring, defer_parse_docstring
 from epydoc import log
 from epydoc.util import *
 
@@ -88,12 +93,16 @@ class BuildOptions:
     """
     def __init__(self, introspect=True, parse=True,
                  exclude_introspect=None, exclude_parse=None,
-                 add_submodules=True):
+                 add_submodules=True, jobs=1, isolate_introspection=False):
         self.introspect = introspect
         self.parse = parse
         self.exclude_introspect = exclude_introspect
         self.exclude_parse = exclude_parse
         self.add_submodules = add_submodules
+        self.jobs = jobs
+        self.isolate_introspection = isolate_introspection
+        self.parallel_parser = None
+        self.introspection_workers = None
 
         # Test for pattern syntax and compile them into pattern objects.
         try:
@@ -149,7 +158,7 @@ class BuildOptions:
 
 def build_doc(item, introspect=True, parse=True, add_submodules=True,
               exclude_introspect=None, exclude_parse=None,
-              inherit_from_object=False):
+              inherit_from_object=False, lazy_docstrings=False):
     """
     Build API documentation for a given item, and return it as
     an L{APIDoc} object.
@@ -169,16 +178,21 @@ def build_doc(item, introspect=True, parse=True, add_submodules=True,
         specified items.  Otherwise, just use parsing.
     @param parse: If true, then use parsing to examine the specified
         items.  Otherwise, just use introspection.
+    @param lazy_docstrings: If true, then each docstring is only
+        processed when the information it provides is first used
+        (see L{build_doc_index()}).
     """
     docindex = build_doc_index([item], introspect, parse, add_submodules,
                                exclude_introspect=exclude_introspect,
                                exclude_parse=exclude_parse,
-                               inherit_from_object=inherit_from_object)
+                               inherit_from_object=inherit_from_object,
+                               lazy_docstrings=lazy_docstrings)
     return docindex.root[0]
 
 def build_doc_index(items, introspect=True, parse=True, add_submodules=True,
                     exclude_introspect=None, exclude_parse=None,
-                    inherit_from_object=False):
+                    inherit_from_object=False, jobs=1,
+                    isolate_introspection=False, lazy_docstrings=False):
     """
     Build API documentation for the given list of items, and
     return it in the form of a L{DocIndex}.
@@ -198,21 +212,47 @@ def build_doc_index(items, introspect=True, parse=True, add_submodules=True,
         specified items.  Otherwise, just use parsing.
     @param parse: If true, then use parsing to examine the specified
         items.  Otherwise, just use introspection.
+    @param jobs: The number of worker processes that should be used
+        to parse the modules in each package, and the docstrings.  If
+        C{jobs} is 1, then everything is parsed in this process.
+    @param isolate_introspection: If true, then modules are imported
+        and introspected by C{jobs} worker processes, rather than by
+        this process.
+    @param lazy_docstrings: If true, then the docstrings of routines
+        and variables are not processed while building the index.
+        Instead, each one is processed the first time that one of the
+        attributes it fills in (such as C{descr}, C{summary} or
+        C{arg_descrs}) is used, and any warnings are reported then.
+        (Module and class docstrings are still processed, since they
+        define the groups and the sort order of their contents.)
+        This is useful when only some of the documented objects will
+        be looked at.
     """
     try:
         options = BuildOptions(parse=parse, introspect=introspect,
             exclude_introspect=exclude_introspect, exclude_parse=exclude_parse,
-            add_submodules=add_submodules)
+            add_submodules=add_submodules, jobs=jobs,
+            isolate_introspection=isolate_introspection)
     except Exception:
         # log.error already reported by constructor.
         return None
 
     # Get the basic docs for each item.
     log.start_progress('Building documentation')
-    if introspect:
+    if introspect and isolate_introspection:
+        options.introspection_workers = _IntrospectionWorkers(options.jobs)
+    elif introspect:
         # Import everything before we introspect anything.
         _import_docs_from_items(items, options)
-    doc_pairs = _get_docs_from_items(items, options)
+    if options.parse and options.jobs > 1:
+        options.parallel_parser = _ParallelParser(options.jobs)
+    try:
+        doc_pairs = _get_docs_from_items(items, options)
+    finally:
+        if options.parallel_parser is not None:
+            options.parallel_parser.shutdown()
+        if options.introspection_workers is not None:
+            options.introspection_workers.shutdown()
     log.end_progress()
 
     # Merge the introspection & parse docs.
@@ -253,6 +293,10 @@ def build_doc_index(items, introspect=True, parse=True, add_submodules=True,
         for i, val_doc in enumerate(valdocs):
             _report_valdoc_progress(i, val_doc, valdocs)
             link_imports(val_doc, docindex)
+        # Linking modifies the index, so any cached information about
+        # it must be discarded.  (The same is true for the stages
+        # below.)
+        docindex.invalidate_caches()
         log.end_progress()
 
     # Assign canonical names.
@@ -260,49 +304,48 @@ def build_doc_index(items, introspect=True, parse=True, add_submodules=True,
     for i, val_doc in enumerate(docindex.root):
         log.progress(float(i)/len(docindex.root), val_doc.canonical_name)
         assign_canonical_names(val_doc, val_doc.canonical_name, docindex)
+    valdocs = sorted(docindex.reachable_valdocs(
+        imports=False, submodules=False, packages=False, subclasses=False))
+    _count_valdocs(valdocs)
     log.end_progress()
 
     # Set overrides pointers
     log.start_progress('Checking for overridden methods')
-    valdocs = sorted(docindex.reachable_valdocs(
-        imports=False, submodules=False, packages=False, subclasses=False))
+    mro_cache, definitions_cache = {}, {}
     for i, val_doc in enumerate(valdocs):
         if isinstance(val_doc, ClassDoc):
             percent = float(i)/len(valdocs)
             log.progress(percent, val_doc.canonical_name)
-            find_overrides(val_doc)
+            find_overrides(val_doc, mro_cache, definitions_cache)
+    docindex.invalidate_caches()
     log.end_progress()
     
-    # Parse the docstrings for each object.
+    # Parse the docstrings for each object.  (Or, for lazy docstrings,
+    # arrange for them to be parsed when they are first used.)
     log.start_progress('Parsing docstrings')
     suppress_warnings = set(valdocs).difference(
         docindex.reachable_valdocs(
             imports=False, submodules=False, packages=False, subclasses=False,
             bases=False, overrides=True))
-    for i, val_doc in enumerate(valdocs):
-        _report_valdoc_progress(i, val_doc, valdocs)
-        # the value's docstring
-        parse_docstring(val_doc, docindex, suppress_warnings)
-        # the value's variables' docstrings
-        if (isinstance(val_doc, NamespaceDoc) and
-            val_doc.variables not in (None, UNKNOWN)):
-            for var_doc in val_doc.variables.values():
-                # Now we have a chance to propagate the defining module
-                # to objects for which introspection is not possible,
-                # such as properties.
-                if (isinstance(var_doc.value, ValueDoc)
-                    and var_doc.value.defining_module is UNKNOWN):
-                    var_doc.value.defining_module = val_doc.defining_module
-                parse_docstring(var_doc, docindex, suppress_warnings)
+    if lazy_docstrings:
+        _defer_docstrings(valdocs, docindex, suppress_warnings)
+    else:
+        _parse_docstrings(valdocs, docindex, suppress_warnings, options)
+    docindex.invalidate_caches()
     log.end_progress()
 
     # Take care of inheritance.
     log.start_progress('Inheriting documentation')
+    # (The class hierarchy has not changed, so the mros that were
+    # found above can be reused; but the variables have.)
+    definitions_cache = {}
     for i, val_doc in enumerate(valdocs):
         if isinstance(val_doc, ClassDoc):
             percent = float(i)/len(valdocs)
             log.progress(percent, val_doc.canonical_name)
-            inherit_docs(val_doc, inherit_from_object)
+            inherit_docs(val_doc, inherit_from_object, mro_cache,
+                         definitions_cache)
+    docindex.invalidate_caches()
     log.end_progress()
 
     # Initialize the groups & sortedvars attributes.
@@ -316,16 +359,89 @@ def build_doc_index(items, introspect=True, parse=True, add_submodules=True,
             if isinstance(val_doc, ModuleDoc):
                 val_doc.init_submodule_groups()
             val_doc.report_unused_groups()
+    docindex.invalidate_caches()
     log.end_progress()
 
     return docindex
 
+def _count_valdocs(val_docs):
+    """
+    Report the number of modules, classes, routines, and variables
+    that are documented by C{val_docs} (see L{log.count()}).
+    """
+    counts = {'modules': 0, 'classes': 0, 'routines': 0, 'variables': 0}
+    for val_doc in val_docs:
+        if isinstance(val_doc, ModuleDoc): counts['modules'] += 1
+        elif isinstance(val_doc, ClassDoc): counts['classes'] += 1
+        elif isinstance(val_doc, RoutineDoc): counts['routines'] += 1
+        if (isinstance(val_doc, NamespaceDoc) and
+            val_doc.variables not in (None, UNKNOWN)):
+            counts['variables'] += len(val_doc.variables)
+    for name, n in sorted(counts.items()):
+        log.count(name, n)
+
 def _report_valdoc_progress(i, val_doc, val_docs):
     if (isinstance(val_doc, (ModuleDoc, ClassDoc)) and
         val_doc.canonical_name is not UNKNOWN and
         not val_doc.canonical_name[0].startswith('??')):
         log.progress(float(i)/len(val_docs), val_doc.canonical_name)
 
+def _parse_docstrings(valdocs, docindex, suppress_warnings, options):
+    """
+    Parse the docstrings of the given values, and of their variables.
+    """
+    # The markup is parsed by worker processes (if any); but fields
+    # are still processed, and warnings reported, in this process, in
+    # the same order as when there are no workers.
+    if options.jobs > 1:
+        parallel_parser = _ParallelDocstringParser(options.jobs)
+        parallel_parser.submit(valdocs, docindex)
+    else:
+        parallel_parser = None
+    try:
+        for i, val_doc in enumerate(valdocs):
+            _report_valdoc_progress(i, val_doc, valdocs)
+            # the value's docstring
+            parse_docstring(val_doc, docindex, suppress_warnings)
+            # the value's variables' docstrings
+            if (isinstance(val_doc, NamespaceDoc) and
+                val_doc.variables not in (None, UNKNOWN)):
+                for var_doc in val_doc.variables.values():
+                    _propagate_defining_module(var_doc, val_doc)
+                    parse_docstring(var_doc, docindex, suppress_warnings)
+    finally:
+        if parallel_parser is not None:
+            parallel_parser.shutdown()
+
+def _defer_docstrings(valdocs, docindex, suppress_warnings):
+    """
+    Arrange for the docstrings that L{_parse_docstrings()} would parse
+    to be parsed when they are first used instead.  The docstrings of
+    namespaces are still parsed now, since their fields can modify
+    their variables (and, for classes, their constructors), and
+    define how those variables are grouped and sorted.
+    """
+    for i, val_doc in enumerate(valdocs):
+        _report_valdoc_progress(i, val_doc, valdocs)
+        if not isinstance(val_doc, NamespaceDoc):
+            defer_parse_docstring(val_doc, docindex, suppress_warnings)
+            continue
+        parse_docstring(val_doc, docindex, suppress_warnings)
+        if val_doc.variables not in (None, UNKNOWN):
+            for var_doc in val_doc.variables.values():
+                _propagate_defining_module(var_doc, val_doc)
+                defer_parse_docstring(var_doc, docindex, suppress_warnings)
+
+def _propagate_defining_module(var_doc, namespace_doc):
+    """
+    If the defining module of C{var_doc}'s value is unknown, then set
+    it to C{namespace_doc}'s.  This covers objects for which
+    introspection is not possible, such as properties.
+    """
+    if (isinstance(var_doc.value, ValueDoc)
+        and var_doc.value.defining_module is UNKNOWN):
+        var_doc.value.defining_module = namespace_doc.defining_module
+
 #/////////////////////////////////////////////////////////////////
 # Pre-Import
 #/////////////////////////////////////////////////////////////////
@@ -410,6 +526,10 @@ def _get_docs_from_items(items, options):
     # useful error messages).
     canonical_names = {}
 
+    # Start parsing the items in worker processes.
+    if options.parallel_parser is not None:
+        options.parallel_parser.submit_items(items, options)
+
     # Collect (introspectdoc, parsedoc) pairs for each item.
     doc_pairs = []
     for item in items:
@@ -515,10 +635,16 @@ def _get_docs_from_pyname(name, options, progress_estimator,
     introspect_error = parse_error = None
     if options.must_introspect(name):
         try:
-            introspect_doc = introspect_docs(name=name)
+            if options.introspection_workers is not None:
+                introspect_doc = options.introspection_workers.introspect(
+                    _name_task(name, options))
+            else:
+                introspect_doc = introspect_docs(name=name)
         except ImportError as e:
             introspect_error = str(e)
     if options.must_parse(name):
+        if options.parallel_parser is not None:
+            options.parallel_parser.wait_item(name)
         try:
             parse_doc = parse_docs(name=name)
         except ParseError as e:
@@ -544,12 +670,19 @@ def _get_docs_from_pyscript(filename, options, progress_estimator):
     introspect_error = parse_error = None
     if options.introspect:
         try:
-            introspect_doc = introspect_docs(filename=filename, is_script=True)
+            if options.introspection_workers is not None:
+                introspect_doc = options.introspection_workers.introspect(
+                    _file_task(filename, True, None, options))
+            else:
+                introspect_doc = introspect_docs(filename=filename,
+                                                 is_script=True)
             if introspect_doc.canonical_name is UNKNOWN:
                 introspect_doc.canonical_name = munge_script_name(filename)
         except ImportError as e:
             introspect_error = str(e)
     if options.parse:
+        if options.parallel_parser is not None:
+            options.parallel_parser.wait(filename)
         try:
             parse_doc = parse_docs(filename=filename, is_script=True)
         except ParseError as e:
@@ -579,43 +712,39 @@ def _get_docs_from_module_file(filename, options, progress_estimator,
         the second element is the parent from parsing.
     """
     # Record our progress.
-    modulename = os.path.splitext(os.path.split(filename)[1])[0]
-    if modulename == '__init__':
-        modulename = os.path.split(os.path.split(filename)[0])[1]
-    if parent_docs[0]:
-        modulename = DottedName(parent_docs[0].canonical_name, modulename)
-    elif parent_docs[1]:
-        modulename = DottedName(parent_docs[1].canonical_name, modulename)
+    modulename = _get_module_name(filename, parent_docs)
     if options.must_introspect(modulename) or options.must_parse(modulename):
         log.progress(progress_estimator.progress(),
                      '%s (%s)' % (modulename, filename))
     progress_estimator.complete += 1
     
-    # Normalize the filename.
-    filename = os.path.normpath(os.path.abspath(filename))
-
-    # When possible, use the source version of the file.
-    try:
-        filename = py_src_filename(filename)
-        src_file_available = True
-    except ValueError:
-        src_file_available = False
+    # Normalize the filename, and use the source version of the file
+    # when possible.
+    filename, src_file_available = _get_module_src_filename(filename)
 
     # Get the introspected & parsed docs (as appropriate)
     introspect_doc = parse_doc = None
     introspect_error = parse_error = None
     if options.must_introspect(modulename):
         try:
-            introspect_doc = introspect_docs(
-                filename=filename, context=parent_docs[0])
+            if options.introspection_workers is not None:
+                introspect_doc = options.introspection_workers.introspect(
+                    _file_task(filename, False, parent_docs[0], options))
+            else:
+                introspect_doc = introspect_docs(
+                    filename=filename, context=parent_docs[0])
             if introspect_doc.canonical_name is UNKNOWN:
                 introspect_doc.canonical_name = modulename
+            log.count('modules_introspected')
         except ImportError as e:
             introspect_error = str(e)
     if src_file_available and options.must_parse(modulename):
+        if options.parallel_parser is not None:
+            options.parallel_parser.wait(filename)
         try:
             parse_doc = parse_docs(
                 filename=filename, context=parent_docs[1])
+            log.count('modules_parsed')
         except (ParseError, ImportError, IOError, OSError) as e:
             parse_error = str(e)
 
@@ -626,6 +755,33 @@ def _get_docs_from_module_file(filename, options, progress_estimator,
     # Return the docs we found.
     return (introspect_doc, parse_doc)
 
+def _get_module_name(filename, parent_docs):
+    """
+    Return the dotted name of the module with the given filename,
+    whose parent package's docs are C{parent_docs}.
+    """
+    modulename = os.path.splitext(os.path.split(filename)[1])[0]
+    if modulename == '__init__':
+        modulename = os.path.split(os.path.split(filename)[0])[1]
+    if parent_docs[0]:
+        modulename = DottedName(parent_docs[0].canonical_name, modulename)
+    elif parent_docs[1]:
+        modulename = DottedName(parent_docs[1].canonical_name, modulename)
+    return modulename
+
+def _get_module_src_filename(filename):
+    """
+    Return a tuple C{(filename, src_file_available)}, where
+    C{filename} is the normalized name of the source version of the
+    given module file (or of the file itself, if no source version
+    is available).
+    """
+    filename = os.path.normpath(os.path.abspath(filename))
+    try:
+        return py_src_filename(filename), True
+    except ValueError:
+        return filename, False
+
 def _get_docs_from_submodules(item, pkg_docs, options, progress_estimator):
     # Extract the package's __path__.
     if isinstance(pkg_docs[0], ModuleDoc) and pkg_docs[0].is_package:
@@ -656,6 +812,24 @@ def _get_docs_from_submodules(item, pkg_docs, options, progress_estimator):
     progress_estimator.revise_estimate(item, module_filenames.items(),
                                        subpackage_dirs)
 
+    # Start parsing the package's modules in worker processes.
+    if options.parallel_parser is not None:
+        for module_filename in module_filenames.values():
+            options.parallel_parser.submit(module_filename, pkg_docs,
+                                           options)
+
+    # Start introspecting the package's modules in worker processes.
+    if options.introspection_workers is not None:
+        filenames = (list(module_filenames.values()) +
+                     [os.path.join(d, '__init__') for d in subpackage_dirs])
+        for module_filename in filenames:
+            modulename = _get_module_name(module_filename, pkg_docs)
+            if options.must_introspect(modulename):
+                module_filename, _ = _get_module_src_filename(module_filename)
+                options.introspection_workers.submit(
+                    _file_task(module_filename, False, pkg_docs[0],
+                           options))
+
     docs = [pkg_docs]
     for module_filename in module_filenames.values():
         d = _get_docs_from_module_file(
@@ -691,6 +865,375 @@ def _report_errors(name, introspect_doc, parse_doc,
         log.end_block()
 
 
+#/////////////////////////////////////////////////////////////////
+# Parallel Parsing
+#/////////////////////////////////////////////////////////////////
+
+class _ParallelParser:
+    """
+    Used to parse modules using a pool of worker processes.  The
+    modules named by the items passed to L{build_doc_index()} are
+    submitted before any of them is processed, and each package's
+    modules are submitted when its submodules are listed.  Each
+    result is handed to C{docparser} just before the module would
+    have been parsed.  C{parse_docs()} then uses that result instead
+    of parsing the module, so modules are still added to their
+    packages in the same order as when they are parsed one at a time.
+    """
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.executor = None
+        self.futures = {}
+        self.item_filenames = {}
+
+    def submit_items(self, items, options):
+        """
+        Start parsing the modules and scripts named by the given
+        items (as passed to L{build_doc_index()}) in worker processes.
+        """
+        for item in items:
+            if not isinstance(item, str):
+                continue
+            elif is_module_file(item):
+                self.submit(item, (None, None), options)
+            elif is_package_dir(item):
+                self.submit(os.path.abspath(os.path.join(item, '__init__')),
+                            (None, None), options)
+            elif os.path.isfile(item):
+                self.submit(item, (None, None), options, is_script=True)
+            elif hasattr(builtins, item):
+                continue
+            elif is_pyname(item) and options.must_parse(item):
+                # parse_docs(name=item) parses the module that defines
+                # the name's first identifier, without a context.
+                try:
+                    filename = docparser._get_filename(DottedName(item)[0])
+                except ImportError:
+                    continue
+                self.item_filenames[item] = self.submit(
+                    filename, (None, None), options)
+
+    def submit(self, filename, parent_docs, options, is_script=False):
+        """
+        Start parsing the module with the given filename, whose
+        parent package's docs are C{parent_docs}, in a worker
+        process.  Do nothing if the module should not be parsed.
+
+        @return: The filename that L{wait()} should be called with
+            before the module is parsed; or C{None} if the module
+            is not parsed in a worker process.
+        """
+        context = parent_docs[1]
+        if is_script:
+            if not options.parse: return None
+        else:
+            if context is not None and not isinstance(context, ModuleDoc):
+                return None
+            modulename = _get_module_name(filename, parent_docs)
+            filename, src_file_available = _get_module_src_filename(filename)
+            if not (src_file_available and options.must_parse(modulename)):
+                return None
+        if filename in self.futures:
+            return filename
+        if self.executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(
+                self.jobs, initializer=docparser.init_worker,
+                initargs=(docparser.worker_config(),))
+        if context is None:
+            self.futures[filename] = self.executor.submit(
+                docparser.parse_in_worker, filename, None, None,
+                sys.path[:], is_script)
+        else:
+            self.futures[filename] = self.executor.submit(
+                docparser.parse_in_worker, filename, context.filename,
+                str(context.canonical_name), sys.path[:])
+        return filename
+
+    def wait_item(self, item):
+        """
+        Wait for the worker that is parsing the module defining the
+        given item's first identifier (if any) to finish, and hand
+        the result to C{docparser}.
+        """
+        self.wait(self.item_filenames.pop(item, None))
+
+    def wait(self, filename):
+        """
+        Wait for the worker that is parsing the module with the given
+        source filename (if any) to finish, and hand the result to
+        C{docparser}.
+        """
+        future = self.futures.pop(filename, None)
+        if future is None: return
+        try:
+            docparser.add_worker_result(future.result())
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            # The module will be parsed in this process instead.
+            log.debug('Parsing %s in a worker process failed: %s' %
+                      (filename, e))
+
+    def shutdown(self):
+        """
+        Stop the worker processes, and discard any results that were
+        not used.
+        """
+        if self.executor is not None:
+            for future in self.futures.values():
+                future.cancel()
+            self.executor.shutdown()
+        self.futures.clear()
+        self.item_filenames.clear()
+        docparser.clear_worker_results()
+
+def _file_task(filename, is_script, context, options):
+    """
+    Return the task that asks an introspection worker to introspect
+    the module or script with the given filename, whose parent
+    package's introspected doc is C{context}.
+    """
+    chain = []
+    while isinstance(context, ModuleDoc):
+        chain.append( (str(context.canonical_name), context.filename) )
+        context = context.package
+    is_package = (os.path.splitext(os.path.basename(filename))[0] ==
+                  '__init__')
+    return ('file', filename, is_script, tuple(chain) or None,
+            _submodules_option(is_package, options), tuple(sys.path))
+
+def _name_task(name, options):
+    """
+    Return the task that asks an introspection worker to introspect
+    the value with the given name.
+    """
+    return ('name', name, _submodules_option(True, options),
+            tuple(sys.path))
+
+def _submodules_option(is_package, options):
+    # Packages' submodules are imported before they are introspected,
+    # as _import_docs_from_items() does.
+    if is_package and options.add_submodules:
+        return (options.exclude_introspect,)
+    return None
+
+class _IntrospectionWorkers:
+    """
+    Used to import and introspect modules in a pool of long-lived
+    worker processes, so that this process never imports the code
+    being documented.  Each task is a tuple describing what to
+    introspect (see L{docintrospecter.introspect_in_worker()}).  A
+    package's modules are submitted when its submodules are listed,
+    and each result is loaded when the module would have been
+    introspected.  If a worker process dies, or takes longer than
+    L{docintrospecter.WORKER_TIMEOUT} seconds, then only the module it
+    was introspecting fails; and a new worker process is started.
+    """
+    def __init__(self, jobs):
+        import multiprocessing
+        self.context = multiprocessing.get_context()
+        self.jobs = jobs
+        self.main_modules = frozenset(sys.modules)
+        self.num_started = 0
+        self.queue = []      # Tasks that have not been started.
+        self.idle = []       # (process, conn) pairs.
+        self.running = {}    # conn -> (process, task, start time)
+        self.results = {}    # task -> bytes, or an error message.
+
+    def submit(self, task):
+        """
+        Start introspecting C{task} in a worker process, unless it
+        has already been submitted.
+        """
+        if (task in self.results or task in self.queue or
+            task in [t for (_, t, _) in self.running.values()]):
+            return
+        self.queue.append(task)
+        self._start_tasks()
+
+    def introspect(self, task):
+        """
+        Wait for the worker that is introspecting C{task} (submitting
+        it first if necessary), report any messages it logged, and
+        return the introspected C{ValueDoc}.
+
+        @raise ImportError: If the value could not be imported or
+            introspected.
+        """
+        self.submit(task)
+        while task not in self.results:
+            self._wait()
+        result = self.results.pop(task)
+        if isinstance(result, str):
+            # The worker may have been stopped while importing one of
+            # the package's submodules; so try again without them.
+            if task[-2] is not None:
+                return self.introspect(task[:-2] + (None, task[-1]))
+            raise ImportError(result)
+        try:
+            val_doc, error, records = docintrospecter.load_worker_result(
+                result)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            raise ImportError('Unable to load the introspected '
+                              'documentation: %s' % e)
+        log.replay(records)
+        if error is not None:
+            raise ImportError(error)
+        return val_doc
+
+    def _start_tasks(self):
+        while self.queue and (self.idle or
+                              len(self.running) < self.jobs):
+            if self.idle:
+                process, conn = self.idle.pop()
+            else:
+                process, conn = self._start_worker()
+            task = self.queue.pop(0)
+            conn.send(task)
+            self.running[conn] = (process, task, time.time())
+
+    def _start_worker(self):
+        conn, child_conn = self.context.Pipe()
+        self.num_started += 1
+        process = self.context.Process(
+            target=docintrospecter.worker_main,
+            args=(child_conn, self.num_started, self.main_modules,
+                  epydoc.DEBUG))
+        process.daemon = True
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    def _wait(self):
+        from multiprocessing.connection import wait
+        timeout = docintrospecter.WORKER_TIMEOUT
+        if timeout is not None:
+            start = min([t for (_, _, t) in self.running.values()])
+            timeout = max(0, start + timeout - time.time())
+        for conn in wait(list(self.running), timeout):
+            process, task, _ = self.running.pop(conn)
+            try:
+                self.results[task] = conn.recv_bytes()
+                self.idle.append( (process, conn) )
+            except (EOFError, OSError):
+                process.join()
+                conn.close()
+                self.results[task] = ('The worker process that was '
+                                      'importing it died (exit code %s)'
+                                      % process.exitcode)
+        if timeout is not None:
+            for conn, (process, task, start) in list(self.running.items()):
+                if time.time() - start >= docintrospecter.WORKER_TIMEOUT:
+                    del self.running[conn]
+                    process.kill()
+                    process.join()
+                    conn.close()
+                    self.results[task] = ('Importing it took longer than '
+                                          '%s seconds' %
+                                          docintrospecter.WORKER_TIMEOUT)
+        self._start_tasks()
+
+    def shutdown(self):
+        """
+        Stop the worker processes, and discard any results that were
+        not used.
+        """
+        for process, conn in self.idle:
+            try:
+                conn.send(None)
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        for conn, (process, task, start) in self.running.items():
+            process.kill()
+            conn.close()
+        for process, conn in self.idle:
+            process.join()
+        for process, task, start in self.running.values():
+            process.join()
+        self.idle = []
+        self.running = {}
+        self.queue = []
+        self.results = {}
+
+class _ParallelDocstringParser:
+    """
+    Used to parse docstrings using a pool of worker processes.  The
+    docstrings are submitted in batches, in the order in which
+    C{parse_docstring()} will process them; and C{docstringparser}
+    waits for each batch when its first docstring is needed.  Only
+    the markup is parsed by the workers: fields are processed, and
+    errors reported, by C{parse_docstring()} as usual.
+    """
+    BATCH_SIZE = 100
+    """The maximum number of docstrings in each batch."""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.executor = None
+        self.futures = []
+
+    def submit(self, valdocs, docindex):
+        """
+        Start parsing the docstrings of the given C{ValueDoc}s and
+        of their variables in worker processes.
+        """
+        items = []
+        # Skip docstrings whose results are already cached.
+        keys = set(docstringparser.PARSED_DOCSTRING_CACHE or ())
+        for api_doc in self._api_docs(valdocs):
+            item = docstringparser.predict_parse(api_doc, docindex)
+            if item is not None and item[0] not in keys:
+                keys.add(item[0])
+                items.append(item)
+        if not items: return
+
+        from concurrent.futures import ProcessPoolExecutor
+        self.executor = ProcessPoolExecutor(
+            self.jobs, initializer=docstringparser.init_worker,
+            initargs=(epydoc.DEBUG,))
+        batch_size = max(1, min(self.BATCH_SIZE,
+                                len(items) // (self.jobs*4)))
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start+batch_size]
+            future = self.executor.submit(
+                docstringparser.parse_docstrings_in_worker, batch)
+            self.futures.append(future)
+            docstringparser.add_worker_parses(
+                [item[0] for item in batch], future.result)
+
+    def _api_docs(self, valdocs):
+        """
+        Generate the C{APIDoc}s whose docstrings will be parsed, in
+        the order in which C{parse_docstring()} will parse them.
+        """
+        for val_doc in valdocs:
+            # A class's __init__ method is parsed with the class.
+            if isinstance(val_doc, ClassDoc):
+                initvar = val_doc.variables.get('__init__')
+                if initvar and isinstance(initvar.value, RoutineDoc):
+                    yield initvar.value
+            yield val_doc
+            if (isinstance(val_doc, NamespaceDoc) and
+                val_doc.variables not in (None, UNKNOWN)):
+                for var_doc in val_doc.variables.values():
+                    yield var_doc
+
+    def shutdown(self):
+        """
+        Stop the worker processes, and discard any results that were
+        not used.
+        """
+        if self.executor is not None:
+            for future in self.futures:
+                future.cancel()
+            self.executor.shutdown()
+        self.futures = []
+        docstringparser.clear_worker_parses()
+
 #/////////////////////////////////////////////////////////////////
 # Progress Estimation (for Documentation Generation)
 #/////////////////////////////////////////////////////////////////
@@ -1178,21 +1721,43 @@ C{DottedName('%s-%s' % (n, str(_unreachable_names[n]+1))}"""
 def assign_canonical_names(val_doc, name, docindex, score=0):
     """
     Assign a canonical name to C{val_doc} (if it doesn't have one
-    already), and (recursively) to each variable in C{val_doc}.
-    In particular, C{val_doc} will be assigned the canonical name
-    C{name} iff either:
+    already), and to each value that is reachable from C{val_doc}
+    (via variables, or via other links).  In particular, C{val_doc}
+    will be assigned the canonical name C{name} iff either:
       - C{val_doc}'s canonical name is C{UNKNOWN}; or
       - C{val_doc}'s current canonical name was assigned by this
         method; but the score of the new name (C{score}) is higher
         than the score of the current name (C{score_dict[val_doc]}).
-        
+
+    The values are visited depth-first, using an explicit stack of
+    L{_visit_canonical_names()} generators rather than recursion, so
+    deeply nested packages do not reach Python's recursion limit.
+
     Note that canonical names will even be assigned to values
     like integers and C{None}; but these should be harmless.
     """
+    stack = [_visit_canonical_names(val_doc, name, docindex, score)]
+    while stack:
+        try:
+            args = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+        else:
+            stack.append(_visit_canonical_names(*args))
+
+def _visit_canonical_names(val_doc, name, docindex, score):
+    """
+    Assign the canonical name C{name} to C{val_doc} (see
+    L{assign_canonical_names()}); and generate the arguments for
+    visiting each value that is reachable from it, in order.  Each
+    value must be visited before the next one is generated.
+    """
     # If we've already visited this node, and our new score
     # doesn't beat our old score, then there's nothing more to do.
-    # Note that since score increases strictly monotonically, this
-    # also prevents us from going in cycles.
+    # The score of each variable's name is lower than the
+    # score of its container's name, and other links always get a
+    # low fixed score; so this also prevents us from going in
+    # cycles.
     if val_doc in _name_scores and score <= _name_scores[val_doc]:
         return
 
@@ -1212,7 +1777,7 @@ def assign_canonical_names(val_doc, name, docindex, score=0):
             val_doc.canonical_name = name
             _name_scores[val_doc] = score
 
-    # Recurse to any contained values.
+    # Visit any contained values.
     if isinstance(val_doc, NamespaceDoc):
         for var_doc in val_doc.variables.values():
             # Set the variable's canonical name.
@@ -1239,13 +1804,12 @@ def assign_canonical_names(val_doc, name, docindex, score=0):
             if var_doc.is_alias is UNKNOWN: vardoc_score -= 10
             elif var_doc.is_alias: vardoc_score -= 1000
             
-            assign_canonical_names(var_doc.value, varname,
-                                   docindex, vardoc_score)
+            yield (var_doc.value, varname, docindex, vardoc_score)
 
-    # Recurse to any directly reachable values.
+    # Visit any directly reachable values.
     for val_doc_2 in val_doc.apidoc_links(variables=False):
         val_name, val_score = _unreachable_name_for(val_doc_2, docindex)
-        assign_canonical_names(val_doc_2, val_name, docindex, val_score)
+        yield (val_doc_2, val_name, docindex, val_score)
 
 def _var_shadows_self(var_doc, varname):
     return (var_doc.value not in (None, UNKNOWN) and
@@ -1309,26 +1873,53 @@ def _unreachable_name_for(val_doc, docindex):
 ## Documentation Inheritance
 ######################################################################
 
-def find_overrides(class_doc):
+def find_overrides(class_doc, mro_cache=None, definitions_cache=None):
     """
     Set the C{overrides} attribute for all variables in C{class_doc}.
     This needs to be done early (before docstring parsing), so we can
     know which docstrings to suppress warnings for.
+
+    @param mro_cache: A dictionary used to memoize the method
+        resolution orders of classes between calls (see
+        L{ClassDoc.mro()}).
+    @param definitions_cache: A dictionary used to memoize the
+        variables defined by classes between calls (see
+        L{_mro_definitions()}).  It should only be shared between
+        calls that are made while the classes' variables are not
+        modified.
     """
-    for base_class in list(class_doc.mro(warn_about_bad_bases=True)):
-        if base_class == class_doc: continue
-        if base_class.variables is UNKNOWN: continue
-        for name, var_doc in base_class.variables.items():
-            if ( not (name.startswith('__') and not name.endswith('__')) and
-                 base_class == var_doc.container and
-                 name in class_doc.variables and 
-                 class_doc.variables[name].container==class_doc and
-                 class_doc.variables[name].overrides is UNKNOWN ):
-                class_doc.variables[name].overrides = var_doc
+    if class_doc.variables is UNKNOWN: return
+    if mro_cache is None: mro_cache = {}
+    mro = class_doc.mro(warn_about_bad_bases=True, cache=mro_cache)
+    definitions = _mro_definitions(class_doc, mro, mro_cache,
+                                   definitions_cache)
+    for name, var_doc in class_doc.variables.items():
+        if ( var_doc.overrides is UNKNOWN and
+             var_doc.container == class_doc ):
+            var_docs = definitions.get(name, ())
+            # The first definition is var_doc itself.
+            if len(var_docs) > 1 and var_docs[0] is var_doc:
+                var_doc.overrides = var_docs[1]
     
-    
-def inherit_docs(class_doc, inherit_from_object):
-    for base_class in list(class_doc.mro(warn_about_bad_bases=True)):
+def inherit_docs(class_doc, inherit_from_object, mro_cache=None,
+                 definitions_cache=None):
+    """
+    Add the variables that C{class_doc} inherits from its base
+    classes to C{class_doc}, and copy documentation from the
+    variables that they override to the variables that it defines.
+
+    @param mro_cache: A dictionary used to memoize the method
+        resolution orders of classes between calls (see
+        L{ClassDoc.mro()}).
+    @param definitions_cache: A dictionary used to memoize the
+        variables defined by classes between calls (see
+        L{_mro_definitions()}).  It should only be shared between
+        calls that are made while the classes' variables are not
+        modified (other than by C{inherit_docs} itself).
+    """
+    if mro_cache is None: mro_cache = {}
+    mro = class_doc.mro(warn_about_bad_bases=True, cache=mro_cache)
+    for base_class in list(mro):
         if base_class == class_doc: continue
         if base_class.pyval is object and not inherit_from_object: continue
 
@@ -1339,31 +1930,173 @@ def inherit_docs(class_doc, inherit_from_object):
             class_doc.group_specs += [gs for gs in base_class.group_specs
                                       if gs not in class_doc.group_specs]
 
-        # Inherit any variables.
-        if base_class.variables is UNKNOWN: continue
-        for name, var_doc in base_class.variables.items():
-            # If it's a __private variable, then don't inherit it.
-            if name.startswith('__') and not name.endswith('__'):
-                continue
-            
-            # Inhetit only from the defining class. Or else, in case of
-            # multiple inheritance, we may import from a grand-ancestor
-            # variables overridden by a class that follows in mro.
-            if base_class != var_doc.container:
+    # Inherit any variables.  Only the variables that each base class
+    # defines itself are considered.  Or else, in case of multiple
+    # inheritance, we may import from a grand-ancestor variables
+    # overridden by a class that follows in mro.
+    definitions = _mro_definitions(class_doc, mro, mro_cache,
+                                   definitions_cache)
+    for name, var_docs in definitions.items():
+        # Skip class_doc's own definition.
+        local_var = class_doc.variables.get(name)
+        if local_var is var_docs[0]:
+            var_docs = var_docs[1:]
+        for var_doc in var_docs:
+            if var_doc.container.pyval is object and not inherit_from_object:
                 continue
-            
+
             # If class_doc doesn't have a variable with this name,
             # then inherit it.
-            if name not in class_doc.variables:
-                class_doc.variables[name] = var_doc
+            if local_var is None:
+                class_doc.variables[name] = local_var = var_doc
 
             # Otherwise, class_doc already contains a variable
             # that shadows var_doc.  But if class_doc's var is
             # local, then record the fact that it overrides
             # var_doc.
-            elif class_doc.variables[name].container==class_doc:
-                class_doc.variables[name].overrides = var_doc
-                _inherit_info(class_doc.variables[name])
+            elif local_var.container==class_doc:
+                local_var.overrides = var_doc
+                _inherit_info(local_var)
+
+def _mro_definitions(class_doc, mro=None, mro_cache=None,
+                     definitions_cache=None):
+    """
+    Return a dictionary mapping the name of each variable that is
+    defined by C{class_doc} or one of its ancestors to a tuple of
+    the C{VariableDoc}s that define it, in method resolution order.
+    Only the variables that each class defines itself are included;
+    and C{__private} variables are not included.  The dictionary is
+    ordered by the position of each name's first definition.
+
+    The dictionary for each class is built from the dictionaries for
+    its bases (when their method resolution orders are consistent
+    with the class's), which are memoized in C{definitions_cache};
+    so the classes of a hierarchy share the work of looking up the
+    variables that they inherit.  The dictionaries (and the tuples
+    they contain) must not be modified.
+
+    @param mro: C{class_doc}'s method resolution order, if it has
+        already been computed.
+    @param mro_cache: A dictionary used to memoize method resolution
+        orders (see L{ClassDoc.mro()}).
+    @param definitions_cache: A dictionary mapping each class to a
+        tuple C{(mro, definitions)}, or to C{None} while the class's
+        definitions are being computed.
+    """
+    if mro_cache is None: mro_cache = {}
+    if definitions_cache is None: definitions_cache = {}
+    cached = definitions_cache.get(class_doc)
+    if cached is not None: return cached[1]
+    # Mark this class as in progress, in case its bases are cyclic.
+    definitions_cache[class_doc] = None
+
+    if mro is None: mro = class_doc.mro(cache=mro_cache)
+    mro = list(mro)
+    # Two APIDocs are equal iff they share a __dict__.
+    position = dict([(id(cls.__dict__), i) for (i, cls) in enumerate(mro)])
+    if mro_cache.get(class_doc) is ValueError:
+        # class_doc's mro is inconsistent (see ClassDoc.mro()), and
+        # so might its bases' be; don't look them up, since that
+        # would report them again.
+        base_definitions = None
+    else:
+        base_definitions = _base_definitions(class_doc, mro, position,
+                                             mro_cache, definitions_cache)
+
+    definitions = {}
+    for name, var_doc in _local_variables(class_doc):
+        definitions[name] = (var_doc,)
+    if base_definitions is None:
+        # Fall back to looking at each class in the mro.
+        for cls in mro[1:]:
+            for name, var_doc in _local_variables(cls):
+                definitions[name] = definitions.get(name, ()) + (var_doc,)
+    elif len(base_definitions) == 1:
+        for name, var_docs in base_definitions[0].items():
+            if name in definitions:
+                definitions[name] += var_docs
+            else:
+                definitions[name] = var_docs
+    else:
+        # Merge the bases' definitions of each name, in mro order.
+        inherited = {}
+        for base_defs in base_definitions:
+            for name, var_docs in base_defs.items():
+                old_var_docs = inherited.get(name)
+                if old_var_docs is None:
+                    inherited[name] = var_docs
+                elif old_var_docs is not var_docs:
+                    merged = dict([(id(v), v) for v in
+                                   old_var_docs + var_docs])
+                    inherited[name] = tuple(sorted(
+                        merged.values(), key=lambda v:
+                        position[id(v.container.__dict__)]))
+        # Every base whose mro contains the class that first defines
+        # a name agrees that it is the first definition; and lists
+        # that class's names in the order it defines them.  So
+        # gather the names by the class that first defines them.
+        by_class = [[] for cls in mro]
+        added = set()
+        for base_defs in base_definitions:
+            for name, var_docs in base_defs.items():
+                first = inherited[name][0]
+                if name not in added and first is var_docs[0]:
+                    added.add(name)
+                    by_class[position[id(first.container.__dict__)]
+                             ].append(name)
+        for names in by_class:
+            for name in names:
+                if name in definitions:
+                    definitions[name] += inherited[name]
+                else:
+                    definitions[name] = inherited[name]
+
+    definitions_cache[class_doc] = (mro, definitions)
+    return definitions
+
+def _base_definitions(class_doc, mro, position, mro_cache,
+                      definitions_cache):
+    """
+    Return a list of the L{_mro_definitions()} dictionaries of
+    C{class_doc}'s bases; or C{None} if they can't be used to build
+    C{class_doc}'s dictionary, because the bases' method resolution
+    orders are not consistent with C{class_doc}'s (C{mro}).
+
+    @param position: A dictionary mapping the C{id} of the
+        C{__dict__} of each class in C{mro} to its index.
+    """
+    if class_doc.bases is UNKNOWN: return None
+    base_definitions = []
+    covered = set()
+    for base in class_doc.bases:
+        if not isinstance(base, ClassDoc): continue
+        if (id(base.__dict__) not in position or
+            (base in definitions_cache and
+             definitions_cache[base] is None)):
+            return None
+        base_definitions.append(_mro_definitions(
+            base, None, mro_cache, definitions_cache))
+        # Each base's mro must be a subsequence of class_doc's mro.
+        last = 0
+        for cls in definitions_cache[base][0]:
+            i = position.get(id(cls.__dict__), 0)
+            if i <= last: return None
+            covered.add(i)
+            last = i
+    # And together, they must cover it.
+    if len(covered) != len(mro)-1: return None
+    return base_definitions
+
+def _local_variables(class_doc):
+    """
+    Return a list of C{(name, var_doc)} pairs for the variables that
+    are defined by C{class_doc} itself (and not inherited), except
+    for C{__private} variables.
+    """
+    if class_doc.variables is UNKNOWN: return []
+    return [(name, var_doc) for (name, var_doc) in class_doc.variables.items()
+            if var_doc.container == class_doc and
+            not (name.startswith('__') and not name.endswith('__'))]
 
 _INHERITED_ATTRIBS = [
     'descr', 'summary', 'metadata', 'extra_docstring_fields',
@@ -26,7 +26,7 @@ __docformat__ = 'epytext en'
 ######################################################################
 
 import importlib
-import inspect, re, sys, os.path
+import inspect, re, sys, os.path, io, pickle, copyreg
 # API documentation encoding:
 from epydoc.apidoc import *
 # Type comparisons:
@@ -37,6 +37,8 @@ from epydoc import log
 from epydoc.util import *
 # For extracting encoding for docstrings:
 import epydoc.docparser
+# For finding the line numbers of docstrings:
+from epydoc.sourcecache import get_source, update_linecache
 # Builtin values
 import builtins
 
@@ -58,6 +60,14 @@ _introspected_values = {}
 """A record which values we've introspected, encoded as a dictionary from
 pyid to C{bool}."""
 
+_class_ranks = {}
+"""A dictionary mapping the C{id} of each C{ClassDoc} to the order in
+which its class was introspected (counting from 0).  When classes are
+introspected by worker processes, this is the order in which this
+process would have introspected them; and each class's list of
+subclasses is kept in this order, so that it does not depend on
+which worker introspected which class."""
+
 def clear_cache():
     """
     Discard any cached C{APIDoc} values that have been computed for
@@ -65,6 +75,9 @@ def clear_cache():
     """
     _valuedoc_cache.clear()
     _introspected_values.clear()
+    _worker_docs.clear()
+    _reported_value_keys.clear()
+    _class_ranks.clear()
 
 ######################################################################
 ## Introspection
@@ -119,6 +132,8 @@ def introspect_docs(value=None, name=None, filename=None, context=None,
         if is_script and filename is not None:
             _valuedoc_cache[pyid].canonical_name = DottedName(
                 munge_script_name(str(filename)))
+        if _class_order is not None:
+            _class_order.extend(_value_classes.get(pyid, ()))
         return _valuedoc_cache[pyid]
 
     # Create an initial value doc for this value & add it to the cache.
@@ -127,7 +142,13 @@ def introspect_docs(value=None, name=None, filename=None, context=None,
     # Introspect the value.
     _introspected_values[pyid] = True
     introspect_func = _get_introspecter(value)
-    introspect_func(value, val_doc, module_name=module_name)
+    if _class_order is None:
+        introspect_func(value, val_doc, module_name=module_name)
+    else:
+        start = len(_class_order)
+        introspect_func(value, val_doc, module_name=module_name)
+        if len(_class_order) > start:
+            _value_classes[pyid] = _unique_docs(_class_order[start:])
 
     # Set canonical name, if it was given
     if val_doc.canonical_name is UNKNOWN and name is not None:
@@ -156,10 +177,7 @@ def _get_valuedoc(value):
     pyid = id(value)
     val_doc = _valuedoc_cache.get(pyid)
     if val_doc is None:
-        try:
-            canonical_name = get_canonical_name(value, strict=True)
-        except DottedName.InvalidDottedName:
-            canonical_name = UNKNOWN
+        canonical_name = _new_valuedoc_name(value)
         val_doc = ValueDoc(pyval=value, canonical_name = canonical_name,
                            docs_extracted_by='introspecter')
         _valuedoc_cache[pyid] = val_doc
@@ -178,6 +196,38 @@ def _get_valuedoc(value):
             
     return val_doc
 
+def _new_valuedoc_name(value):
+    """
+    Return the canonical name of a new C{ValueDoc} for C{value}.
+    Helper for L{_get_valuedoc()}.
+
+    In a worker process, any messages that are logged about a value
+    that is identified by its name are recorded as a single
+    C{('value_messages', key, records)} record, so that the main
+    process reports them only once (see L{_value_messages()}).  While
+    the main process is loading a worker's result, those messages are
+    discarded, since the worker reports them.
+    """
+    if _task_recorder is not None or _loading_worker_result:
+        recorder = log.MessageRecorder()
+        log.start_recording(recorder)
+    else:
+        recorder = None
+    try:
+        return get_canonical_name(value, strict=True)
+    except DottedName.InvalidDottedName:
+        return UNKNOWN
+    finally:
+        if recorder is not None:
+            log.end_recording()
+            if recorder.records and _task_recorder is not None:
+                key = _value_key(value)
+                if key is None:
+                    log.replay(recorder.records)
+                else:
+                    _task_recorder.records.append(
+                        ('value_messages', key, recorder.records))
+
 #////////////////////////////////////////////////////////////
 # Module Introspection
 #////////////////////////////////////////////////////////////
@@ -410,6 +460,7 @@ def introspect_class(cls, class_doc, module_name=None):
                 basedoc = introspect_docs(base)
                 class_doc.bases.append(basedoc)
                 basedoc.subclasses.append(class_doc)
+            _record_class_order(class_doc)
             
             bases.reverse()
             for base in bases:
@@ -1013,7 +1064,7 @@ def introspect_docstring_lineno(api_doc):
         return api_doc.docstring_lineno
     if isinstance(api_doc, ValueDoc) and api_doc.pyval is not UNKNOWN:
         try:
-            lines, lineno = inspect.findsource(api_doc.pyval)
+            lines, lineno = _find_source(api_doc.pyval)
             if not isinstance(api_doc, ModuleDoc): lineno += 1
             for lineno in range(lineno, len(lines)):
                 if lines[lineno].split('#', 1)[0].strip():
@@ -1028,6 +1079,46 @@ def introspect_docstring_lineno(api_doc):
                         % api_doc.canonical_name)
     return None
 
+def _find_source(pyval):
+    """
+    Return C{(lines, lineno)}, where C{lines} are the lines of the
+    source file that defines C{pyval}, and C{lineno} is the index of
+    the line where its definition starts; as C{inspect.findsource()}
+    does.  For modules and functions, the lines come from the source
+    cache (L{epydoc.sourcecache}), and only the lines that are used
+    are decoded.
+
+    @raise IOError: If the source code can not be found.
+    @raise TypeError: If C{pyval} does not have source code.
+    """
+    func = getattr(pyval, '__func__', pyval)
+    if inspect.ismodule(pyval) or inspect.isfunction(func):
+        filename = inspect.getsourcefile(pyval)
+        if filename:
+            source = get_source(filename)
+            if source.decode_error is not None:
+                raise IOError('could not decode %s' % filename)
+            lines = source.lines
+            if not lines:
+                raise IOError('could not get source code')
+            if inspect.ismodule(pyval):
+                return lines, 0
+            lineno = func.__code__.co_firstlineno - 1
+            if lineno >= len(lines):
+                raise IOError('lineno is out of bounds')
+            # Look backwards for the start of the definition.
+            while lineno > 0 and not _DEFINITION_START_RE.match(lines[lineno]):
+                lineno -= 1
+            return lines, lineno
+    # Let inspect use the source file that the parser read.
+    update_linecache(inspect.getsourcefile(pyval))
+    return inspect.findsource(pyval)
+
+_DEFINITION_START_RE = re.compile(
+    r'^(\s*def\s)|(\s*async\s+def\s)|(.*(?<!\w)lambda(:|\s))|^(\s*@)')
+"""The regular expression that C{inspect.findsource()} uses to find the
+start of a function's definition."""
+
 class _DevNull:
     """
     A "file-like" object that discards anything that is written and
@@ -1053,6 +1144,695 @@ class _DevNull:
     xreadlines = readlines
 _dev_null = _DevNull()
     
+######################################################################
+## Introspection Workers
+######################################################################
+# When modules are introspected in worker processes, each worker
+# imports and introspects modules as usual, and sends the resulting
+# ValueDocs back to the main process.  Each ValueDoc is identified by
+# a key, so that the docs that different workers generate for the
+# same value are merged.  The key is the value's name: its module and
+# qualified name, or the module and variable that it is assigned to
+# (see _value_path).  Any messages that are logged when a worker first
+# finds a value that has a key are only reported once by the main
+# process.  A ValueDoc's state is only sent the first time a worker
+# refers to it, or when it is introspected after having been sent as
+# a preliminary ValueDoc.  Values that belong to modules
+# that were already imported by the main process when the workers
+# were started (e.g., builtins and the standard library modules used
+# by epydoc) are looked up and introspected by the main process
+# itself, so they share their ValueDocs with it; and so are constants
+# that every module shares, such as None and True.  Each worker also
+# sends the order in which it introspected classes, which the main
+# process uses to keep subclass lists in the order that it would have
+# built them if it had introspected every module itself.
+
+WORKER_TIMEOUT = None
+"""The maximum number of seconds that an introspection worker process
+may spend importing and introspecting a single module.  If a worker
+takes longer, then it is stopped, and the module is reported as
+having failed to import.  C{None} means no limit."""
+
+_worker_docs = {}
+"""A dictionary mapping the keys of the C{ValueDoc}s that were sent by
+worker processes to C{[val_doc, introspected, restored]} lists, where
+C{introspected} is true if the worker had introspected the value;
+and C{restored} is true once C{val_doc}'s state has been received."""
+
+_reported_value_keys = set()
+"""The keys of the values whose messages have been reported by the
+main process (see L{_value_messages()})."""
+
+_worker_id = None
+"""An identifier for this worker process, used in the keys of values
+that can not be identified by name."""
+
+_task_recorder = None
+"""While this worker process is introspecting a task, the
+L{log.MessageRecorder} that records the task's messages."""
+
+_global_paths = {}
+"""A dictionary mapping the C{id} of each value that is assigned to a
+variable of an imported module (other than modules, classes, and
+routines) to C{(value, sort_key, path)}, where C{path} is
+C{('object', module, name)} (see L{_global_path()})."""
+
+_global_path_modules = set()
+"""The names of the modules whose variables are in L{_global_paths}."""
+
+_main_modules = frozenset()
+"""The names of the modules that were imported by the main process
+when this worker process was started."""
+
+_worker_doc_keys = {}
+"""A dictionary mapping the C{id} of each C{ValueDoc} that this worker
+has sent to C{(val_doc, key, introspected)}."""
+
+_class_order = None
+"""While this worker process is introspecting a task, a list of the
+C{ClassDoc}s in the order that their classes were introspected.  When
+an introspected value is found in the cache, the classes that were
+introspected for it are listed again (see L{_value_classes}); so the
+list is the same as if the worker had not introspected any other
+tasks.  The main process uses it to find the order in which it would
+have introspected the classes (see L{_class_ranks})."""
+
+_value_classes = {}
+"""A dictionary mapping the pyid of each value that this worker
+process has introspected to the C{ClassDoc}s that were added to
+L{_class_order} while introspecting it, if any."""
+
+_loading_worker_result = False
+"""True while L{load_worker_result()} is loading a worker's result.
+Classes that are introspected by this process while loading a result
+are ranked by the result's list of classes, rather than by the
+order in which they were introspected."""
+
+def _record_class_order(class_doc):
+    """
+    Record that C{class_doc}'s class has been introspected, and added
+    to the subclass lists of its bases.
+    """
+    if _class_order is not None:
+        _class_order.append(class_doc)
+    elif not _loading_worker_result:
+        _class_ranks.setdefault(id(class_doc), len(_class_ranks))
+
+def _unique_docs(docs):
+    """
+    Return a list of the C{APIDoc}s in C{docs}, without repeating any
+    of them.
+    """
+    seen = set()
+    return [doc for doc in docs
+            if not (id(doc) in seen or seen.add(id(doc)))]
+
+def _sort_subclasses(class_doc):
+    """
+    Sort C{class_doc}'s list of subclasses by their L{_class_ranks}.
+    """
+    if isinstance(class_doc, ClassDoc) and isinstance(class_doc.subclasses,
+                                                      list):
+        last = len(_class_ranks)
+        class_doc.subclasses.sort(key=lambda c: _class_ranks.get(id(c), last))
+
+class _ValueProxy:
+    """
+    A stand-in for a value that can not be sent from a worker process
+    to the main process.  Its C{repr} is the value's C{repr}, so it is
+    displayed in the same way as the value itself.
+    """
+    def __init__(self, value):
+        try:
+            self._repr = repr(value)
+            if not isinstance(self._repr, str):
+                self._repr = str(self._repr)
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            self._repr = None
+        try:
+            name = value.__name__
+        except Exception:
+            name = None
+        if isinstance(name, str):
+            self.__name__ = name
+
+    def __repr__(self):
+        if self._repr is None:
+            raise ValueError('repr() failed')
+        return self._repr
+
+class _ValueRef:
+    """
+    A reference to a value that belongs to a module that is imported
+    by the main process, identified by C{(kind, module, qualname)}.
+    """
+    def __init__(self, path):
+        self.path = path
+
+def init_worker(worker_id, main_modules, debug):
+    """
+    Initialize a worker process that will be used to introspect
+    modules with L{introspect_in_worker()}.
+
+    @param worker_id: A unique identifier for this worker process.
+    @param main_modules: The names of the modules that are imported
+        by the main process.
+    @param debug: The value of C{epydoc.DEBUG} in the main process.
+    """
+    global _worker_id, _main_modules
+    _worker_id = worker_id
+    _main_modules = frozenset(main_modules) - set(['__main__'])
+    epydoc.DEBUG = debug
+    # Messages are recorded by introspect_in_worker(), and reported
+    # by the main process; discard any other messages.
+    log.start_recording(log.Logger())
+
+def worker_main(conn, worker_id, main_modules, debug):
+    """
+    The main loop of an introspection worker process: receive tasks
+    from C{conn}, and send back the results of L{introspect_in_worker()},
+    until C{None} is received.
+    """
+    init_worker(worker_id, main_modules, debug)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None: break
+        conn.send_bytes(introspect_in_worker(task))
+
+def introspect_in_worker(task):
+    """
+    Import and introspect a module or value, and return the result in
+    a form that can be sent back to the main process and passed to
+    L{load_worker_result()}.
+
+    @param task: C{('file', filename, is_script, context, submodules,
+        path)} or C{('name', name, submodules, path)}, where
+        C{context} is a tuple of C{(canonical_name, filename)} pairs
+        for the containing package and its ancestors (or C{None});
+        C{path} is the value of C{sys.path} in the main process; and
+        C{submodules} is C{None}, or a tuple C{(exclude_introspect,)}
+        if a package's submodules should be imported before it is
+        introspected (as the main process would have done), where
+        C{exclude_introspect} is the pattern used by
+        L{BuildOptions<docbuilder.BuildOptions>}.
+    @rtype: C{bytes}
+    """
+    global _class_order, _task_recorder
+    sys.path[:] = task[-1]
+    recorder = log.MessageRecorder()
+    log.start_recording(recorder)
+    _class_order, _task_recorder = [], recorder
+    try:
+        try:
+            if task[-2] is not None:
+                _import_submodules(task)
+            if task[0] == 'name':
+                val_doc = introspect_docs(name=task[1])
+            else:
+                val_doc = introspect_docs(
+                    filename=task[1], is_script=task[2],
+                    context=_context_stub(task[3]))
+            error = None
+        except ImportError as e:
+            val_doc, error = None, str(e)
+    finally:
+        log.end_recording()
+        class_order, _class_order = _unique_docs(_class_order), None
+        _task_recorder = None
+
+    out = io.BytesIO()
+    try:
+        _dump_worker_result(out, val_doc, error, recorder.records,
+                            class_order)
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        out = io.BytesIO()
+        error = 'Unable to send the introspected documentation: %s' % e
+        _dump_worker_result(out, None, error, recorder.records, [])
+    return out.getvalue()
+
+def _import_submodules(task):
+    """
+    Import the package that C{task} asks to introspect, along with all
+    of its submodules.
+    """
+    from epydoc import docbuilder
+    options = docbuilder.BuildOptions(parse=False,
+                                      exclude_introspect=task[-2][0])
+    if task[0] == 'name':
+        docbuilder._import_docs_from_items([task[1]], options)
+    else:
+        value = docbuilder._do_import(task[1], options)
+        if inspect.ismodule(value):
+            docbuilder._import_docs_from_package(value, options)
+
+def _context_stub(context):
+    """
+    Return a chain of C{ModuleDoc}s with the canonical names and
+    filenames listed in C{context}, for L{get_value_from_filename()}.
+    """
+    if context is None: return None
+    name, filename = context[0]
+    return ModuleDoc(canonical_name=DottedName(name), filename=filename,
+                     package=_context_stub(context[1:] or None))
+
+def _dump_worker_result(out, val_doc, error, records, class_order):
+    """
+    Write the result of introspecting a value to C{out}, in the format
+    read by L{load_worker_result()}.
+
+    @param class_order: The C{ClassDoc}s that were introspected, in
+        order (see L{_class_order}).
+    """
+    pickler = _WorkerDocPickler(out)
+    try:
+        pickler.dump( (error, records) )
+        pickler.dump(val_doc)
+        pickler.dump(class_order)
+        while pickler.pending:
+            pickler.dump(pickler.pending.pop(0))
+        pickler.dump(None)
+    except:
+        # Nothing was sent, so undo any changes to _worker_doc_keys.
+        for doc_id, entry in reversed(pickler.sent):
+            if entry is None: del _worker_doc_keys[doc_id]
+            else: _worker_doc_keys[doc_id] = entry
+        raise
+
+class _WorkerDocPickler(pickle.Pickler):
+    """
+    A pickler used by worker processes to send C{ValueDoc}s to the
+    main process.  Each C{ValueDoc} is saved as a persistent reference
+    containing its key; and its state is saved separately (see
+    L{pending}) if it has not been sent yet.
+
+    @ivar pending: A list of C{('state', key, class, introspected,
+        state)} tuples for the C{ValueDoc}s whose state should be
+        sent.
+    @ivar sent: A list of C{(id, entry)} pairs, recording the previous
+        L{_worker_doc_keys} entry (or C{None}) for each C{ValueDoc}
+        whose entry was changed by this pickler.
+    """
+    def __init__(self, file):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.pending = []
+        self.sent = []
+
+    def persistent_id(self, obj):
+        if obj is UNKNOWN:
+            return 'UNKNOWN'
+        elif isinstance(obj, _ValueRef):
+            return ('value',) + obj.path
+        elif isinstance(obj, ValueDoc):
+            return self._doc_id(obj)
+        return None
+
+    def reducer_override(self, obj):
+        # Save APIDocs (other than ValueDocs, which are saved by
+        # reference) using their __dict__ directly.
+        if isinstance(obj, APIDoc):
+            return (copyreg.__newobj__, (type(obj),), obj.__dict__)
+        return NotImplemented
+
+    def _doc_id(self, val_doc):
+        pyval = val_doc.pyval
+        is_cached = (pyval is not UNKNOWN and
+                     _valuedoc_cache.get(id(pyval)) is val_doc)
+        introspected = (not is_cached or id(pyval) in _introspected_values)
+
+        # Values that are shared by every module in a process get a
+        # single ValueDoc in the main process, as they would if it
+        # had introspected them itself.
+        if is_cached and _is_shared_constant(pyval):
+            return ('const', pyval, introspected)
+
+        sent = _worker_doc_keys.get(id(val_doc))
+        if sent is not None:
+            key = sent[1]
+        else:
+            key = is_cached and _value_key(pyval) or None
+            if key is None:
+                key = ('worker', _worker_id, len(_worker_doc_keys))
+            _worker_doc_keys[id(val_doc)] = (val_doc, key, False)
+            self.sent.append( (id(val_doc), None) )
+
+        if key[0] == 'main':
+            return key + (introspected,)
+        if sent is None or (introspected and not sent[2]):
+            if sent is not None:
+                self.sent.append( (id(val_doc), sent) )
+            _worker_doc_keys[id(val_doc)] = (val_doc, key, introspected)
+            self.pending.append( ('state', key, type(val_doc), introspected,
+                                  _worker_doc_state(val_doc)) )
+        return ('doc', key)
+
+def _is_shared_constant(value):
+    """
+    Return true if C{value} is a constant that every module in a
+    process shares (such as C{None}, C{True}, small integers, and
+    interned strings), and that can be sent to the main process.
+    """
+    if value is None or value is True or value is False:
+        return True
+    if type(value) is int:
+        # Small integers are cached.
+        return int(repr(value)) is value
+    if type(value) is str:
+        # Look up an equal (but distinct) string in the table of
+        # interned strings.
+        return sys.intern((value+'.')[:-1]) is value
+    return False
+
+def _worker_doc_state(val_doc):
+    """
+    Return the state of C{val_doc} that should be sent to the main
+    process.  Its C{pyval} is replaced by the value returned by
+    L{_transport_value()}.
+    """
+    pyval = val_doc.pyval
+    if pyval is not UNKNOWN:
+        pyval = _transport_value(pyval)
+        # The docstring's line number is found using the value.
+        if (isinstance(pyval, _ValueProxy) and
+            val_doc.docstring not in (None, UNKNOWN)):
+            introspect_docstring_lineno(val_doc)
+    state = val_doc.__dict__.copy()
+    state.pop('_ValueDoc__pickle_state', None)
+    state['pyval'] = pyval
+    return state
+
+_PLAIN_TYPES = (type(None), bool, int, float, complex, str, bytes,
+                re.Pattern)
+_CONTAINER_TYPES = (tuple, list, set, frozenset)
+
+def _transport_value(value, depth=10, size=None):
+    """
+    Return a version of C{value} that can be sent to the main
+    process.  Numbers, strings, and regular expressions are sent as
+    they are; values that belong to the main process's modules are
+    replaced by L{_ValueRef}s; containers are copied, replacing their
+    contents in the same way; and anything else is replaced by a
+    L{_ValueProxy}.
+    """
+    if size is None: size = [1000]
+    typ = type(value)
+    if typ in _PLAIN_TYPES:
+        return value
+    key = _value_key(value)
+    if key is not None and key[0] == 'main':
+        return _ValueRef(key[1:])
+    size[0] -= 1
+    if depth > 0 and size[0] > 0:
+        if typ in _CONTAINER_TYPES:
+            return typ([_transport_value(v, depth-1, size) for v in value])
+        if typ is dict:
+            return dict([(_transport_value(k, depth-1, size),
+                          _transport_value(v, depth-1, size))
+                         for (k, v) in value.items()])
+    return _ValueProxy(value)
+
+def _value_key(value):
+    """
+    Return the key that identifies C{value} in every process (see
+    L{_value_path()}), with C{'main'} prepended if the main process
+    looks the value up itself; or C{None} if C{value} can not be
+    identified by name.
+    """
+    path = _value_path(value)
+    if path is not None and path[1] in _main_modules:
+        return ('main',) + path
+    return path
+
+def _value_path(value):
+    """
+    Return C{('module', name, None)} if C{value} is the module that
+    is imported as C{name} (which may differ from its C{__name__},
+    e.g. for C{_io}); or C{('object', module, qualname)} if
+    C{value} can be found by looking up C{qualname} in the module
+    named C{module}; or C{('object', module, name)} if C{value} is
+    assigned to the variable C{name} of the module named C{module}
+    (see L{_global_path()}); or C{None} otherwise.
+    """
+    try:
+        if inspect.ismodule(value):
+            name = value.__name__
+            if isinstance(name, str) and sys.modules.get(name) is value:
+                return ('module', name, None)
+            names = [name for (name, module) in list(sys.modules.items())
+                     if module is value and isinstance(name, str)]
+            if names:
+                return ('module', min(names), None)
+            return None
+        qualname = getattr(value, '__qualname__', None)
+        module = getattr(value, '__module__', None)
+        if module is None:
+            module = getattr(getattr(value, '__objclass__', None),
+                             '__module__', None)
+        if (isinstance(qualname, str) and isinstance(module, str) and
+            sys.modules.get(module) is not None and '<' not in qualname and
+            _lookup_qualname(module, qualname) is value):
+            return ('object', module, qualname)
+    except KeyboardInterrupt:
+        raise
+    except Exception:
+        pass
+    return _global_path(value)
+
+def _global_path(value):
+    """
+    Return C{('object', module, name)} if C{value} is assigned to the
+    variable C{name} of the imported module named C{module}; or
+    C{None} otherwise.  If several variables are assigned C{value},
+    then one in the module that defines the value's class is used if
+    possible, so that every worker process uses the same name for it
+    (e.g., C{email.contentmanager.raw_data_manager}, which
+    C{email.policy} imports).
+    """
+    if len(_global_path_modules) != len(sys.modules):
+        for module_name, module in list(sys.modules.items()):
+            if module_name in _global_path_modules: continue
+            _global_path_modules.add(module_name)
+            if isinstance(module_name, str) and inspect.ismodule(module):
+                _add_global_paths(module_name, module)
+    entry = _global_paths.get(id(value))
+    if entry is None or entry[0] is not value:
+        return None
+    path = entry[2]
+    # The variable may have been reassigned since it was recorded.
+    if getattr(sys.modules.get(path[1]), path[2], None) is not value:
+        return None
+    return path
+
+def _add_global_paths(module_name, module):
+    """
+    Add the variables of the given module to L{_global_paths}.
+    """
+    try:
+        items = list(vars(module).items())
+    except TypeError:
+        return
+    for name, val in items:
+        if (not isinstance(name, str) or name.startswith('__') or
+            isinstance(val, (type, ModuleType, FunctionType,
+                             BuiltinFunctionType))):
+            continue
+        home = getattr(type(val), '__module__', None)
+        sort_key = (module_name != home, module_name, name)
+        entry = _global_paths.get(id(val))
+        if entry is None or entry[0] is not val or sort_key < entry[1]:
+            _global_paths[id(val)] = (val, sort_key,
+                                      ('object', module_name, name))
+
+def _lookup_qualname(module, qualname):
+    """
+    Return the value named C{qualname} in the imported module named
+    C{module}.
+    """
+    value = sys.modules[module]
+    if qualname is not None:
+        for identifier in qualname.split('.'):
+            value = getattr(value, identifier)
+    return value
+
+def load_worker_result(data):
+    """
+    Read the result of L{introspect_in_worker()}, and merge the
+    C{ValueDoc}s it contains with those that were already received
+    from other workers.  Results should be loaded in the order that
+    the modules would have been introspected by this process, since
+    that order determines the order of the subclass lists.
+
+    @return: A tuple C{(val_doc, error, records)}, where C{val_doc} is
+        the introspected C{ValueDoc} (or C{None}); C{error} is the
+        message of the C{ImportError} that was raised (or C{None});
+        and C{records} are the messages that were logged, as
+        recorded by a L{log.MessageRecorder}.
+    @raise pickle.UnpicklingError: If C{data} can not be loaded.
+    """
+    global _loading_worker_result
+    unpickler = _WorkerDocUnpickler(io.BytesIO(data))
+    _loading_worker_result = True
+    try:
+        error, records = unpickler.load()
+        records = _value_messages(records)
+        val_doc = unpickler.load()
+        class_order = unpickler.load()
+        restored = _restore_worker_docs(unpickler)
+    finally:
+        _loading_worker_result = False
+
+    # Add the subclass & submodule links from docs that were sent by
+    # this worker to docs that were sent by other workers (or that
+    # were introspected by this process).
+    for doc in restored:
+        if isinstance(doc, ClassDoc) and isinstance(doc.bases, list):
+            for base in doc.bases:
+                if isinstance(base, ClassDoc):
+                    _add_links(base, 'subclasses', [doc])
+        if (isinstance(doc, ModuleDoc) and
+            isinstance(doc.package, ModuleDoc)):
+            _add_links(doc.package, 'submodules', [doc])
+
+    # Rank the classes that this worker introspected.  Results are
+    # loaded in the order that this process would have introspected
+    # the modules; so the classes are ranked in the order that it
+    # would have introspected them.  Then put the subclass lists that
+    # may have changed back in that order.
+    for doc in class_order:
+        _class_ranks.setdefault(id(doc), len(_class_ranks))
+    for doc in _unique_docs(restored + class_order):
+        if isinstance(doc, ClassDoc):
+            _sort_subclasses(doc)
+            if isinstance(doc.bases, list):
+                for base in doc.bases:
+                    _sort_subclasses(base)
+    return val_doc, error, records
+
+def _value_messages(records):
+    """
+    Return the messages recorded by a worker process, replacing each
+    C{('value_messages', key, records)} record with its C{records} if
+    they have not been reported yet, and removing it otherwise.  The
+    messages about a value that the main process looks up itself are
+    reported only if the main process has not already created a
+    C{ValueDoc} for it (and so reported them itself).
+    """
+    result = []
+    for record in records:
+        if record[0] != 'value_messages':
+            result.append(record)
+            continue
+        key, value_records = record[1:]
+        if key in _reported_value_keys:
+            continue
+        _reported_value_keys.add(key)
+        if key[0] == 'main':
+            try:
+                value = _lookup_qualname(key[2], key[3])
+            except Exception:
+                continue
+            if id(value) in _valuedoc_cache:
+                continue
+        result.extend(value_records)
+    return result
+
+def _restore_worker_docs(unpickler):
+    """
+    Read the states of the C{ValueDoc}s in a worker's result from
+    C{unpickler}, and restore them.  Return the restored C{ValueDoc}s.
+    """
+    restored = []
+    while True:
+        record = unpickler.load()
+        if record is None: break
+        _, key, cls, introspected, state = record
+        entry = _worker_docs[key]
+        if entry[2] and (entry[1] or not introspected):
+            continue
+        doc = entry[0]
+        # Keep any links that were added by other workers.
+        links = [(attr, doc.__dict__.get(attr))
+                 for attr in ('subclasses', 'submodules')]
+        doc.__dict__.clear()
+        doc.__dict__.update(state)
+        doc.__class__ = cls
+        for attr, docs in links:
+            if isinstance(docs, list):
+                _add_links(doc, attr, docs)
+        entry[1:] = [introspected, True]
+        restored.append(doc)
+    return restored
+
+def _add_links(val_doc, attr, docs):
+    """
+    Add each C{APIDoc} in C{docs} to C{val_doc}'s list attribute
+    C{attr}, unless it's already there.
+    """
+    current = getattr(val_doc, attr)
+    if not isinstance(current, list): return
+    for doc in docs:
+        if not [d for d in current if d is doc]:
+            current.append(doc)
+
+class _WorkerDocUnpickler(pickle.Unpickler):
+    """
+    An unpickler used to load the C{ValueDoc}s sent by a worker
+    process.  Only classes defined by epydoc itself, and the types
+    that are needed to load plain values, may be loaded; so loading a
+    result never imports any of the modules that were introspected.
+    """
+    SAFE_GLOBALS = set([('copyreg', '__newobj__'),
+                        ('copyreg', '_reconstructor'),
+                        ('builtins', 'object'), ('builtins', 'set'),
+                        ('builtins', 'frozenset'), ('builtins', 'complex'),
+                        ('re', '_compile')])
+
+    def persistent_load(self, pid):
+        if pid == 'UNKNOWN':
+            return UNKNOWN
+        elif pid[0] == 'doc':
+            entry = _worker_docs.get(pid[1])
+            if entry is None:
+                entry = _worker_docs[pid[1]] = [
+                    ValueDoc.__new__(ValueDoc), False, False]
+            return entry[0]
+        elif pid[0] == 'const':
+            value = pid[1]
+            if isinstance(value, str):
+                value = sys.intern(value)
+            if pid[2]:
+                return introspect_docs(value)
+            else:
+                return _get_valuedoc(value)
+        elif pid[0] in ('main', 'value'):
+            try:
+                value = _lookup_qualname(pid[2], pid[3])
+            except Exception:
+                raise pickle.UnpicklingError('%s not found in %s' %
+                                             (pid[3], pid[2]))
+            if pid[0] == 'value':
+                return value
+            elif pid[4]:
+                return introspect_docs(value)
+            else:
+                return _get_valuedoc(value)
+        else:
+            raise pickle.UnpicklingError('Invalid persistent id')
+
+    def find_class(self, module, name):
+        if (module, name) in self.SAFE_GLOBALS:
+            return pickle.Unpickler.find_class(self, module, name)
+        try:
+            return find_epydoc_class(module, name)
+        except ValueError as e:
+            raise pickle.UnpicklingError('%s' % e)
+
 ######################################################################
 ## Zope InterfaceClass
 ######################################################################
@@ -59,8 +59,10 @@ import token, tokenize
 import imp
 # File services:
 import os, os.path, sys
-# Unicode:
-import codecs
+# Reading source files:
+from epydoc.sourcecache import get_source
+# Parse cache & parallel parsing:
+import hashlib, pickle, copyreg, io, itertools, bisect, functools, array
 # API documentation encoding:
 from epydoc.apidoc import *
 # For looking up the docs of builtins:
@@ -86,6 +88,23 @@ C{_moduledoc_cache} is a dictionary mapping from filenames to
 C{ValueDoc} objects.
 @type: C{dict}"""
 
+_parse_stack = []
+"""The filenames of the modules that are currently being parsed,
+innermost last.  This is used to tell which module each message
+generated in a worker process belongs to.
+@type: C{list}"""
+
+_export_table_cache = {}
+"""A cache of the export tables that we've already created (see
+L{_parse_exports()}).  C{_export_table_cache} is a dictionary mapping
+from filenames to C{ModuleDoc} objects.
+@type: C{dict}"""
+
+_export_stack = []
+"""The filenames of the modules whose export tables are currently
+being built, innermost last.
+@type: C{list}"""
+
 #////////////////////////////////////////////////////////////
 # Configuration Constants
 #////////////////////////////////////////////////////////////
@@ -106,6 +125,23 @@ PARSE_WHILE_BLOCKS = False
 PARSE_FOR_BLOCKS = False
 """Should the contents of C{for} blocks be examined?"""
 
+#{ Configuration Constants: Function bodies
+SKIP_ROUTINE_BODIES = True
+"""Should the bodies of functions and methods be skipped, when they
+can not add to the documentation?  If true, then only the docstring
+(and any group markers) in a routine's body is examined, unless the
+body modifies C{__all__}, or it is a method's body that might assign
+to an instance variable (an attribute of the method's first
+argument).  The skipped lines are never tokenized, which makes
+parsing modules that contain long functions much faster."""
+INSTANCE_VARIABLE_METHODS = None
+"""If not C{None}, then a list of the names of the only methods whose
+bodies are examined for instance variables when
+L{SKIP_ROUTINE_BODIES} is true, such as C{['__init__', 'setUp']}.
+The bodies of all other methods are skipped, even if they assign to
+instance variables.  If C{None}, then the body of any method that
+might assign to an instance variable is examined."""
+
 #{ Configuration Constants: Imports
 IMPORT_HANDLING = 'link'
 """What should C{docparser} do when it encounters an import
@@ -177,6 +213,15 @@ END_GROUP_MARKER = '#}'
 """The prefix used to mark a comment that ends a group.  See
 L{START_GROUP_MARKER}."""
 
+#{ Configuration Constants: Parse cache
+PARSE_CACHE_DIR = None
+"""If not C{None}, then the name of a directory that C{parse_docs()}
+uses to store the C{ModuleDoc}s that it creates, so that later runs
+can reload them instead of re-parsing files that have not changed.
+Each cache entry is keyed on the module's filename and canonical
+name, the contents of its source file, the epydoc version, and the
+values of the parser's configuration constants."""
+
 #/////////////////////////////////////////////////////////////////
 #{ Module parser
 #/////////////////////////////////////////////////////////////////
@@ -234,81 +279,204 @@ def parse_docs(filename=None, name=None, context=None, is_script=False):
 
         # Check the cache, first.
         if filename in _moduledoc_cache:
+            _note_module_lookup(filename)
             return _moduledoc_cache[filename]
-        
-        log.info("Parsing %s" % filename)
-
-        # If the context wasn't provided, then check if the file is in
-        # a package directory.  If so, then update basedir & name to
-        # contain the topmost package's directory and the fully
-        # qualified name for this file.  (This update assume the
-        # default value of __path__ for the parent packages; if the
-        # parent packages override their __path__s, then this can
-        # cause us not to find the value.)
-        if context is None and not is_script:
-            basedir = os.path.split(filename)[0]
-            name = os.path.splitext(os.path.split(filename)[1])[0]
-            if name == '__init__':
-                basedir, name = os.path.split(basedir)
-            context = _parse_package(basedir)
 
-        # Figure out the canonical name of the module we're parsing.
-        if not is_script:
-            module_name, is_pkg = _get_module_name(filename, context)
-        else:
-            module_name = DottedName(munge_script_name(filename))
-            is_pkg = False
-
-        # Create a new ModuleDoc for the module, & add it to the cache.
-        module_doc = ModuleDoc(canonical_name=module_name, variables={},
-                               sort_spec=[], imports=[],
-                               filename=filename, package=context,
-                               is_package=is_pkg, submodules=[],
-                               docs_extracted_by='parser')
-        module_doc.defining_module = module_doc
-        _moduledoc_cache[filename] = module_doc
-
-        # Set the module's __path__ to its default value.
-        if is_pkg:
-            module_doc.path = [os.path.split(module_doc.filename)[0]]
-        
-        # Add this module to the parent package's list of submodules.
-        if context is not None:
-            context.submodules.append(module_doc)
+        _parse_stack.append(filename)
+        try:
+            return _parse_module_file(filename, context, is_script)
+        finally:
+            _parse_stack.pop()
+    else:
+        raise ValueError("Expected exactly one of the following "
+                         "arguments: name, filename")
 
+def _parse_module_file(filename, context, is_script):
+    """
+    Create a C{ModuleDoc} for the given (normalized) source filename,
+    add it to the cache, and populate it by parsing the file (or by
+    loading the result of parsing it from a worker process or from
+    the parse cache).  Helper for L{parse_docs()}.
+    """
+    log.info("Parsing %s" % filename)
+
+    # If the context wasn't provided, then check if the file is in
+    # a package directory.  If so, then update basedir & name to
+    # contain the topmost package's directory and the fully
+    # qualified name for this file.  (This update assume the
+    # default value of __path__ for the parent packages; if the
+    # parent packages override their __path__s, then this can
+    # cause us not to find the value.)
+    if context is None and not is_script:
+        basedir = os.path.split(filename)[0]
+        name = os.path.splitext(os.path.split(filename)[1])[0]
+        if name == '__init__':
+            basedir, name = os.path.split(basedir)
+        context = _parse_package(basedir)
+
+    # Figure out the canonical name of the module we're parsing.
+    if not is_script:
+        module_name, is_pkg = _get_module_name(filename, context)
+    else:
+        module_name = DottedName(munge_script_name(filename))
+        is_pkg = False
+
+    # Create a new ModuleDoc for the module, & add it to the cache.
+    module_doc = ModuleDoc(canonical_name=module_name, variables={},
+                           sort_spec=[], imports=[],
+                           filename=filename, package=context,
+                           is_package=is_pkg, submodules=[],
+                           docs_extracted_by='parser')
+    module_doc.defining_module = module_doc
+    _note_module_lookup(filename, 'parse')
+    _moduledoc_cache[filename] = module_doc
+
+    # Set the module's __path__ to its default value.
+    if is_pkg:
+        module_doc.path = [os.path.split(module_doc.filename)[0]]
+    
+    # Add this module to the parent package's list of submodules.
+    if context is not None:
+        context.submodules.append(module_doc)
+
+    # If this module was parsed by a worker process, then use the
+    # result that it sent back.
+    if filename in _worker_results:
+        if _load_worker_result(module_doc, _worker_results.pop(filename)):
+            return module_doc
+
+    # If we've got an up-to-date copy of this module in the parse
+    # cache, then use it instead of parsing the file.
+    if PARSE_CACHE_DIR is not None:
+        if _load_cached_module(module_doc):
+            return module_doc
+        # Record what parsing the module depends on, for the cache.
+        recorder = _ParseCacheRecorder(len(_parse_stack))
+        _cache_recorders.append(recorder)
+        log.start_recording(recorder)
+    try:
         # Tokenize & process the contents of the module's source file.
-        try:
-            process_file(module_doc)
-        except tokenize.TokenError as e:
-            msg, (srow, scol) = e.args
-            raise ParseError('Error during parsing: %s '
-                             '(%s, line %d, char %d)' %
-                             (msg, module_doc.filename, srow, scol))
-        except (IndentationError, UnicodeDecodeError) as e:
-            raise ParseError('Error during parsing: %s (%s)' %
-                             (e, module_doc.filename))
+        _process_module_file(module_doc)
 
         # Handle any special variables (__path__, __docformat__, etc.)
         handle_special_module_vars(module_doc)
+    finally:
+        if PARSE_CACHE_DIR is not None:
+            log.end_recording()
+            _cache_recorders.pop()
+            _replay_records(recorder.records, recorder.filenames)
 
-        # Return the completed ModuleDoc
-        return module_doc
-    else:
-        raise ValueError("Expected exactly one of the following "
-                         "arguments: name, filename")
+    # Save the ModuleDoc in the parse cache, for future runs.
+    if PARSE_CACHE_DIR is not None and recorder.cacheable:
+        _store_cached_module(module_doc, recorder)
+
+    # Return the completed ModuleDoc
+    return module_doc
 
-def _parse_package(package_dir):
+def _process_module_file(module_doc, exports_only=False):
+    """
+    Tokenize and process the contents of the given C{ModuleDoc}'s
+    source file; and convert any error from the tokenizer into a
+    L{ParseError}.
+
+    @param exports_only: If true, then just build the module's export
+        table (see L{_parse_exports()}).
+    """
+    try:
+        process_file(module_doc, exports_only=exports_only)
+    except tokenize.TokenError as e:
+        msg, (srow, scol) = e.args
+        raise ParseError('Error during parsing: %s '
+                         '(%s, line %d, char %d)' %
+                         (msg, module_doc.filename, srow, scol))
+    except (IndentationError, UnicodeDecodeError) as e:
+        raise ParseError('Error during parsing: %s (%s)' %
+                         (e, module_doc.filename))
+
+def _parse_package(package_dir, exports_only=False):
     """
     If the given directory is a package directory, then parse its
     __init__.py file (and the __init__.py files of all ancestor
     packages); and return its C{ModuleDoc}.
+
+    @param exports_only: If true, then just build the export tables of
+        the packages (see L{_parse_exports()}).
     """
     if not is_package_dir(package_dir):
         return None
     parent_dir = os.path.split(package_dir)[0]
-    parent_doc = _parse_package(parent_dir)
+    parent_doc = _parse_package(parent_dir, exports_only)
     package_file = os.path.join(package_dir, '__init__')
+    if exports_only:
+        return _parse_exports(package_file, parent_doc)
     return parse_docs(filename=package_file, context=parent_doc)
+
+def _parse_exports(filename, context=None):
+    """
+    Return a C{ModuleDoc} for the module with the given source
+    filename, that only describes the names it defines at the top
+    level, its C{__all__} list, and its C{__path__} (its I{export
+    table}).  This is used to find the names that are imported by a
+    C{from M{m} import *} statement, without parsing all of C{M{m}}.
+
+    An export table is built by L{process_file()}, but the bodies of
+    the module's classes and functions are skipped (unless they modify
+    C{__all__}), and its base classes are not looked up.  Any messages
+    that are generated while building it are discarded, since they
+    will be reported if the module itself is parsed.  Export tables
+    are kept in L{_export_table_cache}; they are not added to
+    C{_moduledoc_cache}, or to the submodules of their package.  If
+    the module has already been parsed, then its C{ModuleDoc} is
+    returned instead.
+
+    @param context: The C{ModuleDoc} (or export table) for the
+        package that contains C{filename}.
+    @rtype: L{ModuleDoc}
+    """
+    try:
+        filename = py_src_filename(filename)
+    except ValueError as e:
+        raise ImportError('%s' % e)
+
+    # Check the caches, first.
+    if filename in _moduledoc_cache:
+        _note_module_lookup(filename)
+        return _moduledoc_cache[filename]
+    if filename in _export_table_cache:
+        _note_module_lookup(filename)
+        return _export_table_cache[filename]
+
+    log.start_recording(log.Logger())
+    _export_stack.append(filename)
+    try:
+        # If the context wasn't provided, then find the export tables
+        # of the packages that contain the file (see _parse_module_file).
+        if context is None:
+            basedir = os.path.split(filename)[0]
+            name = os.path.splitext(os.path.split(filename)[1])[0]
+            if name == '__init__':
+                basedir, name = os.path.split(basedir)
+            context = _parse_package(basedir, exports_only=True)
+
+        # Create a new ModuleDoc for the export table, & cache it.
+        module_name, is_pkg = _get_module_name(filename, context)
+        module_doc = ModuleDoc(canonical_name=module_name, variables={},
+                               sort_spec=[], imports=[],
+                               filename=filename, package=context,
+                               is_package=is_pkg, submodules=[],
+                               docs_extracted_by='parser')
+        module_doc.defining_module = module_doc
+        _note_module_lookup(filename, 'exports')
+        _export_table_cache[filename] = module_doc
+        if is_pkg:
+            module_doc.path = [os.path.split(module_doc.filename)[0]]
+
+        _process_module_file(module_doc, exports_only=True)
+        handle_special_module_vars(module_doc)
+        return module_doc
+    finally:
+        _export_stack.pop()
+        log.end_recording()
         
 # Special vars:
 # C{__docformat__}, C{__all__}, and C{__path__}.
@@ -359,15 +527,623 @@ def _module_var_toktree(module_doc, name):
     else:
         return var_doc.value.toktree
 
+#////////////////////////////////////////////////////////////
+#{ Parse Cache
+#////////////////////////////////////////////////////////////
+
+_CONFIGURATION_CONSTANTS = (
+    'PARSE_TRY_BLOCKS', 'PARSE_EXCEPT_BLOCKS', 'PARSE_FINALLY_BLOCKS',
+    'PARSE_IF_BLOCKS', 'PARSE_ELSE_BLOCKS', 'PARSE_WHILE_BLOCKS',
+    'PARSE_FOR_BLOCKS', 'SKIP_ROUTINE_BODIES', 'INSTANCE_VARIABLE_METHODS',
+    'IMPORT_HANDLING', 'IMPORT_STAR_HANDLING',
+    'DEFAULT_DECORATOR_BEHAVIOR', 'PUBLIC_DECORATOR_APPENDS_TO_ALL',
+    'BASE_HANDLING', 'COMMENT_DOCSTRING_MARKER', 'START_GROUP_MARKER',
+    'END_GROUP_MARKER')
+"""The names of the configuration constants that affect the result
+of parsing a module."""
+
+_cache_recorders = []
+"""The L{_ParseCacheRecorder}s for the modules that are currently
+being parsed while L{PARSE_CACHE_DIR} is set, innermost last.
+@type: C{list}"""
+
+class _ModuleMessageRecorder(log.MessageRecorder):
+    """
+    A message recorder that also records which module was being
+    parsed when each message was generated.
+
+    @ivar filenames: A list containing the filename of the innermost
+        module being parsed (or C{None}) for each record.
+    """
+    def __init__(self):
+        log.MessageRecorder.__init__(self)
+        self.filenames = []
+    def log(self, level, message):
+        log.MessageRecorder.log(self, level, message)
+        self.filenames.append(_parse_stack and _parse_stack[-1] or None)
+    def start_block(self, header):
+        log.MessageRecorder.start_block(self, header)
+        self.filenames.append(_parse_stack and _parse_stack[-1] or None)
+    def end_block(self):
+        log.MessageRecorder.end_block(self)
+        self.filenames.append(_parse_stack and _parse_stack[-1] or None)
+
+class _ParseCacheRecorder(_ModuleMessageRecorder):
+    """
+    A message recorder that also records how parsing a module used
+    and changed the parser's state, so that loading the module from
+    the parse cache can reproduce the same state.
+
+    @ivar depth: The length of L{_parse_stack} while parsing the
+        module.
+    @ivar dependencies: A dictionary mapping the filename of each
+        other module that was looked up while parsing the module to
+        true if it had already been parsed when it was first looked
+        up, or false if it had not.
+    @ivar events: A list of C{(kind, filename)} tuples, in order, for
+        the modules that were first parsed (C{kind='parse'}) and the
+        export tables that were first built (C{kind='exports'}) while
+        parsing the module.
+    @ivar cacheable: False if a module was looked up while it was
+        still being parsed; in that case, the module's C{ModuleDoc}
+        depends on another module's incomplete C{ModuleDoc}, so it
+        is not saved in the cache.
+    """
+    def __init__(self, depth):
+        _ModuleMessageRecorder.__init__(self)
+        self.depth = depth
+        self.dependencies = {}
+        self.events = []
+        self.cacheable = True
+
+def _note_module_lookup(filename, event=None):
+    """
+    Record that the module with the given source filename was looked
+    up, in each L{_ParseCacheRecorder} in L{_cache_recorders}.
+
+    @param event: C{'parse'} if the module is about to be parsed, or
+        C{'exports'} if its export table is about to be built.
+    """
+    if not _cache_recorders: return
+    if filename in _parse_stack:
+        depth = _parse_stack.index(filename) + 1
+        for recorder in _cache_recorders:
+            if recorder.depth >= depth:
+                recorder.cacheable = False
+    is_parsed = filename in _moduledoc_cache
+    for recorder in _cache_recorders:
+        recorder.dependencies.setdefault(filename, is_parsed)
+        if event is not None:
+            recorder.events.append( (event, filename) )
+
+def _replay_records(records, filenames):
+    """
+    Report the messages that were recorded by a
+    L{_ModuleMessageRecorder}, as if they were generated while
+    parsing the modules that generated them.
+    """
+    for record, filename in zip(records, filenames):
+        _parse_stack.append(filename)
+        try:
+            log.replay([record])
+        finally:
+            _parse_stack.pop()
+
+class _UncacheableDoc(Exception):
+    """
+    An exception used to signify that a C{ModuleDoc} can not be saved
+    in the parse cache, because it refers to an C{APIDoc} that can
+    not be restored by a later run.
+    """
+
+def _parse_cache_key(module_doc, dependencies=()):
+    """
+    Return a string identifying the result of parsing the given
+    module's source file.  The key changes whenever the contents of
+    the file, the module's canonical name, the epydoc version, or the
+    parser's configuration constants change; or when the contents of
+    any of the modules in C{dependencies} change.
+
+    @param dependencies: A list of C{(filename, is_parsed)} tuples for
+        the modules that were looked up while parsing the module (see
+        L{_ParseCacheRecorder.dependencies}).
+    """
+    config = tuple([globals()[name] for name in _CONFIGURATION_CONSTANTS])
+    header = '%s\0%s\0%s\0%s\0%r\0' % (
+        epydoc.__version__, os.path.abspath(module_doc.filename),
+        module_doc.canonical_name, module_doc.is_package, config)
+    key = hashlib.sha1(header.encode('utf-8'))
+    key.update(get_source(module_doc.filename).digest.encode('ascii'))
+    for filename, is_parsed in dependencies:
+        try:
+            digest = get_source(filename).digest
+        except (IOError, OSError):
+            digest = '-'
+        key.update(('\0%s\0%s\0%s' % (filename, is_parsed,
+                                       digest)).encode('utf-8'))
+    return key.hexdigest()
+
+def _parse_cache_filename(filename):
+    """
+    Return the name of the file in L{PARSE_CACHE_DIR} that is used to
+    cache the C{ModuleDoc} for the given source file.
+    """
+    digest = hashlib.sha1(os.path.abspath(filename).encode('utf-8'))
+    return os.path.join(PARSE_CACHE_DIR, '%s.pickle' % digest.hexdigest())
+
+class _ModuleDocPickler(pickle.Pickler):
+    """
+    A pickler used to save a single C{ModuleDoc}.  Any C{APIDoc}s that
+    belong to other modules (or to the introspected C{builtins}
+    module) are saved as persistent references, and are resolved by
+    L{_ModuleDocUnpickler} when the module is loaded.
+    """
+    def __init__(self, file, module_doc):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.module_doc = module_doc
+        self.class_docs = []
+        self.external_class_docs = {}
+        self._builtin_names = None
+        self._module_filenames = None
+
+    def persistent_id(self, obj):
+        if obj is UNKNOWN:
+            return 'UNKNOWN'
+        elif obj is self.module_doc:
+            return ('self',)
+        elif isinstance(obj, ValueDoc):
+            ref = self._value_ref(obj)
+            if ref is not None and isinstance(obj, ClassDoc):
+                self.external_class_docs[id(obj)] = obj
+            return ref
+        elif isinstance(obj, VariableDoc):
+            if (isinstance(obj.container, ValueDoc) and
+                obj.container is not self.module_doc and
+                self._value_ref(obj.container) is not None):
+                raise _UncacheableDoc('%s refers to variable %s of %s' %
+                                      (self.module_doc.canonical_name,
+                                       obj.name, obj.container))
+        return None
+
+    def reducer_override(self, obj):
+        # Save APIDocs using their __dict__ directly, rather than
+        # using ValueDoc.__getstate__, which caches its state.
+        if isinstance(obj, APIDoc):
+            if isinstance(obj, ClassDoc):
+                self.class_docs.append(obj)
+            return (copyreg.__newobj__, (type(obj),), obj.__dict__)
+        return NotImplemented
+
+    def _value_ref(self, val_doc):
+        """
+        Return a persistent reference for the given C{ValueDoc} if it
+        belongs to some other module; or C{None} if it should be
+        saved as part of this module.
+        """
+        if val_doc.docs_extracted_by == 'introspecter':
+            return ('builtin', self._builtin_name(val_doc))
+        if isinstance(val_doc, ModuleDoc):
+            filename = self._cache_filename(val_doc)
+            if filename is not None:
+                return ('module', filename)
+        module = val_doc.defining_module
+        if not isinstance(module, ModuleDoc) or module is self.module_doc:
+            return None
+        filename = self._cache_filename(module)
+        if (filename is None or val_doc.canonical_name is UNKNOWN or
+            not module.canonical_name.dominates(val_doc.canonical_name)):
+            raise _UncacheableDoc('%s refers to %s' %
+                                  (self.module_doc.canonical_name, val_doc))
+        path = val_doc.canonical_name[len(module.canonical_name):]
+        if _find_by_path(module, path) is not val_doc:
+            raise _UncacheableDoc('%s refers to %s' %
+                                  (self.module_doc.canonical_name, val_doc))
+        return ('value', filename, tuple(path))
+
+    def _cache_filename(self, module_doc):
+        """
+        Return the filename under which C{module_doc} is stored in
+        C{_moduledoc_cache}, or C{None} if it's not in the cache.
+        """
+        if self._module_filenames is None:
+            self._module_filenames = dict(
+                [(id(m), f) for (f, m) in _moduledoc_cache.items()])
+        return self._module_filenames.get(id(module_doc))
+
+    def _builtin_name(self, val_doc):
+        builtins_doc = epydoc.docintrospecter.introspect_docs(builtins)
+        if val_doc is builtins_doc:
+            return None
+        if self._builtin_names is None:
+            self._builtin_names = dict(
+                [(id(var_doc.value), name) for (name, var_doc)
+                 in builtins_doc.variables.items()])
+        name = self._builtin_names.get(id(val_doc))
+        if (name is None or
+            builtins_doc.variables[name].value is not val_doc):
+            raise _UncacheableDoc('%s refers to introspected value %s' %
+                                  (self.module_doc.canonical_name, val_doc))
+        return name
+
+class _ModuleDocUnpickler(pickle.Unpickler):
+    """
+    An unpickler used to load a C{ModuleDoc} that was saved by
+    L{_ModuleDocPickler}.  Persistent references to other modules are
+    resolved with L{parse_docs()}, so they are loaded from the cache
+    (or parsed) if necessary.  Only classes defined by epydoc itself
+    may be loaded.
+    """
+    def __init__(self, file, module_doc):
+        pickle.Unpickler.__init__(self, file)
+        self.module_doc = module_doc
+
+    def persistent_load(self, pid):
+        if pid == 'UNKNOWN':
+            return UNKNOWN
+        elif pid[0] == 'self':
+            return self.module_doc
+        elif pid[0] == 'builtin':
+            builtins_doc = epydoc.docintrospecter.introspect_docs(builtins)
+            if pid[1] is None:
+                return builtins_doc
+            return builtins_doc.variables[pid[1]].value
+        elif pid[0] == 'module':
+            return parse_docs(filename=pid[1])
+        elif pid[0] == 'value':
+            val_doc = _find_by_path(parse_docs(filename=pid[1]), pid[2])
+            if val_doc is None:
+                raise pickle.UnpicklingError('%s not found in %s' %
+                                             ('.'.join(pid[2]), pid[1]))
+            return val_doc
+        else:
+            raise pickle.UnpicklingError('Invalid persistent id')
+
+    def find_class(self, module, name):
+        try:
+            return find_epydoc_class(module, name)
+        except ValueError as e:
+            raise pickle.UnpicklingError('%s' % e)
+
+def _find_by_path(val_doc, path):
+    """
+    Return the value reached by following the variables named by
+    C{path}, starting at C{val_doc}; or C{None} if there is no such
+    value.
+    """
+    for identifier in path:
+        if (not isinstance(val_doc, NamespaceDoc) or
+            identifier not in val_doc.variables):
+            return None
+        val_doc = val_doc.variables[identifier].value
+    if val_doc is UNKNOWN:
+        return None
+    return val_doc
+
+def _load_cached_module(module_doc):
+    """
+    If L{PARSE_CACHE_DIR} contains an up-to-date entry for
+    C{module_doc}, then copy its contents into C{module_doc}, and
+    return true.  Otherwise, leave C{module_doc} unmodified and return
+    false.
+
+    An entry is only used if each module that was looked up while
+    parsing C{module_doc} has the same contents, and has (or has not)
+    been parsed already, just as when the entry was saved.  The
+    modules that were first parsed while parsing C{module_doc} are
+    then parsed (or loaded from the cache) in the same order, before
+    its contents are restored; and the messages that were generated
+    while parsing it are reported again.
+    """
+    cache_file = _parse_cache_filename(module_doc.filename)
+    if not os.path.exists(cache_file):
+        return False
+    try:
+        with open(cache_file, 'rb') as infile:
+            try:
+                unpickler = _ModuleDocUnpickler(infile, module_doc)
+                key, dependencies, events, records, filenames = (
+                    unpickler.load())
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                log.debug('Unable to load cached parse of %s: %s' %
+                          (module_doc.filename, e))
+                return False
+            for filename, is_parsed in dependencies:
+                if (filename in _parse_stack or
+                    (filename in _moduledoc_cache) != is_parsed):
+                    return False
+            if _parse_cache_key(module_doc, dependencies) != key:
+                return False
+
+            # The messages for these modules are reported below.
+            log.start_recording(log.Logger())
+            try:
+                for kind, filename in events:
+                    try:
+                        if kind == 'parse':
+                            parse_docs(filename=filename)
+                        else:
+                            _parse_exports(filename)
+                    except KeyboardInterrupt:
+                        raise
+                    except Exception:
+                        pass
+                loaded = _restore_module(module_doc, infile, key)
+            finally:
+                log.end_recording()
+    except (IOError, OSError) as e:
+        log.debug('Unable to load cached parse of %s: %s' %
+                  (module_doc.filename, e))
+        return False
+
+    if loaded:
+        for filename, is_parsed in dependencies:
+            _note_module_lookup(filename)
+        _replay_records(records, filenames)
+    return loaded
+
+def _store_cached_module(module_doc, recorder):
+    """
+    Save C{module_doc} in L{PARSE_CACHE_DIR}, along with the
+    information that was recorded by C{recorder} (a
+    L{_ParseCacheRecorder}) while parsing it.  If the module can not
+    be saved, then log a debug message and do nothing.
+    """
+    cache_file = _parse_cache_filename(module_doc.filename)
+    tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+    dependencies = sorted(recorder.dependencies.items())
+    key = _parse_cache_key(module_doc, dependencies)
+    parsed = [_moduledoc_cache[filename]
+              for (kind, filename) in recorder.events if kind == 'parse']
+    try:
+        if not os.path.isdir(PARSE_CACHE_DIR):
+            os.makedirs(PARSE_CACHE_DIR)
+        with open(tmp_file, 'wb') as outfile:
+            pickle.dump( (key, dependencies, recorder.events,
+                          recorder.records, recorder.filenames),
+                         outfile, pickle.HIGHEST_PROTOCOL)
+            _dump_module(module_doc, outfile, key, parsed)
+        os.replace(tmp_file, cache_file)
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        log.debug('Unable to cache parse of %s: %s' %
+                  (module_doc.filename, e))
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+def _dump_module(module_doc, outfile, key, parsed=()):
+    """
+    Write C{key} and the contents of C{module_doc} to C{outfile}, in
+    the format read by L{_restore_module}.
+
+    @param parsed: The C{ModuleDoc}s of the modules that were first
+        parsed while parsing C{module_doc}.  Their classes are
+        registered as subclasses before C{module_doc}'s classes are
+        restored; so the order of C{module_doc}'s classes relative to
+        theirs is saved too.
+    @raise _UncacheableDoc: If C{module_doc} refers to an C{APIDoc}
+        that could not be restored.
+    """
+    pickler = _ModuleDocPickler(outfile, module_doc)
+    pickler.dump(key)
+    pickler.dump(module_doc.__dict__)
+    # Record which of our classes need to be registered as
+    # subclasses of bases from other modules, in order.
+    own_class_docs = set(map(id, pickler.class_docs))
+    parsed_module_docs = set(map(id, parsed))
+    subclass_links = []
+    for base_doc in list(pickler.external_class_docs.values()):
+        if base_doc.subclasses in (None, UNKNOWN): continue
+        if not [c for c in base_doc.subclasses if id(c) in own_class_docs]:
+            continue
+        subclass_docs = [c for c in base_doc.subclasses
+                         if id(c) in own_class_docs or
+                         id(c.defining_module) in parsed_module_docs]
+        subclass_links.append( (base_doc, subclass_docs) )
+    pickler.dump(subclass_links)
+
+def _restore_module(module_doc, infile, key):
+    """
+    Read a module that was written by L{_dump_module} from C{infile}.
+    If its key matches C{key}, then copy its contents into
+    C{module_doc}, and return true.  Otherwise, leave C{module_doc}
+    unmodified and return false.
+    """
+    initial_state = module_doc.__dict__.copy()
+    try:
+        unpickler = _ModuleDocUnpickler(infile, module_doc)
+        if unpickler.load() != key:
+            return False
+        state = unpickler.load()
+        subclass_links = unpickler.load()
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        log.debug('Unable to load the parsed contents of %s: %s' %
+                  (module_doc.filename, e))
+        module_doc.__dict__.clear()
+        module_doc.__dict__.update(initial_state)
+        return False
+
+    module_doc.__dict__.clear()
+    module_doc.__dict__.update(state)
+    # Register our classes as subclasses of any bases that are
+    # defined by other modules, in the order that they were
+    # registered along with the classes of modules that were parsed
+    # while parsing this one.
+    for base_doc, subclass_docs in subclass_links:
+        moved = set(map(id, subclass_docs))
+        base_doc.subclasses[:] = ([c for c in base_doc.subclasses
+                                   if id(c) not in moved] + subclass_docs)
+    return True
+
+#////////////////////////////////////////////////////////////
+#{ Parallel Parsing
+#////////////////////////////////////////////////////////////
+
+_worker_results = {}
+"""The results of parsing modules in worker processes, which have
+not been used yet.  C{_worker_results} is a dictionary mapping from
+filenames to the values returned by L{parse_in_worker()}.
+@type: C{dict}"""
+
+def worker_config():
+    """
+    Return a dictionary containing the values of the configuration
+    constants that should be passed to L{init_worker()}.
+    """
+    config = dict([(name, globals()[name])
+                   for name in _CONFIGURATION_CONSTANTS])
+    config['PARSE_CACHE_DIR'] = PARSE_CACHE_DIR
+    config['DEBUG'] = epydoc.DEBUG
+    return config
+
+def init_worker(config):
+    """
+    Initialize a worker process that will be used to parse modules
+    with L{parse_in_worker()}.
+
+    @param config: The configuration constants of the main process,
+        as returned by L{worker_config()}.
+    """
+    epydoc.DEBUG = config.pop('DEBUG')
+    globals().update(config)
+    # Messages are recorded by parse_in_worker(), and reported by
+    # the main process; discard any other messages.
+    log.start_recording(log.Logger())
+
+def parse_in_worker(filename, context_filename, context_name, path,
+                    is_script=False):
+    """
+    Parse the module with the given source filename, and return the
+    result in a form that can be sent back to the main process and
+    passed to L{add_worker_result()}.
+
+    @param context_filename: The source filename of the package that
+        contains the module; or C{None} if the main process parses
+        the module without a context (e.g., because it was named on
+        the command line).
+    @param context_name: The canonical name of that package; if the
+        package's name in this process is different, then the module
+        is not parsed.
+    @param path: The value of C{sys.path} in the main process.
+    @param is_script: True if the file is a script, and not a module.
+    @return: A tuple C{(filename, data, records, filenames)}, where
+        C{data} is the parsed module (or C{None} if the module could
+        not be parsed); C{records} is a list of the messages that
+        were generated while parsing the module; and C{filenames}
+        lists the files that were parsed in the process, along with
+        the module that generated each message.
+    """
+    sys.path[:] = path
+    recorder = _ModuleMessageRecorder()
+    known = set(_moduledoc_cache)
+    data = None
+    try:
+        if context_filename is None:
+            context = None
+        else:
+            context = parse_docs(filename=context_filename)
+        if context is None or str(context.canonical_name) == context_name:
+            log.start_recording(recorder)
+            try:
+                module_doc = parse_docs(filename=filename, context=context,
+                                        is_script=is_script)
+                outfile = io.BytesIO()
+                _dump_module(module_doc, outfile,
+                             _parse_cache_key(module_doc))
+                data = outfile.getvalue()
+            finally:
+                log.end_recording()
+            # The main process reports the "Parsing" message itself.
+            if filename not in known:
+                del recorder.records[0], recorder.filenames[0]
+    except KeyboardInterrupt:
+        raise
+    except Exception as e:
+        # The main process will parse the module itself, and report
+        # any errors.
+        data = None
+    parsed = [f for f in _moduledoc_cache if f not in known]
+    return (filename, data, recorder.records,
+            (parsed, recorder.filenames))
+
+def add_worker_result(result):
+    """
+    Record the result of calling L{parse_in_worker()} in a worker
+    process, so that L{parse_docs()} will use it instead of parsing
+    the module's source file.
+    """
+    _worker_results[result[0]] = result
+
+def clear_worker_results():
+    """
+    Discard any results recorded by L{add_worker_result()} that have
+    not been used yet.
+    """
+    _worker_results.clear()
+
+def _load_worker_result(module_doc, result):
+    """
+    Copy the contents of a module that was parsed by a worker process
+    into C{module_doc}, report the messages that were generated while
+    parsing it, and return true.  If the result can not be used,
+    then leave C{module_doc} unmodified and return false.
+    """
+    filename, data, records, (parsed, record_filenames) = result
+    if data is None:
+        return False
+
+    # Any modules that the worker parsed for the first time were also
+    # parsed while processing module_doc in a serial run; so parse
+    # them now (if necessary) without reporting their messages, and
+    # report the messages that the worker recorded, instead.
+    known = set(_moduledoc_cache)
+    log.start_recording(log.Logger())
+    try:
+        loaded = _restore_module(module_doc, io.BytesIO(data),
+                                 _parse_cache_key(module_doc))
+        for other_filename in parsed:
+            if loaded and other_filename not in _moduledoc_cache:
+                try:
+                    parse_docs(filename=other_filename)
+                except KeyboardInterrupt:
+                    raise
+                except Exception:
+                    pass
+    finally:
+        log.end_recording()
+
+    # Report the messages for the module and any modules that were
+    # parsed along with it.
+    if loaded:
+        log.replay([record for (record, record_filename)
+                    in zip(records, record_filenames)
+                    if record_filename == filename or
+                    record_filename not in known])
+    else:
+        log.replay([record for (record, record_filename)
+                    in zip(records, record_filenames)
+                    if record_filename != filename and
+                    record_filename not in known and
+                    record_filename in _moduledoc_cache])
+    return loaded
+
 #////////////////////////////////////////////////////////////
 #{ Module Lookup
 #////////////////////////////////////////////////////////////
 
-def _find(name, package_doc=None):
+def _find(name, package_doc=None, exports_only=False):
     """
     Return the API documentaiton for the object whose name is
     C{name}.  C{package_doc}, if specified, is the API
     documentation for the package containing the named object.
+
+    @param exports_only: If true, then just build the export tables
+        of the modules that are searched (see L{_parse_exports()}),
+        instead of parsing them.
     """
     # If we're inside a package, then find the package's path.
     if package_doc is None:
@@ -380,7 +1156,10 @@ def _find(name, package_doc=None):
     # The leftmost identifier in `name` should be a module or
     # package on the given path; find it and parse it.
     filename = _get_filename(name[0], path)
-    module_doc = parse_docs(filename, context=package_doc)
+    if exports_only:
+        module_doc = _parse_exports(filename, package_doc)
+    else:
+        module_doc = parse_docs(filename, context=package_doc)
 
     # If the name just has one identifier, then the module we just
     # parsed is the object we're looking for; return it.
@@ -391,13 +1170,13 @@ def _find(name, package_doc=None):
     # variables that just contain imported submodules).
     if not _is_submodule_import_var(module_doc, name[1]):
         try:
-            return _find_in_namespace(name[1:], module_doc)
+            return _find_in_namespace(name[1:], module_doc, exports_only)
         except ImportError:
             pass
 
     # If not, then check to see if it's in a subpackage.
     if module_doc.is_package:
-        return _find(name[1:], module_doc)
+        return _find(name[1:], module_doc, exports_only)
 
     # If it's not in a variable or a subpackage, then we can't
     # find it.
@@ -415,7 +1194,7 @@ def _is_submodule_import_var(module_doc, var_name):
     return (var_doc is not None and
             var_doc.imported_from == full_var_name)
     
-def _find_in_namespace(name, namespace_doc):
+def _find_in_namespace(name, namespace_doc, exports_only=False):
     if name[0] not in namespace_doc.variables:
         raise ImportError('Could not find value')
     
@@ -428,7 +1207,8 @@ def _find_in_namespace(name, namespace_doc):
     # If the variable's value was imported, then follow its
     # alias link.
     if var_doc.imported_from not in (None, UNKNOWN):
-        return _find(var_doc.imported_from+name[1:])
+        return _find(var_doc.imported_from+name[1:],
+                     exports_only=exports_only)
 
     # Otherwise, if the name has one identifier, then this is the
     # value we're looking for; return it.
@@ -437,7 +1217,7 @@ def _find_in_namespace(name, namespace_doc):
 
     # Otherwise, if this value is a namespace, look inside it.
     elif isinstance(val_doc, NamespaceDoc):
-        return _find_in_namespace(name[1:], val_doc)
+        return _find_in_namespace(name[1:], val_doc, exports_only)
 
     # Otherwise, we ran into a dead end.
     else:
@@ -477,12 +1257,17 @@ def _get_filename(identifier, path=None):
 #{ File tokenization loop
 #/////////////////////////////////////////////////////////////////
 
-def process_file(module_doc):
+def process_file(module_doc, exports_only=False):
     """
     Read the given C{ModuleDoc}'s file, and add variables
     corresponding to any objects defined in that file.  In
     particular, read and tokenize C{module_doc.filename}, and
     process each logical line using L{process_line()}.
+
+    @param exports_only: If true, then skip the bodies of all classes
+        and functions that do not modify C{__all__}, since they can
+        not add to the module's export table (see
+        L{_parse_exports()}).
     """
     # Keep track of the current line number:
     lineno = None
@@ -527,20 +1312,17 @@ def process_file(module_doc):
     # inside that block, not outside it.
     start_group = None
 
-    # Check if the source file declares an encoding.
-    encoding = get_module_encoding(module_doc.filename)
+    # Read the source file, and check which encoding it uses.
+    source = _read_source(module_doc)
+    encoding = source.encoding
 
     # The token-eating loop:
-    try:
-        module_file = codecs.open(module_doc.filename, 'r', encoding)
-    except LookupError:
-        log.warning("Unknown encoding %r for %s; using the default"
-                    "encoding instead (utf-8)" %
-                    (encoding, module_doc.filename))
-        encoding = 'utf-8'
-        module_file = codecs.open(module_doc.filename, 'r', encoding)
-    tok_iter = tokenize.generate_tokens(module_file.readline)
-    for toktype, toktext, (srow,scol), (erow,ecol), line_str in tok_iter:
+    reader = _LineReader(source.lines)
+    linenos = reader.linenos
+    for toktype, toktext, (srow,scol), (erow,ecol), line_str in reader.tokens():
+        # Translate the row number, in case any lines were skipped.
+        srow = linenos[srow-1]
+
         # BOM encoding marker: ignore.
         if (toktype == token.ERRORTOKEN and
             (toktext == u'\ufeff' or
@@ -608,7 +1390,7 @@ def process_file(module_doc):
         # convert that string with 8-bit data to a 7-bit ascii
         # representation.)
         elif toktype != token.NEWLINE and toktype != token.ENDMARKER:
-            if lineno is None: lineno = srow
+            if lineno is None: lineno, first_line_str = srow, line_str
             if toktype == token.STRING:
                 str_prefixes = re.match('[^\'"]*', toktext).group()
                 if 'b' in str_prefixes:
@@ -665,6 +1447,22 @@ def process_file(module_doc):
                     elif isinstance(parent_docs[-1], NamespaceDoc):
                         add_to_group(parent_docs[-1], prev_line_doc,
                                      groups[-1])
+
+                # Skip the body of a function definition, if it can
+                # not add to the documentation (or to the export
+                # table, for a class definition).
+                if (line_toks[-1] == (token.OP, ':') and
+                    prev_line_doc not in (None, 'skip_block')):
+                    if exports_only and line_toks[0] in _DEFINITIONS:
+                        reader.skip_body(_indentation(first_line_str),
+                                         _skip_export_body)
+                    elif (SKIP_ROUTINE_BODIES and
+                          line_toks[0] == (token.NAME, 'def')):
+                        reader.skip_body(_indentation(first_line_str),
+                                         functools.partial(
+                                             _skip_routine_body,
+                                             prev_line_doc, line_toks[1][1],
+                                             parent_docs[-1]))
             else:
                 prev_line_doc = None
 
@@ -674,6 +1472,264 @@ def process_file(module_doc):
             comments = []
             decorators = []
             
+class _LineReader:
+    """
+    A helper for L{process_file()}, which gives the lines of a source
+    file to the tokenizer, reading each one only when it is needed.
+    It can also remove the lines of a routine's body, when the body
+    can be skipped (see L{SKIP_ROUTINE_BODIES}), so that they are
+    never tokenized.
+
+    @ivar lines: The lines of the source file (a list, or a
+        L{SourceLines<epydoc.sourcecache.SourceLines>}).
+    @ivar num_lines: The number of lines in L{lines}.
+    @ivar linenos: The line number in the source file of each line
+        that has been given to the tokenizer, followed (once the end
+        of the file is reached) by the number of the line after the
+        end of the file.
+    @ivar pos: The index in L{lines} of the next line to give to the
+        tokenizer.
+    @ivar pending: A list of C{(line, lineno)} pairs, for lines that
+        should be given to the tokenizer before the line at L{pos}
+        (in reverse order).  These replace the lines of a body that
+        is skipped.
+    """
+    def __init__(self, lines):
+        self.lines = lines
+        self.num_lines = len(lines)
+        self.linenos = array.array('l')
+        self.pos = 0
+        self.pending = []
+        self._eof = False
+
+    def readline(self):
+        if self.pending:
+            line, lineno = self.pending.pop()
+        elif self.pos < self.num_lines:
+            line, lineno = self.lines[self.pos], self.pos+1
+            self.pos += 1
+        else:
+            if not self._eof:
+                self.linenos.append(self.num_lines+1)
+                self._eof = True
+            return ''
+        self.linenos.append(lineno)
+        return line
+
+    def lineno(self, row):
+        """
+        Return the line number in the source file of the given row,
+        as reported by the tokenizer.
+        """
+        if row <= len(self.linenos):
+            return self.linenos[row-1]
+        return row + self.linenos[-1] - len(self.linenos)
+
+    def tokens(self):
+        """
+        Tokenize the lines, and generate the tokens.  The row numbers
+        of the tokens are not translated (see L{lineno()}); but those
+        of any tokenizing errors are.
+        """
+        try:
+            yield from tokenize.generate_tokens(self.readline)
+        except tokenize.TokenError as e:
+            msg, (row, col) = e.args
+            raise tokenize.TokenError(msg, (self.lineno(row), col))
+        except IndentationError as e:
+            raise IndentationError(e.msg, (e.filename, self.lineno(e.lineno),
+                                           e.offset, e.text))
+
+    def skip_body(self, indent, can_skip):
+        """
+        If the body of the routine (or class) that was defined by the
+        line that was just tokenized can be skipped, then remove its
+        lines; except for its first logical line if it starts with a
+        string (which may be a docstring), or else a C{pass}
+        statement.
+
+        If the body contains any group markers or comment docstrings,
+        then its lines are kept, to be handled as before; but each of
+        its logical lines that does not contain a group marker is
+        replaced by a C{pass} statement (or a decorator).
+
+        @param indent: The indentation of the definition.
+        @param can_skip: A function that is called with the source
+            code of the body, and returns true if it can be skipped.
+        """
+        # Don't skip bodies within the lines that replaced a body.
+        if self.pending: return
+        lines = self.lines
+        markers = (START_GROUP_MARKER, END_GROUP_MARKER)
+        logical_lines = []
+        special_comment = None
+        i = self.pos
+        while i < self.num_lines:
+            line = lines[i]
+            stripped = line.strip()
+            if not stripped:
+                i += 1
+            elif stripped.startswith('#'):
+                if stripped.startswith(markers+(COMMENT_DOCSTRING_MARKER,)):
+                    special_comment = i
+                i += 1
+            elif _indentation(line) <= indent:
+                break
+            else:
+                end, comments = _logical_line_end(lines, i, line)
+                has_marker = bool([c for c in comments
+                                   if c.startswith(markers)])
+                logical_lines.append( (i, end, has_marker) )
+                i = end
+        if not logical_lines: return
+        start, end = self.pos, logical_lines[-1][1]
+        if not can_skip(''.join(lines[start:end])):
+            return
+
+        special = ((special_comment is not None and special_comment < end)
+                   or [l for l in logical_lines if l[2]])
+        replacement = None
+        for n, (first, last, has_marker) in enumerate(logical_lines):
+            line = lines[first]
+            code = line.lstrip(' \t\f')
+            if n == 0 and _STRING_START_RE.match(code):
+                if not special:
+                    replacement = [(lines[i], i+1) for i in range(first, last)]
+                    break
+            elif not special:
+                replacement = [(line[:len(line)-len(code)] + 'pass\n', first+1)]
+                break
+            elif not has_marker:
+                if replacement is None:
+                    replacement = [(lines[i], i+1) for i in range(start, end)]
+                if code.startswith('@'):
+                    new_line = line[:len(line)-len(code)] + '@d\n'
+                else:
+                    new_line = line[:len(line)-len(code)] + 'pass\n'
+                replacement[first-start] = (new_line, first+1)
+                for i in range(first+1, last):
+                    replacement[i-start] = ('\n', i+1)
+        if replacement is not None:
+            self.pending = replacement[::-1]
+            self.pos = end
+
+def _skip_routine_body(func_doc, name, parent_doc, body):
+    """
+    Return true if the body of the routine C{func_doc}, whose name is
+    C{name} and which is defined in C{parent_doc}, can be skipped
+    (see L{SKIP_ROUTINE_BODIES}).
+
+    @param body: The source code of the routine's body.
+    """
+    if not SKIP_ROUTINE_BODIES or '__all__' in body:
+        return False
+    if (isinstance(parent_doc, ClassDoc) and
+        isinstance(func_doc, RoutineDoc) and
+        func_doc.posargs not in (None, UNKNOWN) and func_doc.posargs and
+        isinstance(func_doc.posargs[0], str) and
+        (INSTANCE_VARIABLE_METHODS is None or
+         name in INSTANCE_VARIABLE_METHODS)):
+        # Look for an assignment to an attribute of the first argument.
+        return re.search(r'(?<![\w.])%s[\s\\]*\.[\s\\]*\w+[\s\\]*=(?!=)' %
+                         re.escape(func_doc.posargs[0]), body) is None
+    return True
+
+def _skip_export_body(body):
+    """
+    Return true if the body of a class or function can be skipped
+    when building an export table: i.e., unless it modifies
+    C{__all__}, either directly or with a C{@public} decorator.
+
+    @param body: The source code of the body.
+    """
+    return not ('__all__' in body or
+                (PUBLIC_DECORATOR_APPENDS_TO_ALL and 'public' in body))
+
+_DEFINITIONS = ((token.NAME, 'def'), (token.NAME, 'class'))
+"""The tokens that start the definition of a function or a class."""
+
+_STRING_START_RE = re.compile(r'[rRbBuUfF]{0,2}[\'"]')
+"""A regular expression that matches the start of a string literal."""
+
+_LOGICAL_LINE_RE = re.compile(r'''
+    (?P<quote>\'\'\'|"""|\'|") | (?P<open>[\[({]) | (?P<close>[\])}]) |
+    (?P<comment>\#.*)''', re.VERBOSE)
+"""A regular expression used by L{_logical_line_end()} to find the
+start of each string literal or comment, and each bracket."""
+
+_STRING_END_RE = {
+    "'''": re.compile(r"(?:[^'\\]|\\.|'(?!''))*'''", re.DOTALL),
+    '"""': re.compile(r'(?:[^"\\]|\\.|"(?!""))*"""', re.DOTALL),
+    "'": re.compile(r"(?:[^\n'\\]|\\.)*'", re.DOTALL),
+    '"': re.compile(r'(?:[^\n"\\]|\\.)*"', re.DOTALL)}
+"""Regular expressions that match the rest of a string literal, for
+each kind of quotation mark."""
+
+def _logical_line_end(lines, i, line=None):
+    """
+    Return a tuple C{(end, comments)}, where C{end} is the index of
+    the line after the logical line that starts at C{lines[i]}, and
+    C{comments} is a list of the comments that it contains.
+
+    @param line: C{lines[i]}, if the caller has already read it.
+    """
+    quote = None
+    depth = 0
+    comments = []
+    num_lines = len(lines)
+    while i < num_lines:
+        if line is None:
+            line = lines[i]
+        i += 1
+        pos = 0
+        continued = line.rstrip('\r\n').endswith('\\')
+        while True:
+            if quote is not None:
+                m = _STRING_END_RE[quote].match(line, pos)
+                if m is None:
+                    # The string continues on the next line (or it is
+                    # unterminated).
+                    if len(quote) == 1 and not continued:
+                        quote = None
+                    break
+                quote = None
+                pos = m.end()
+            m = _LOGICAL_LINE_RE.search(line, pos)
+            if m is None:
+                break
+            pos = m.end()
+            if m.lastgroup == 'quote':
+                quote = m.group()
+            elif m.lastgroup == 'open':
+                depth += 1
+            elif m.lastgroup == 'close':
+                depth = max(0, depth-1)
+            else:
+                comments.append(m.group())
+                continued = False
+                break
+        if quote is None and depth == 0 and not continued:
+            break
+        line = None
+    return i, comments
+
+def _indentation(line):
+    """
+    Return the indentation of the given line, measured in columns
+    the same way as by the tokenizer.
+    """
+    column = 0
+    for c in line:
+        if c == ' ':
+            column += 1
+        elif c == '\t':
+            column = (column//8 + 1) * 8
+        elif c == '\f':
+            column = 0
+        else:
+            break
+    return column
+
 def add_to_group(container, api_doc, group_name):
     if container.group_specs is UNKNOWN:
         container.group_specs = []
@@ -908,7 +1964,8 @@ def _process_fromstar_import(src, parent_docs):
     Otherwise, try to determine the names of the variables exported by
     C{M{<src>}}, and create a new variable for each export.  If
     L{IMPORT_STAR_HANDLING} is C{'parse'}, then the list of exports if
-    found by parsing C{M{<src>}}; if it is C{'introspect'}, then the
+    found from the export table of C{M{<src>}} (see
+    L{_parse_exports()}); if it is C{'introspect'}, then the
     list of exports is found by importing and introspecting
     C{M{<src>}}.
     """
@@ -926,8 +1983,10 @@ def _process_fromstar_import(src, parent_docs):
 
     if (IMPORT_HANDLING == 'parse' or
         IMPORT_STAR_HANDLING == 'parse'): # [xx] is this ok?
+        # Unless we need the values of the exported variables, just
+        # use the module's export table.
         try:
-            module_doc = _find(src)
+            module_doc = _find(src, exports_only=(IMPORT_HANDLING != 'parse'))
         except ImportError:
             module_doc = None
         if isinstance(module_doc, ModuleDoc):
@@ -1577,8 +2636,10 @@ def process_classdef(line, parent_docs, prev_line_doc, lineno,
                           is_imported=False, is_alias=False,
                           docs_extracted_by='parser')
 
-    # Add the bases.
-    if len(line) == 4:
+    # Add the bases.  (An export table doesn't need them.)
+    if _export_stack:
+        class_doc.bases = UNKNOWN
+    elif len(line) == 4:
         if (not isinstance(line[2], list) or
             line[2][0] != (token.OP, '(')):
             raise ParseError("Expected base list")
@@ -2144,18 +3205,20 @@ def get_module_encoding(filename):
     """
     @see: U{PEP 263<http://www.python.org/peps/pep-0263.html>}
     """
-    with open(filename, 'rb') as module_file:
-        lines = [module_file.readline() for i in range(2)]
-        if lines[0].startswith(b'\xef\xbb\xbf'):
-            return 'utf-8'
-        else:
-            for line in lines:
-                m = re.search(b"coding[:=]\s*([-\w.]+)", line)
-                if m:
-                    return m.group(1).decode()
-                
-        # Fall back on Python3's default encoding.
-        return 'utf-8'
+    return get_source(filename).declared_encoding
+
+def _read_source(module_doc):
+    """
+    Return the L{SourceFile<epydoc.sourcecache.SourceFile>} for the
+    given module's source file; and warn if the encoding that it
+    declares is not known.
+    """
+    source = get_source(module_doc.filename)
+    if source.encoding != source.declared_encoding:
+        log.warning("Unknown encoding %r for %s; using the default"
+                    "encoding instead (utf-8)" %
+                    (source.declared_encoding, module_doc.filename))
+    return source
         
 def _get_module_name(filename, package_doc):
     """
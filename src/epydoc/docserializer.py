@@ -0,0 +1,1024 @@
+# epydoc -- Documentation index serialization
+#
+# Copyright (C) 2005 Edward Loper
+# Author: Edward Loper <edloper@loper.org>
+# URL: <http://epydoc.sf.net>
+#
+# $Id$
+
+"""
+Save a L{DocIndex} to a binary file, and load it back in.
+
+The function L{dump_docindex()} writes a C{DocIndex}, along with all
+of the C{APIDoc}s and parsed docstrings that it contains, to a
+stream; and L{load_docindex()} reads it back in.  The file format is
+designed to be loaded quickly, and to be safe to load:
+
+  - Each file starts with L{MAGIC} and the L{FORMAT_VERSION} of the
+    format it uses.  Files with a different format version are
+    rejected, rather than misread.
+  - Every object in the file is identified by an integer id: its
+    index in a single table of values.  The table starts with a few
+    constants (L{CONSTANTS}), followed by a string table (which
+    holds each distinct string once, including the identifiers of
+    the L{DottedName}s), the byte strings, numbers, dotted names and
+    classes, and then the containers and instances.  All references
+    between objects are stored as integer ids, so shared and
+    recursive structures are restored as they were.
+  - The containers and instances are stored in separate sections, by
+    type.  So they are created in bulk, and then filled in, which is
+    several times faster than unpickling the same objects.
+  - Only a fixed set of value types can be stored.  Instances are
+    restored by creating an empty object and setting its
+    C{__dict__}: no constructor, C{__setstate__} method or pickle
+    reducer is ever called; and the only classes that may be
+    instantiated are those defined by the modules listed in
+    L{SAFE_MODULES}, and the classes listed in L{SAFE_CLASSES}.
+
+The state of each instance is the value returned by its
+C{__getstate__} method, just as it would be for C{pickle}; so
+L{ValueDoc}s are saved without their C{pyval}, and the caches of the
+C{DocIndex} are left out.
+
+Snapshots
+=========
+A large documentation index can instead be saved as a I{snapshot},
+with L{dump_snapshot()}.  A snapshot is a directory that contains one
+I{shard} file for each top-level name in the index's root set (so a
+package and all of its submodules share a shard), and a small
+manifest (L{MANIFEST_FILENAME}).  Each shard uses the file format
+described above; C{APIDoc}s that belong to other shards are saved as
+references to those shards.  L{load_snapshot()} reads only the
+manifest, and returns a L{SnapshotDocIndex}, which loads each shard
+(and the shards that it refers to) the first time that one of its
+names is looked up, and unloads the least recently used shards when
+too many are loaded.
+"""
+__docformat__ = 'epytext en'
+
+######################################################################
+## Imports
+######################################################################
+
+import sys, os, gc, json, struct, array, importlib, itertools, collections
+import contextlib
+from epydoc import log
+from epydoc.apidoc import DottedName, DocIndex, UNKNOWN
+from epydoc.apidoc import APIDoc, ValueDoc, VariableDoc, ClassDoc
+
+######################################################################
+## File Format
+######################################################################
+
+MAGIC = b'\x89EPYDOC DOCINDEX\r\n\x1a\n'
+"""The bytes that every serialized documentation index starts with."""
+
+FORMAT_VERSION = 2
+"""The version of the file format written by L{dump_docindex()}.  This
+must be incremented whenever the format is changed."""
+
+CONSTANTS = (None, False, True, UNKNOWN)
+"""The values that are stored at the start of the value table, and are
+never written to the file."""
+
+SAFE_MODULES = ['epydoc', 'docutils']
+"""The modules (and packages) whose classes may be saved and loaded.
+Instances of any other class can not be serialized, unless it is
+listed in L{SAFE_CLASSES}."""
+
+SAFE_CLASSES = ['collections:Counter', 'collections:OrderedDict']
+"""The names of other classes that may be saved and loaded, in the
+form C{I{module}:I{class}}.  These are used by parsed
+ReStructuredText docstrings."""
+
+MANIFEST_FILENAME = 'manifest.json'
+"""The name of the file that lists the shards of a snapshot."""
+
+MAX_RESIDENT_SHARDS = 16
+"""The default maximum number of shards that a L{SnapshotDocIndex}
+keeps loaded."""
+
+# Value categories.  Each category is a section of the value table.
+_CONSTANT, _STRING, _BYTES, _NUMBER, _NAME, _CLASS = range(6)
+_LIST, _DICT, _SET, _INSTANCE, _EXTERNAL, _IMMUTABLE = range(6, 12)
+_NUM_CATEGORIES = 12
+
+# Kinds of immutable values.
+_TUPLE, _FROZENSET, _SUBCLASS = range(3)
+
+# Builtin types whose subclasses can be serialized, with functions
+# that convert an instance of a subclass to the builtin type (without
+# calling any methods that the subclass might override); and the
+# methods used to fill in the contents of the mutable ones.
+_BASE_VALUE = {str: str.__str__, bytes: bytes.__bytes__, int: int.__int__,
+               float: float.__float__, list: list.copy, dict: dict.copy,
+               set: set.copy,
+               tuple: lambda value: tuple.__getitem__(value, slice(None))}
+_SUBCLASSABLE_TYPES = tuple(_BASE_VALUE)
+_FILL_METHODS = {list: list.extend, dict: dict.update, set: set.update}
+
+# Integer arrays are saved as little-endian, unsigned 4 byte integers.
+_INT_TYPECODE = [c for c in 'IL' if array.array(c).itemsize == 4][0]
+
+class SerializationError(ValueError):
+    """
+    An exception raised when a documentation index can not be
+    serialized, or when a file does not contain a valid serialized
+    documentation index.
+    """
+
+######################################################################
+## Saving
+######################################################################
+
+def dump_docindex(docindex, stream):
+    """
+    Write C{docindex} to the binary stream C{stream}, in the format
+    read by L{load_docindex()}.
+
+    @raise SerializationError: If C{docindex} contains a value that
+        can not be serialized.
+    """
+    serializer = _Serializer()
+    root_token = serializer.register(docindex)
+    serializer.register_queued()
+    serializer.assign_ids()
+    serializer.write(stream, root_token)
+
+class _Serializer:
+    """
+    A helper for L{dump_docindex()}.  Each value is registered in a
+    per-category table, and is represented by a token (its position
+    in that table times L{_NUM_CATEGORIES}, plus its category) until
+    the sizes of all the categories are known; then the tokens are
+    translated into ids.
+    """
+    def __init__(self):
+        self.tables = [[] for i in range(_NUM_CATEGORIES)]
+        """The values in each category, in order."""
+        self.payloads = [[] for i in range(_NUM_CATEGORIES)]
+        """The token lists that describe the contents of the values
+        in each category, parallel to C{tables}."""
+        self.tokens = {}
+        """A dictionary mapping a key for each registered value to its
+        token.  Containers and instances are keyed by C{id}, since
+        they are shared by identity."""
+        self.queue = []
+        """The containers and instances whose contents have not been
+        registered yet."""
+        self.in_progress = set()
+        """The ids of the immutable containers that are being
+        registered."""
+        self.offsets = None
+        """The id of the first value in each category, once the
+        sizes of all the categories are known."""
+
+    def register_queued(self):
+        """
+        Register the contents of every queued container and instance.
+        """
+        while self.queue:
+            self.register_contents(self.queue.pop())
+
+    def assign_ids(self):
+        """
+        Decide the id of each value.  No values may be registered
+        after this is called.
+        """
+        self.offsets = offsets = [0] * _NUM_CATEGORIES
+        offsets[_STRING] = len(CONSTANTS)
+        for category in range(_STRING+1, _NUM_CATEGORIES):
+            offsets[category] = (offsets[category-1] +
+                                 len(self.tables[category-1]))
+
+    def ids(self, tokens):
+        """Return a list of the ids of the values with the given tokens."""
+        offsets = self.offsets
+        return [offsets[t % _NUM_CATEGORIES] + t // _NUM_CATEGORIES
+                for t in tokens]
+
+    def write(self, stream, root_token):
+        tables, payloads, ids = self.tables, self.payloads, self.ids
+        stream.write(MAGIC)
+        stream.write(struct.pack('<I', FORMAT_VERSION))
+        _write_strings(stream, tables[_STRING])
+        _write_bytes(stream, tables[_BYTES])
+        _write_text(stream, '\n'.join(tables[_NUMBER]))
+        _write_sequences(stream, [ids(p) for p in payloads[_NAME]])
+        _write_ints(stream, ids([p[0] for p in payloads[_CLASS]]))
+        _write_sequences(stream, [ids(p) for p in payloads[_LIST]])
+        _write_sequences(stream, [ids(p[::2]) for p in payloads[_DICT]])
+        _write_ints(stream, ids([t for p in payloads[_DICT] for t in p[1::2]]))
+        _write_sequences(stream, [ids(p) for p in payloads[_SET]])
+        _write_ints(stream, ids([p[0] for p in payloads[_INSTANCE]]))
+        _write_ints(stream, ids([p[1] for p in payloads[_INSTANCE]]))
+        # External values are saved as the name of the shard that
+        # contains them, and their id in that shard.
+        _write_ints(stream, ids([p[0] for p in payloads[_EXTERNAL]]))
+        _write_ints(stream, [shard.ids([token])[0] for (name_token, shard, token)
+                             in payloads[_EXTERNAL]])
+        _write_text(stream, ''.join([chr(p[0]) for p in
+                                     payloads[_IMMUTABLE]]))
+        _write_sequences(stream, [ids(p[1:]) for p in payloads[_IMMUTABLE]])
+        _write_ints(stream, ids([root_token]))
+
+    def register(self, value):
+        """
+        Add C{value} to the table for its category, if it is not
+        there already; and return its token.
+        """
+        t = type(value)
+        if value is None or t is bool or value is UNKNOWN:
+            pos = [i for i, c in enumerate(CONSTANTS) if c is value][0]
+            return pos * _NUM_CATEGORIES + _CONSTANT
+
+        if t is str: key = value
+        elif t is int or t is bytes or t is DottedName: key = (t, value)
+        elif t is float or t is complex: key = (t, repr(value))
+        else: key = id(value)
+        token = self.tokens.get(key)
+        if token is not None:
+            return token
+
+        if t is str:
+            return self.add(key, _STRING, value)
+        elif t is int:
+            return self.add(key, _NUMBER, 'i%d' % value)
+        elif t is float or t is complex:
+            return self.add(key, _NUMBER, t.__name__[0] + repr(value))
+        elif t is bytes:
+            return self.add(key, _BYTES, value)
+        elif t is DottedName:
+            payload = [self.register(s) for s in value]
+            return self.add(key, _NAME, value, payload)
+        elif t is type:
+            payload = [self.register(_class_name(value))]
+            return self.add(key, _CLASS, value, payload)
+        elif t is list:
+            return self.add(key, _LIST, value, queue=True)
+        elif t is dict:
+            return self.add(key, _DICT, value, queue=True)
+        elif t is set:
+            return self.add(key, _SET, value, queue=True)
+        elif t is tuple or t is frozenset or isinstance(value,
+                                                        _SUBCLASSABLE_TYPES):
+            return self.add_immutable(value)
+        else:
+            return self.add_instance(key, value)
+
+    def add(self, key, category, value, payload=None, queue=False):
+        """
+        Add C{value} to the table for C{category}, and return its
+        token.  If C{queue} is true, then its contents will be
+        registered later, by L{register_contents()}.
+        """
+        table = self.tables[category]
+        token = self.tokens[key] = len(table) * _NUM_CATEGORIES + category
+        table.append(value)
+        self.payloads[category].append(payload)
+        if queue:
+            self.queue.append(token)
+        return token
+
+    def add_instance(self, key, value):
+        _class_name(type(value)) # Check that the class can be loaded.
+        return self.add(key, _INSTANCE, value, queue=True)
+
+    def add_immutable(self, value):
+        # The contents of an immutable value must be registered before
+        # the value itself, since they are needed to create it.
+        if id(value) in self.in_progress:
+            raise SerializationError('Can not serialize recursive '
+                                     '%s' % type(value).__name__)
+        self.in_progress.add(id(value))
+        t = type(value)
+        if t is tuple:
+            payload = [_TUPLE] + [self.register(v) for v in value]
+        elif t is frozenset:
+            payload = [_FROZENSET] + [self.register(v) for v in value]
+        else:
+            base = [b for b in _SUBCLASSABLE_TYPES if isinstance(value, b)][0]
+            state = value.__getstate__()
+            if state is not None and type(state) is not dict:
+                raise SerializationError('Can not serialize %s: its state '
+                                         'is not a dictionary' %
+                                         _class_name(t))
+            payload = [_SUBCLASS, self.register(t),
+                       self.register(_BASE_VALUE[base](value)),
+                       self.register(state)]
+        self.in_progress.remove(id(value))
+        return self.add(id(value), _IMMUTABLE, value, payload)
+
+    def register_contents(self, token):
+        """
+        Register the contents of the container or instance with the
+        given token, and record their tokens as its payload.
+        """
+        category = token % _NUM_CATEGORIES
+        pos = token // _NUM_CATEGORIES
+        value = self.tables[category][pos]
+        register = self.register
+        if category == _DICT:
+            payload = []
+            for k, v in value.items():
+                payload.append(register(k))
+                payload.append(register(v))
+        elif category == _INSTANCE:
+            payload = [register(type(value)),
+                       register(self.instance_state(value))]
+        else:
+            payload = [register(v) for v in value]
+        self.payloads[category][pos] = payload
+
+    def instance_state(self, value):
+        """
+        Return the state dictionary that is saved for the instance
+        C{value}.  This dictionary must not be modified.
+        """
+        state = value.__getstate__()
+        if state is None:
+            return {} # An instance with no attributes.
+        elif type(state) is not dict:
+            raise SerializationError('Can not serialize %s: its state '
+                                     'is not a dictionary' %
+                                     _class_name(type(value)))
+        return state
+
+def _class_name(cls):
+    """
+    Return the name that is used to save the class C{cls}.
+
+    @raise SerializationError: If C{cls} may not be saved (see
+        L{SAFE_MODULES} and L{SAFE_CLASSES}).
+    """
+    name = '%s:%s' % (cls.__module__, cls.__qualname__)
+    if not _is_safe_class(cls.__module__, cls.__qualname__):
+        raise SerializationError('Can not serialize instances of %s' %
+                                 name)
+    return name
+
+def _is_safe_class(module_name, qualname):
+    """
+    Return true if the class with the given module and qualified
+    name may be saved and loaded.
+    """
+    if '<' in qualname:
+        return False # local classes can not be loaded.
+    if '%s:%s' % (module_name, qualname) in SAFE_CLASSES:
+        return True
+    for safe_module in SAFE_MODULES:
+        if (module_name == safe_module or
+            module_name.startswith(safe_module+'.')):
+            return True
+    return False
+
+def _write_ints(stream, ints):
+    values = array.array(_INT_TYPECODE, ints)
+    if sys.byteorder == 'big': values.byteswap()
+    _write_data(stream, values.tobytes())
+
+def _write_data(stream, data):
+    stream.write(struct.pack('<Q', len(data)))
+    stream.write(data)
+
+def _write_text(stream, text):
+    _write_data(stream, text.encode('utf-8', 'surrogatepass'))
+
+def _write_strings(stream, strings):
+    _write_ints(stream, [len(s) for s in strings])
+    _write_text(stream, ''.join(strings))
+
+def _write_bytes(stream, byte_strings):
+    _write_ints(stream, [len(s) for s in byte_strings])
+    _write_data(stream, b''.join(byte_strings))
+
+def _write_sequences(stream, sequences):
+    _write_ints(stream, [len(s) for s in sequences])
+    _write_ints(stream, [v for s in sequences for v in s])
+
+#////////////////////////////////////////////////////////////
+# Snapshots
+#////////////////////////////////////////////////////////////
+
+def dump_snapshot(docindex, directory):
+    """
+    Write C{docindex} to the directory C{directory} as a snapshot,
+    which can be read by L{load_snapshot()}.  The directory is
+    created if it does not exist.
+
+    Each value is saved in the shard of the top-level name of its
+    canonical name (and each variable in the shard of its container).
+    Values that do not belong to any shard, such as the docs for
+    builtin base classes, are copied into each shard that uses them;
+    and the C{subclasses} of each class only list the classes from
+    its own shard, until the shards that contain its other subclasses
+    are loaded.
+
+    @raise SerializationError: If C{docindex} contains a value that
+        can not be serialized.
+    """
+    shards = collections.OrderedDict()
+    root_shards = []
+    for val_doc in docindex.root:
+        if not isinstance(val_doc.canonical_name, DottedName):
+            raise SerializationError('Can not save %r in a snapshot: it '
+                                     'has no canonical name' % val_doc)
+        name = val_doc.canonical_name[0]
+        if name not in shards:
+            shards[name] = _ShardSerializer(name, shards)
+        shards[name].roots.append(val_doc)
+        root_shards.append(name)
+
+    # Registering the contents of one shard can add values to the
+    # others, so repeat until every queue is empty.
+    def register_queued():
+        while any(shard.queue for shard in shards.values()):
+            for shard in shards.values():
+                shard.register_queued()
+    for shard in shards.values():
+        shard.register(shard.roots)
+    register_queued()
+    for shard in shards.values():
+        shard.root_token = shard.register( (shard.roots,
+                                            shard.subclass_links()) )
+    register_queued()
+    for shard in shards.values():
+        shard.assign_ids()
+
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    manifest = {'version': FORMAT_VERSION, 'roots': root_shards,
+                'shards': {}, 'module_classes': {}}
+    for name, shard in shards.items():
+        filename = '%s.shard' % name
+        out = open(os.path.join(directory, filename), 'wb')
+        try: shard.write(out, shard.root_token)
+        finally: out.close()
+        manifest['shards'][name] = {
+            'filename': filename,
+            'dependencies': sorted(shard.dependencies)}
+    mlclasses = docindex._get_module_classes(docindex.root)
+    for identifier, class_docs in mlclasses.items():
+        if not isinstance(class_docs, list):
+            class_docs = [class_docs]
+        manifest['module_classes'][identifier] = [
+            str(class_doc.canonical_name) for class_doc in class_docs]
+    # The manifest is written last, so an incomplete snapshot can not
+    # be loaded.
+    out = open(os.path.join(directory, MANIFEST_FILENAME), 'w')
+    try: json.dump(manifest, out, indent=1, sort_keys=True)
+    finally: out.close()
+
+class _ShardSerializer(_Serializer):
+    """
+    A helper for L{dump_snapshot()}, which serializes a single shard.
+    The root of each shard is a tuple C{(roots, subclass_links)},
+    where C{roots} lists the shard's elements of the index's root
+    set, and C{subclass_links} is a list of C{(base, subclasses)}
+    pairs, giving the classes that must be added to the
+    C{subclasses} of bases from other shards when it is loaded.
+    """
+    def __init__(self, name, shards):
+        _Serializer.__init__(self)
+        self.name = name
+        """The top-level name of the values in this shard."""
+        self.shards = shards
+        """A dictionary mapping the name of each shard in the
+        snapshot to its C{_ShardSerializer}."""
+        self.roots = []
+        """The elements of the root set that belong to this shard."""
+        self.dependencies = set()
+        """The names of the shards that this shard refers to."""
+        self.own_class_docs = []
+        """The classes that belong to this shard."""
+        self.external_class_docs = {}
+        """The classes from other shards that this shard refers to,
+        keyed by the C{id} of their C{__dict__} (which is shared by
+        merged C{APIDoc}s)."""
+        self.root_token = None
+        """The token of the shard's root value."""
+
+    def shard_of(self, api_doc):
+        """
+        Return the name of the shard that C{api_doc} belongs to, or
+        C{None} if it does not belong to any shard.
+        """
+        if isinstance(api_doc, VariableDoc):
+            api_doc = api_doc.container
+        if isinstance(api_doc, ValueDoc):
+            name = api_doc.canonical_name
+            if isinstance(name, DottedName) and name[0] in self.shards:
+                return name[0]
+        return None
+
+    def add_instance(self, key, value):
+        shard_name = self.shard_of(value)
+        if shard_name in (None, self.name):
+            if isinstance(value, ClassDoc) and shard_name is not None:
+                self.own_class_docs.append(value)
+            return _Serializer.add_instance(self, key, value)
+        shard = self.shards[shard_name]
+        self.dependencies.add(shard_name)
+        if isinstance(value, ClassDoc):
+            self.external_class_docs[id(value.__dict__)] = value
+        payload = (self.register(shard_name), shard, shard.register(value))
+        return self.add(key, _EXTERNAL, value, payload)
+
+    def instance_state(self, value):
+        state = _Serializer.instance_state(self, value)
+        # The copies of values that don't belong to any shard don't
+        # link to other shards (so that using them does not load
+        # every shard that uses them).
+        if isinstance(value, APIDoc) and self.shard_of(value) is None:
+            links = [k for (k, v) in state.items() if isinstance(v, APIDoc)
+                     and self.shard_of(v) not in (None, self.name)]
+            if links:
+                state = dict(state)
+                for key in links: state[key] = UNKNOWN
+        # Leave out any subclasses from other shards.  They will add
+        # themselves when they are loaded.
+        subclasses = state.get('subclasses')
+        if isinstance(value, ClassDoc) and isinstance(subclasses, list):
+            own = [c for c in subclasses
+                   if self.shard_of(c) in (None, self.name)]
+            if len(own) != len(subclasses):
+                state = dict(state, subclasses=own)
+        return state
+
+    def subclass_links(self):
+        own_class_docs = set(map(id, self.own_class_docs))
+        links = []
+        for base_doc in self.external_class_docs.values():
+            if not isinstance(base_doc.subclasses, list): continue
+            subclass_docs = [c for c in base_doc.subclasses
+                             if id(c) in own_class_docs]
+            if subclass_docs:
+                links.append( (base_doc, subclass_docs) )
+        return links
+
+######################################################################
+## Loading
+######################################################################
+
+def load_docindex(stream):
+    """
+    Read a documentation index that was written by L{dump_docindex()}
+    from the binary stream C{stream}, and return it.
+
+    @rtype: L{DocIndex}
+    @raise SerializationError: If C{stream} does not contain a
+        documentation index in the current file format.
+    """
+    deserializer = _Deserializer(stream.read())
+    with _loading():
+        deserializer.create()
+        deserializer.resolve(_no_externals)
+        deserializer.fill_instances()
+        deserializer.fill_containers()
+    docindex = deserializer.root
+    if not isinstance(docindex, DocIndex):
+        raise SerializationError('Corrupt documentation index: %s is '
+                                 'not a DocIndex' % type(docindex).__name__)
+    return docindex
+
+def _no_externals(shard_name, value_id):
+    raise SerializationError('Can not load a shard of a snapshot as a '
+                             'documentation index')
+
+@contextlib.contextmanager
+def _loading():
+    """
+    A context manager for loading serialized values, which disables
+    the garbage collector, and reports any error that is caused by
+    corrupt data as a L{SerializationError}.
+    """
+    # None of the objects that we create can be garbage, so don't let
+    # the garbage collector repeatedly scan them while they are loaded.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    except SerializationError:
+        raise
+    except (ValueError, TypeError, IndexError, KeyError, AttributeError,
+            ImportError, struct.error) as e:
+        raise SerializationError('Corrupt documentation index: %s' % e)
+    finally:
+        if gc_was_enabled: gc.enable()
+
+class _Deserializer:
+    """
+    A helper for L{load_docindex()} and L{SnapshotDocIndex}, which
+    reads the sections that were written by L{_Serializer.write()},
+    in order.  Values are loaded in several steps, so that the
+    values of several shards that refer to each other can be loaded
+    together: L{create()} creates the values (leaving the containers
+    and instances empty), L{resolve()} finds the values from other
+    shards, and L{fill_instances()} and L{fill_containers()} fill
+    in the contents of the empty values.
+    """
+    def __init__(self, data):
+        if not data.startswith(MAGIC):
+            raise SerializationError('Not a serialized documentation index')
+        try:
+            version, = struct.unpack_from('<I', data, len(MAGIC))
+        except struct.error:
+            raise SerializationError('Truncated documentation index')
+        if version != FORMAT_VERSION:
+            raise SerializationError('Unsupported documentation index '
+                                     'format (version %s)' % version)
+        self.data = memoryview(data)
+        self.pos = len(MAGIC) + 4
+        self.table = list(CONSTANTS)
+        """The values, indexed by id."""
+        self.root = None
+        """The root value, once L{resolve()} has been called."""
+
+    def create(self):
+        table = self.table
+        get = table.__getitem__
+
+        # Strings, byte strings and numbers.
+        lengths = self.read_ints()
+        table.extend(_split(self.read_text(), lengths))
+        lengths = self.read_ints()
+        table.extend(_split(self.read_data(), lengths))
+        numbers = self.read_text()
+        if numbers:
+            table.extend([_NUMBER_TYPES[n[0]](n[1:])
+                          for n in numbers.split('\n')])
+
+        # Dotted names and classes.
+        lengths = self.read_ints()
+        table.extend([DottedName(tuple(identifiers)) for identifiers in
+                      _split(list(map(get, self.read_ints())), lengths)])
+        table.extend([_find_class(get(i)) for i in self.read_ints()])
+
+        # Create empty containers and instances; their contents are
+        # filled in once all of the values have been created.
+        self.list_lengths, self.list_items = self.read_ints(), self.read_ints()
+        self.list_objs = [[] for n in self.list_lengths]
+        table.extend(self.list_objs)
+        self.dict_lengths, self.dict_keys = self.read_ints(), self.read_ints()
+        self.dict_values = self.read_ints()
+        self.dict_objs = [{} for n in self.dict_lengths]
+        table.extend(self.dict_objs)
+        self.set_lengths, self.set_items = self.read_ints(), self.read_ints()
+        self.set_objs = [set() for n in self.set_lengths]
+        table.extend(self.set_objs)
+        instance_classes = self.read_ints()
+        self.instance_objs = list(map(object.__new__,
+                                      map(get, instance_classes)))
+        table.extend(self.instance_objs)
+        self.instance_states = list(map(get, self.read_ints()))
+
+    def resolve(self, find_external):
+        """
+        Find the values that belong to other shards, by calling
+        C{find_external} with the name of each value's shard and its
+        id in that shard; and then create the immutable values.
+        """
+        table = self.table
+        get = table.__getitem__
+        shard_names = list(map(get, self.read_ints()))
+        value_ids = self.read_ints()
+        if len(shard_names) != len(value_ids):
+            raise SerializationError('Corrupt documentation index')
+        table.extend(map(find_external, shard_names, value_ids))
+
+        # Immutable values, whose contents always come before them.
+        kinds = self.read_text()
+        lengths = self.read_ints()
+        self.subclass_states = []
+        self.subclass_contents = []
+        for kind, items in zip(kinds, _split(self.read_ints(), lengths)):
+            kind = ord(kind)
+            if kind == _TUPLE:
+                table.append(tuple(map(get, items)))
+            elif kind == _FROZENSET:
+                table.append(frozenset(map(get, items)))
+            elif kind == _SUBCLASS:
+                cls, value, state = map(get, items)
+                base = type(value)
+                if (base not in _SUBCLASSABLE_TYPES or
+                    not issubclass(cls, base)):
+                    raise SerializationError('Corrupt documentation index')
+                if base in _FILL_METHODS:
+                    # The contents of value are filled in later.
+                    obj = base.__new__(cls)
+                    self.subclass_contents.append( (obj, base, value) )
+                else:
+                    obj = base.__new__(cls, value)
+                if state is not None:
+                    self.subclass_states.append( (obj, state) )
+                table.append(obj)
+            else:
+                raise SerializationError('Corrupt documentation index')
+
+        root, = self.read_ints()
+        self.root = table[root]
+
+    def fill_instances(self):
+        # The instances are filled in before any containers, since the
+        # hash values of APIDocs depend on their __dict__.
+        if len(self.instance_states) != len(self.instance_objs):
+            raise SerializationError('Corrupt documentation index')
+        if not set(map(type, self.instance_states)) <= set([dict]):
+            raise SerializationError('Corrupt documentation index')
+        _consume(map(object.__setattr__, self.instance_objs,
+                     itertools.repeat('__dict__'), self.instance_states))
+        for obj, state in self.subclass_states:
+            obj.__dict__.update(state)
+
+    def fill_containers(self):
+        # Each container is filled in by a builtin method, called via
+        # map().
+        get = self.table.__getitem__
+        lengths = self.list_lengths
+        _consume(map(list.extend, self.list_objs,
+                     _split(list(map(get, self.list_items)), lengths)))
+        lengths = self.dict_lengths
+        _consume(map(dict.update, self.dict_objs,
+                     map(zip, _split(list(map(get, self.dict_keys)), lengths),
+                         _split(list(map(get, self.dict_values)), lengths))))
+        lengths = self.set_lengths
+        _consume(map(set.update, self.set_objs,
+                     _split(list(map(get, self.set_items)), lengths)))
+        for obj, base, value in self.subclass_contents:
+            _FILL_METHODS[base](obj, value)
+
+    def read_data(self):
+        n, = struct.unpack_from('<Q', self.data, self.pos)
+        start = self.pos + 8
+        self.pos = start + n
+        if self.pos > len(self.data):
+            raise SerializationError('Truncated documentation index')
+        return self.data[start:self.pos].tobytes()
+
+    def read_text(self):
+        return self.read_data().decode('utf-8', 'surrogatepass')
+
+    def read_ints(self):
+        values = array.array(_INT_TYPECODE)
+        values.frombytes(self.read_data())
+        if sys.byteorder == 'big': values.byteswap()
+        return values
+
+def _split(values, lengths):
+    """
+    Split C{values} into consecutive pieces with the given lengths,
+    and return a list of the pieces.
+    """
+    ends = list(itertools.accumulate(lengths))
+    if (ends[-1] if ends else 0) != len(values):
+        raise SerializationError('Corrupt documentation index')
+    return list(map(values.__getitem__, map(slice, [0]+ends[:-1], ends)))
+
+_consume = collections.deque(maxlen=0).extend
+"""Exhaust an iterator, discarding its values."""
+
+_NUMBER_TYPES = {'i': int, 'f': float, 'c': complex}
+"""The types of the numbers in the number section, by the letter
+that each number starts with."""
+
+def _find_class(name):
+    """
+    Return the class with the given name, as returned by
+    L{_class_name()}.
+
+    @raise SerializationError: If the class may not be loaded (see
+        L{SAFE_MODULES} and L{SAFE_CLASSES}).
+    """
+    try:
+        module_name, qualname = name.split(':')
+    except ValueError:
+        raise SerializationError('Bad class name %r' % name)
+    if not _is_safe_class(module_name, qualname):
+        raise SerializationError('Refusing to load class %s' % name)
+    try:
+        value = importlib.import_module(module_name)
+        for attr in qualname.split('.'):
+            value = getattr(value, attr)
+    except (ImportError, AttributeError):
+        raise SerializationError('Class %s not found' % name)
+    if not isinstance(value, type):
+        raise SerializationError('%s is not a class' % name)
+    # The name must be the class's own name, and not a path through
+    # the attributes of a safe module (such as a module that it
+    # imports) to a class that is not safe.
+    if (value.__module__ != module_name or value.__qualname__ != qualname
+        or not _is_safe_class(value.__module__, value.__qualname__)):
+        raise SerializationError('Refusing to load class %s' % name)
+    return value
+
+#////////////////////////////////////////////////////////////
+# Snapshots
+#////////////////////////////////////////////////////////////
+
+def load_snapshot(directory, max_resident_shards=MAX_RESIDENT_SHARDS):
+    """
+    Open a snapshot that was written by L{dump_snapshot()}.  Only its
+    manifest is read; its shards are loaded when they are needed.
+
+    @param max_resident_shards: The maximum number of shards to keep
+        loaded, or C{None} to keep every shard that is loaded.
+    @rtype: L{SnapshotDocIndex}
+    @raise SerializationError: If C{directory} does not contain a
+        snapshot in the current file format.
+    @raise IOError: If the manifest can not be read.
+    """
+    infile = open(os.path.join(directory, MANIFEST_FILENAME))
+    try:
+        manifest = json.load(infile)
+    except ValueError as e:
+        raise SerializationError('Corrupt snapshot manifest: %s' % e)
+    finally:
+        infile.close()
+    if not isinstance(manifest, dict):
+        raise SerializationError('Corrupt snapshot manifest')
+    if manifest.get('version') != FORMAT_VERSION:
+        raise SerializationError('Unsupported snapshot format (version '
+                                 '%s)' % manifest.get('version'))
+    return SnapshotDocIndex(directory, manifest, max_resident_shards)
+
+class SnapshotDocIndex(DocIndex):
+    """
+    A L{DocIndex} for a snapshot that was written by
+    L{dump_snapshot()}, which loads each shard the first time that a
+    name in it is looked up (with L{get_valdoc()}, L{get_vardoc()} or
+    L{find()}).  Loading a shard also loads the shards that it refers
+    to.  When more than L{max_resident_shards} shards are loaded, the
+    least recently used shards are unloaded, unless a loaded shard
+    refers to them.
+
+    The root set (L{root}) only contains the elements that belong to
+    the loaded shards; call L{load_all_shards()} before using methods
+    (such as L{reachable_valdocs()}) or docwriters that need the
+    whole index.
+    """
+    def __init__(self, directory, manifest, max_resident_shards):
+        DocIndex.__init__(self, [])
+        self.directory = directory
+        """The directory that contains the snapshot."""
+        self.max_resident_shards = max_resident_shards
+        """The maximum number of shards to keep loaded, or C{None}
+        for no limit."""
+        try:
+            self._shard_info = dict(
+                (name, (info['filename'], frozenset(info['dependencies'])))
+                for (name, info) in manifest['shards'].items())
+            self._root_shards = list(manifest['roots'])
+            self.mlclasses = _ModuleClasses(self, manifest['module_classes'])
+        except (KeyError, TypeError, AttributeError) as e:
+            raise SerializationError('Corrupt snapshot manifest: %s' % e)
+        self._shards = collections.OrderedDict()
+        """A dictionary mapping the name of each loaded shard to its
+        C{(roots, subclass_links, table)} tuple, ordered from the
+        least recently used to the most recently used."""
+
+    def shard_names(self):
+        """Return a sorted list of the names of the snapshot's shards."""
+        return sorted(self._shard_info)
+
+    def loaded_shard_names(self):
+        """
+        Return a list of the names of the loaded shards, from the
+        least recently used to the most recently used.
+        """
+        return list(self._shards)
+
+    def load_shard(self, name):
+        """
+        Load the shard with the given name, if it is not loaded yet,
+        and mark it as the most recently used shard.
+
+        @raise SerializationError: If the shard can not be loaded.
+        """
+        if name in self._shards:
+            self._shards.move_to_end(name)
+            return
+        if name not in self._shard_info:
+            raise SerializationError('Snapshot has no shard %r' % name)
+        log.debug('Loading %s from %s' % (name, self.directory))
+
+        # Shards can refer to each other, so load the shard along
+        # with all of the unloaded shards that it (indirectly)
+        # refers to.
+        deserializers = collections.OrderedDict()
+        def find_external(shard_name, value_id):
+            if shard_name in self._shards:
+                table = self._shards[shard_name][2]
+            else:
+                if shard_name not in deserializers:
+                    create(shard_name)
+                table = deserializers[shard_name].table
+            value = table[value_id]
+            if not isinstance(value, APIDoc):
+                raise SerializationError('Corrupt documentation index')
+            return value
+        def create(shard_name):
+            filename = self._shard_info[shard_name][0]
+            infile = open(os.path.join(self.directory, filename), 'rb')
+            try: data = infile.read()
+            finally: infile.close()
+            deserializer = deserializers[shard_name] = _Deserializer(data)
+            deserializer.create()
+            deserializer.resolve(find_external)
+
+        with _loading():
+            create(name)
+            for deserializer in deserializers.values():
+                deserializer.fill_instances()
+            for deserializer in deserializers.values():
+                deserializer.fill_containers()
+            loaded = [(shard_name, deserializer.root)
+                      for (shard_name, deserializer) in deserializers.items()]
+            for shard_name, (roots, subclass_links) in loaded:
+                if not isinstance(roots, list):
+                    raise SerializationError('Corrupt documentation index')
+
+        # The requested shard becomes the most recently used.
+        for shard_name, (roots, subclass_links) in reversed(loaded):
+            for base_doc, subclass_docs in subclass_links:
+                if isinstance(base_doc.subclasses, list):
+                    base_doc.subclasses.extend(subclass_docs)
+            self._shards[shard_name] = (roots, subclass_links,
+                                        deserializers[shard_name].table)
+        self._unload_unused_shards(name)
+        self._shards_changed()
+
+    def load_all_shards(self):
+        """
+        Load every shard of the snapshot, and stop unloading shards.
+        """
+        self.max_resident_shards = None
+        for name in self.shard_names():
+            self.load_shard(name)
+
+    def _unload_unused_shards(self, keep):
+        """
+        Unload the least recently used shards that no other loaded
+        shard refers to, until no more than L{max_resident_shards}
+        are loaded.  The shard named C{keep} is never unloaded.
+        """
+        while (self.max_resident_shards is not None and
+               len(self._shards) > self.max_resident_shards):
+            for name in self._shards:
+                if name == keep: continue
+                if not [other for other in self._shards if other != name and
+                        name in self._shard_info[other][1]]:
+                    break
+            else:
+                return # Every other shard is in use.
+            log.debug('Unloading %s' % name)
+            roots, subclass_links, table = self._shards.pop(name)
+            for base_doc, subclass_docs in subclass_links:
+                if isinstance(base_doc.subclasses, list):
+                    ids = set(map(id, subclass_docs))
+                    base_doc.subclasses[:] = [c for c in base_doc.subclasses
+                                              if id(c) not in ids]
+
+    def _shards_changed(self):
+        """
+        Update the root set, and discard all cached lookups, after
+        shards are loaded or unloaded.
+        """
+        roots = dict((name, iter(shard[0]))
+                     for (name, shard) in self._shards.items())
+        self.root = [next(roots[name]) for name in self._root_shards
+                     if name in roots]
+        self.invalidate_caches()
+        self._get_cache = {}
+        self._container_cache = {}
+
+    def _get(self, name):
+        if not isinstance(name, DottedName):
+            name = DottedName(name)
+        if name[0] in self._shard_info:
+            self.load_shard(name[0])
+        return DocIndex._get(self, name)
+
+class _ModuleClasses:
+    """
+    The L{DocIndex.mlclasses} of a L{SnapshotDocIndex}, which maps
+    each class name to the canonical names of the module-level
+    classes with that name, and looks up their docs when they are
+    needed.
+    """
+    def __init__(self, docindex, names):
+        self.docindex = docindex
+        self.names = dict(names)
+
+    def get(self, identifier, default=None):
+        docs = [self.docindex.get_valdoc(name)
+                for name in self.names.get(identifier, ())]
+        docs = [doc for doc in docs if doc is not None]
+        if not docs:
+            return default
+        elif len(docs) == 1:
+            return docs[0]
+        else:
+            return docs
+
+    def __delitem__(self, identifier):
+        del self.names[identifier]
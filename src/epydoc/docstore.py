@@ -0,0 +1,586 @@
+# epydoc -- Documentation index database
+#
+# Copyright (C) 2005 Edward Loper
+# Author: Edward Loper <edloper@loper.org>
+# URL: <http://epydoc.sf.net>
+#
+# $Id$
+
+"""
+Export a L{DocIndex} to an SQLite database, which can be queried
+without loading the documentation itself.
+
+L{export_docindex()} writes the names, kinds, summaries and links of
+the C{APIDoc}s in a documentation index to a database, using the
+following schema:
+
+  - C{valdocs}: One row for each L{ValueDoc}, giving its C{kind}
+    (see L{KINDS}), C{canonical_name}, C{identifier} (the last
+    identifier of its canonical name), C{defining_module},
+    C{package} (for modules), C{summary}, and C{root_index} (its
+    position in the index's root set, or C{NULL}).
+  - C{vardocs}: One row for each L{VariableDoc}, giving its
+    C{container}, C{name}, C{canonical_name}, C{value},
+    C{imported_from}, C{is_imported}, C{is_alias}, C{is_public},
+    C{is_instvar}, the variable that it C{overrides}, and its
+    C{summary}.
+  - C{variables}: The variables of each namespace (C{namespace},
+    C{name}, C{vardoc}), in order.  These include the variables that
+    classes inherit from their bases, so a variable's C{container}
+    is not always the namespace that it appears in.
+  - C{bases}: The bases of each class, in order (C{class},
+    C{position}, C{base}).
+  - C{imports}: The names of the modules that each module imports
+    (C{module}, C{name}).
+
+Links between C{APIDoc}s are stored as the ids of their rows, and
+unknown values are stored as C{NULL}.  Every column that is used to
+look for rows, or to follow links backwards, has an index.  For
+example, the classes that override a method named C{save} can be
+listed with::
+
+    SELECT c.canonical_name FROM vardocs AS v
+        JOIN valdocs AS c ON v.container = c.id
+        WHERE v.name = 'save' AND v.overrides IS NOT NULL
+
+and the modules that import the class C{Foo} with::
+
+    SELECT v.canonical_name FROM vardocs AS v
+        JOIN valdocs AS val ON v.value = val.id
+        WHERE val.identifier = 'Foo' AND v.is_imported
+
+An exported database can also be opened as an L{SQLiteDocIndex}: a
+read-only C{DocIndex} whose lookup methods are answered from the
+database.
+"""
+__docformat__ = 'epytext en'
+
+######################################################################
+## Imports
+######################################################################
+
+import os, sqlite3, urllib.request
+from epydoc.apidoc import *
+from epydoc.markup import ParsedDocstring
+from epydoc.markup.plaintext import ParsedPlaintextDocstring
+
+######################################################################
+## Schema
+######################################################################
+
+SCHEMA_VERSION = 1
+"""The version of the database schema written by
+L{export_docindex()}.  This must be incremented whenever the schema
+is changed."""
+
+KINDS = [('module', ModuleDoc), ('class', ClassDoc),
+         ('classmethod', ClassMethodDoc), ('staticmethod', StaticMethodDoc),
+         ('routine', RoutineDoc), ('property', PropertyDoc),
+         ('namespace', NamespaceDoc), ('generic', GenericValueDoc),
+         ('value', ValueDoc)]
+"""The values of the C{valdocs.kind} column, and the L{ValueDoc}
+class that each one stands for.  Instances of other subclasses of
+C{ValueDoc} are exported with the kind of their closest base class."""
+
+_SCHEMA = """
+CREATE TABLE valdocs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    canonical_name TEXT,
+    identifier TEXT,
+    defining_module INTEGER REFERENCES valdocs(id),
+    package INTEGER REFERENCES valdocs(id),
+    root_index INTEGER,
+    summary TEXT);
+CREATE TABLE vardocs (
+    id INTEGER PRIMARY KEY,
+    container INTEGER REFERENCES valdocs(id),
+    name TEXT NOT NULL,
+    canonical_name TEXT,
+    value INTEGER REFERENCES valdocs(id),
+    imported_from TEXT,
+    is_imported INTEGER,
+    is_alias INTEGER,
+    is_public INTEGER,
+    is_instvar INTEGER,
+    overrides INTEGER REFERENCES vardocs(id),
+    summary TEXT);
+CREATE TABLE variables (
+    namespace INTEGER NOT NULL REFERENCES valdocs(id),
+    name TEXT NOT NULL,
+    vardoc INTEGER NOT NULL REFERENCES vardocs(id),
+    PRIMARY KEY (namespace, name));
+CREATE TABLE bases (
+    class INTEGER NOT NULL REFERENCES valdocs(id),
+    position INTEGER NOT NULL,
+    base INTEGER NOT NULL REFERENCES valdocs(id),
+    PRIMARY KEY (class, position));
+CREATE TABLE imports (
+    module INTEGER NOT NULL REFERENCES valdocs(id),
+    name TEXT NOT NULL);
+"""
+
+# The indexes are created after the tables are filled in, which is
+# faster than updating them for each row.
+_INDEXES = """
+CREATE INDEX valdocs_canonical_name ON valdocs(canonical_name);
+CREATE INDEX valdocs_identifier ON valdocs(identifier);
+CREATE INDEX valdocs_kind ON valdocs(kind);
+CREATE INDEX valdocs_defining_module ON valdocs(defining_module);
+CREATE INDEX valdocs_package ON valdocs(package);
+CREATE INDEX vardocs_container ON vardocs(container);
+CREATE INDEX vardocs_name ON vardocs(name);
+CREATE INDEX vardocs_canonical_name ON vardocs(canonical_name);
+CREATE INDEX vardocs_value ON vardocs(value);
+CREATE INDEX vardocs_imported_from ON vardocs(imported_from);
+CREATE INDEX vardocs_overrides ON vardocs(overrides);
+CREATE INDEX variables_name ON variables(name);
+CREATE INDEX variables_vardoc ON variables(vardoc);
+CREATE INDEX bases_base ON bases(base);
+CREATE INDEX imports_module ON imports(module);
+CREATE INDEX imports_name ON imports(name);
+"""
+
+class DocStoreError(ValueError):
+    """
+    An exception raised when a file is not a documentation database
+    that was written with the current schema.
+    """
+
+######################################################################
+## Exporting
+######################################################################
+
+def export_docindex(docindex, filename):
+    """
+    Write the contents of C{docindex} to a new SQLite database named
+    C{filename}.  If C{filename} already exists, then it is replaced.
+
+    @raise sqlite3.Error: If the database can not be written.
+    """
+    if os.path.exists(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    try:
+        connection.executescript(_SCHEMA)
+        _Exporter(docindex).export(connection)
+        connection.executescript(_INDEXES)
+        connection.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+        connection.commit()
+    finally:
+        connection.close()
+
+class _Exporter:
+    """
+    A helper for L{export_docindex()}, which assigns a row id to each
+    C{APIDoc}, and builds the rows of each table.  Merged C{APIDoc}s
+    (which share their C{__dict__}) are given a single row.
+    """
+    def __init__(self, docindex):
+        self.docindex = docindex
+        self.valdocs = []
+        """The exported C{ValueDoc}s, in row order."""
+        self.vardocs = []
+        """The exported C{VariableDoc}s, in row order."""
+        self.row_ids = {}
+        """A dictionary mapping the C{id} of each exported C{APIDoc}'s
+        C{__dict__} to its row id."""
+
+    def export(self, connection):
+        # Export the root set, and then the other values that can be
+        # reached from it, in order of their names.  Links to any other
+        # values are left out.
+        reachable = [(str(val_doc.canonical_name), val_doc)
+                     for val_doc in self.docindex.reachable_valdocs()]
+        reachable.sort(key=lambda item: item[0])
+        for val_doc in self.docindex.root + [v for (n, v) in reachable]:
+            row_id = self.row_ids.get(id(val_doc.__dict__))
+            if row_id is None:
+                self.valdocs.append(val_doc)
+                self.row_ids[id(val_doc.__dict__)] = len(self.valdocs)
+            elif issubclass(type(val_doc), type(self.valdocs[row_id-1])):
+                # Use the most specific kind of a merged value.
+                self.valdocs[row_id-1] = val_doc
+
+        root_index = dict((id(val_doc.__dict__), i) for (i, val_doc)
+                          in enumerate(self.docindex.root))
+        valdoc_rows, vardoc_rows, variable_rows = [], [], []
+        base_rows, import_rows = [], []
+        for row_id, val_doc in enumerate(self.valdocs, 1):
+            valdoc_rows.append(self.valdoc_row(row_id, val_doc, root_index))
+            if isinstance(val_doc, NamespaceDoc):
+                if val_doc.variables not in (None, UNKNOWN):
+                    for name, var_doc in val_doc.variables.items():
+                        var_id = self.vardoc_id(var_doc)
+                        if var_id is not None:
+                            variable_rows.append( (row_id, name, var_id) )
+            if isinstance(val_doc, ClassDoc):
+                if val_doc.bases not in (None, UNKNOWN):
+                    for i, base in enumerate(val_doc.bases):
+                        base_id = self.valdoc_id(base)
+                        if base_id is not None:
+                            base_rows.append( (row_id, i, base_id) )
+            if isinstance(val_doc, ModuleDoc):
+                if val_doc.imports not in (None, UNKNOWN):
+                    for name in val_doc.imports:
+                        import_rows.append( (row_id, str(name)) )
+        # (vardoc_row() can add the variables that are overridden.)
+        w = 0
+        while w < len(self.vardocs):
+            var_doc = self.vardocs[w]
+            w += 1
+            vardoc_rows.append(self.vardoc_row(w, var_doc))
+
+        connection.executemany('INSERT INTO valdocs VALUES (?,?,?,?,?,?,?,?)',
+                               valdoc_rows)
+        connection.executemany('INSERT INTO vardocs VALUES '
+                               '(?,?,?,?,?,?,?,?,?,?,?,?)', vardoc_rows)
+        connection.executemany('INSERT INTO variables VALUES (?,?,?)',
+                               variable_rows)
+        connection.executemany('INSERT INTO bases VALUES (?,?,?)', base_rows)
+        connection.executemany('INSERT INTO imports VALUES (?,?)', import_rows)
+
+    def valdoc_id(self, val_doc):
+        """
+        Return the row id of C{val_doc}, or C{None} if it is not
+        exported.
+        """
+        if not isinstance(val_doc, ValueDoc): return None
+        return self.row_ids.get(id(val_doc.__dict__))
+
+    def vardoc_id(self, var_doc):
+        """
+        Return the row id of C{var_doc}, adding it to the list of
+        variables to export if necessary; or C{None} if it is not
+        contained by an exported value.
+        """
+        if not isinstance(var_doc, VariableDoc): return None
+        row_id = self.row_ids.get(id(var_doc.__dict__))
+        if row_id is None and self.valdoc_id(var_doc.container) is not None:
+            self.vardocs.append(var_doc)
+            row_id = self.row_ids[id(var_doc.__dict__)] = len(self.vardocs)
+        return row_id
+
+    def valdoc_row(self, row_id, val_doc, root_index):
+        name = val_doc.canonical_name
+        if isinstance(name, DottedName):
+            name, identifier = str(name), name[-1]
+        else:
+            name = identifier = None
+        package = None
+        if isinstance(val_doc, ModuleDoc):
+            package = self.valdoc_id(val_doc.package)
+        return (row_id, _kind(val_doc), name, identifier,
+                self.valdoc_id(val_doc.defining_module), package,
+                root_index.get(id(val_doc.__dict__)), _summary(val_doc))
+
+    def vardoc_row(self, row_id, var_doc):
+        name = var_doc.canonical_name
+        if not isinstance(name, DottedName):
+            container_name = getattr(var_doc.container, 'canonical_name', None)
+            if (isinstance(container_name, DottedName) and
+                var_doc.name not in (None, UNKNOWN)):
+                name = container_name + var_doc.name
+        if isinstance(name, DottedName):
+            name = str(name)
+        else:
+            name = None
+        imported_from = var_doc.imported_from
+        if isinstance(imported_from, DottedName):
+            imported_from = str(imported_from)
+        else:
+            imported_from = None
+        return (row_id, self.valdoc_id(var_doc.container), var_doc.name,
+                name, self.valdoc_id(var_doc.value), imported_from,
+                _flag(var_doc.is_imported), _flag(var_doc.is_alias),
+                _flag(var_doc.is_public), _flag(var_doc.is_instvar),
+                self.vardoc_id(var_doc.overrides), _summary(var_doc))
+
+def _kind(val_doc):
+    """Return the value of the C{valdocs.kind} column for C{val_doc}."""
+    for cls in type(val_doc).__mro__:
+        kind = _KIND_NAMES.get(cls)
+        if kind is not None:
+            return kind
+
+_KIND_NAMES = dict((cls, kind) for (kind, cls) in KINDS)
+_KIND_CLASSES = dict(KINDS)
+
+def _summary(api_doc):
+    """Return the text of C{api_doc}'s summary, or C{None}."""
+    if isinstance(api_doc.summary, ParsedDocstring):
+        return api_doc.summary.to_plaintext(None).strip()
+    return None
+
+def _flag(value):
+    """Return the value of a column for the boolean C{value}."""
+    if value is True: return 1
+    if value is False: return 0
+    return None
+
+######################################################################
+## Lookup
+######################################################################
+
+class SQLiteDocIndex(DocIndex):
+    """
+    A read-only L{DocIndex} for a database that was written by
+    L{export_docindex()}.  L{get_valdoc()}, L{get_vardoc()},
+    L{find()} and L{container()} look up the C{APIDoc}s that they
+    return in the database.
+
+    The C{APIDoc}s are created from the database when they are first
+    needed, so each one only contains the information that the
+    database stores: its name, summary, and links.  The links of the
+    C{APIDoc}s that are returned by the lookup methods (and the
+    elements of L{root}) are filled in; but the C{APIDoc}s that they
+    link to only have their names and summaries, until they are
+    looked up themselves.  So methods that walk the whole index (such
+    as L{reachable_valdocs()}), and the docwriters, can not be used.
+    """
+    def __init__(self, filename):
+        """
+        Open the database C{filename}.
+
+        @raise DocStoreError: If C{filename} was not written by
+            L{export_docindex()} with the current schema.
+        @raise sqlite3.Error: If the database can not be opened.
+        """
+        DocIndex.__init__(self, [])
+        if not os.path.exists(filename):
+            raise DocStoreError('%s does not exist' % filename)
+        url = 'file:%s?mode=ro' % urllib.request.pathname2url(
+            os.path.abspath(filename))
+        self.connection = sqlite3.connect(url, uri=True)
+        """The connection to the database, which can be used for
+        other queries."""
+        try:
+            version, = self.connection.execute(
+                'PRAGMA user_version').fetchone()
+            tables = set([name for (name,) in self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")])
+        except sqlite3.DatabaseError as e:
+            raise DocStoreError('%s is not a documentation database: %s' %
+                                (filename, e))
+        if 'valdocs' not in tables or version != SCHEMA_VERSION:
+            raise DocStoreError('%s is not a documentation database with '
+                                'schema version %s' %
+                                (filename, SCHEMA_VERSION))
+
+        self._valdocs = {}
+        """A dictionary mapping row ids to the C{ValueDoc}s that have
+        been created for them."""
+        self._vardocs = {}
+        """A dictionary mapping row ids to the C{VariableDoc}s that
+        have been created for them."""
+        self._links = {}
+        """A dictionary mapping the C{id} of each C{APIDoc} whose
+        links have not been filled in yet to its row."""
+
+        self.root = self._get_valdocs([row_id for (row_id,) in self._query(
+            'SELECT id FROM valdocs WHERE root_index IS NOT NULL '
+            'ORDER BY root_index')])
+        for val_doc in self.root:
+            self._fill_links(val_doc)
+
+        # Module-level classes, as collected by _get_module_classes().
+        self.mlclasses = {}
+        for class_doc in self._get_valdocs([row_id for (row_id,) in self._query(
+            'SELECT c.id FROM vardocs AS v '
+            'JOIN valdocs AS c ON v.value = c.id '
+            'JOIN valdocs AS m ON v.container = m.id '
+            "WHERE m.kind = 'module' AND m.root_index IS NOT NULL AND "
+            "c.kind = 'class' AND c.defining_module = m.id AND "
+            'c.canonical_name IS NOT NULL '
+            'ORDER BY m.root_index, v.id')]):
+            name = class_doc.canonical_name[-1]
+            vals = self.mlclasses.get(name)
+            if vals is None:
+                self.mlclasses[name] = class_doc
+            elif not isinstance(vals, list):
+                self.mlclasses[name] = [vals, class_doc]
+            else:
+                vals.append(class_doc)
+
+    def close(self):
+        """Close the connection to the database."""
+        self.connection.close()
+
+    #////////////////////////////////////////////////////////////
+    # Lookup methods
+    #////////////////////////////////////////////////////////////
+
+    def _get(self, name):
+        if not isinstance(name, DottedName):
+            name = DottedName(name)
+        val = self._get_cache.get(name)
+        if val is None:
+            val = self._get_cache[name] = self._lookup(name)
+        return val
+
+    def _lookup(self, name):
+        """
+        Return the C{(VariableDoc, ValueDoc)} pair with the given
+        name, as returned by L{DocIndex._get()}.
+        """
+        # Like DocIndex._get(), only find names inside of the root set.
+        for val_doc in self.root:
+            if val_doc.canonical_name.dominates(name):
+                break
+        else:
+            return None, None
+
+        # Is it the name of a variable?
+        row = None
+        if len(name) > 1:
+            row = self._query('SELECT v.vardoc FROM variables AS v '
+                              'JOIN valdocs AS c ON v.namespace = c.id '
+                              'WHERE c.canonical_name = ? AND v.name = ? '
+                              'ORDER BY c.root_index IS NULL, c.id LIMIT 1',
+                              str(name.container()), name[-1])
+        if row:
+            var_doc = self._get_vardocs([row[0][0]])[0]
+            self._fill_links(var_doc)
+            val_doc = var_doc.value
+            if isinstance(val_doc, ValueDoc):
+                self._fill_links(val_doc)
+                return var_doc, val_doc
+            return var_doc, None
+
+        # Is it the canonical name of a value (such as a submodule)?
+        row = self._query('SELECT id FROM valdocs WHERE canonical_name = ? '
+                          'ORDER BY root_index IS NULL, id LIMIT 1', str(name))
+        if row:
+            val_doc = self._get_valdocs([row[0][0]])[0]
+            self._fill_links(val_doc)
+            return None, val_doc
+
+        # Is it a name inside of a value that is known by another name
+        # (e.g., an imported module)?
+        for i in range(len(name)-1, 0, -1):
+            var_doc, val_doc = self._get(name[:i])
+            if val_doc is not None:
+                if (isinstance(val_doc.canonical_name, DottedName) and
+                    val_doc.canonical_name != name[:i]):
+                    return self._get(val_doc.canonical_name + name[i:])
+                break
+        return None, None
+
+    def find(self, name, context, not_found_exception=False):
+        doc = DocIndex.find(self, name, context, not_found_exception)
+        if doc is not None:
+            self._fill_links(doc)
+        return doc
+    find.__doc__ = DocIndex.find.__doc__
+
+    #////////////////////////////////////////////////////////////
+    # Creating APIDocs
+    #////////////////////////////////////////////////////////////
+
+    def _query(self, sql, *args):
+        return self.connection.execute(sql, args).fetchall()
+
+    def _get_valdocs(self, row_ids):
+        """
+        Return a list of the C{ValueDoc}s with the given row ids,
+        creating any that have not been created yet.
+        """
+        missing = [i for i in row_ids if i not in self._valdocs]
+        for row in self._select('valdocs', missing):
+            (row_id, kind, name, identifier, defining_module, package,
+             root_index, summary) = row
+            val_doc = _KIND_CLASSES[kind]()
+            if name is not None:
+                val_doc.canonical_name = DottedName(name)
+            if summary is not None:
+                val_doc.summary = ParsedPlaintextDocstring(summary)
+            self._valdocs[row_id] = val_doc
+            self._links[id(val_doc)] = row
+        return [self._valdocs[i] for i in row_ids]
+
+    def _get_vardocs(self, row_ids):
+        """
+        Return a list of the C{VariableDoc}s with the given row ids,
+        creating any that have not been created yet.
+        """
+        missing = [i for i in row_ids if i not in self._vardocs]
+        for row in self._select('vardocs', missing):
+            (row_id, container, name, canonical_name, value, imported_from,
+             is_imported, is_alias, is_public, is_instvar, overrides,
+             summary) = row
+            var_doc = VariableDoc(name=name)
+            if canonical_name is not None:
+                var_doc.canonical_name = DottedName(canonical_name)
+            if imported_from is not None:
+                var_doc.imported_from = DottedName(imported_from)
+            for attr, flag in [('is_imported', is_imported),
+                               ('is_alias', is_alias),
+                               ('is_public', is_public),
+                               ('is_instvar', is_instvar)]:
+                if flag is not None:
+                    setattr(var_doc, attr, bool(flag))
+            if summary is not None:
+                var_doc.summary = ParsedPlaintextDocstring(summary)
+            self._vardocs[row_id] = var_doc
+            self._links[id(var_doc)] = row
+        return [self._vardocs[i] for i in row_ids]
+
+    def _select(self, table, row_ids):
+        """Return the rows of C{table} with the given ids."""
+        rows = []
+        for i in range(0, len(row_ids), 500):
+            chunk = row_ids[i:i+500]
+            rows += self._query('SELECT * FROM %s WHERE id IN (%s)' %
+                                (table, ','.join('?'*len(chunk))), *chunk)
+        return rows
+
+    def _fill_links(self, api_doc):
+        """
+        Fill in the links of C{api_doc}, if they have not been filled
+        in yet.
+        """
+        row = self._links.pop(id(api_doc), None)
+        if row is None:
+            return
+        if isinstance(api_doc, VariableDoc):
+            (row_id, container, name, canonical_name, value, imported_from,
+             is_imported, is_alias, is_public, is_instvar, overrides,
+             summary) = row
+            if container is not None:
+                api_doc.container = self._get_valdocs([container])[0]
+            if value is not None:
+                api_doc.value = self._get_valdocs([value])[0]
+            if overrides is not None:
+                api_doc.overrides = self._get_vardocs([overrides])[0]
+            return
+
+        (row_id, kind, name, identifier, defining_module, package,
+         root_index, summary) = row
+        if defining_module is not None:
+            api_doc.defining_module = self._get_valdocs([defining_module])[0]
+        if isinstance(api_doc, NamespaceDoc):
+            rows = self._query('SELECT name, vardoc FROM variables '
+                               'WHERE namespace = ? ORDER BY rowid', row_id)
+            var_docs = self._get_vardocs([var_id for (name, var_id) in rows])
+            api_doc.variables = {}
+            for (name, var_id), var_doc in zip(rows, var_docs):
+                self._fill_links(var_doc)
+                api_doc.variables[name] = var_doc
+        if isinstance(api_doc, ClassDoc):
+            rows = self._query('SELECT base FROM bases WHERE class = ? '
+                               'ORDER BY position', row_id)
+            api_doc.bases = self._get_valdocs([base for (base,) in rows])
+            rows = self._query('SELECT class FROM bases WHERE base = ? '
+                               'ORDER BY class', row_id)
+            api_doc.subclasses = self._get_valdocs([c for (c,) in rows])
+        if isinstance(api_doc, ModuleDoc):
+            if package is not None:
+                api_doc.package = self._get_valdocs([package])[0]
+            else:
+                api_doc.package = None
+            rows = self._query('SELECT id FROM valdocs WHERE package = ? '
+                               'ORDER BY id', row_id)
+            api_doc.submodules = self._get_valdocs([m for (m,) in rows])
+            rows = self._query('SELECT name FROM imports WHERE module = ? '
+                               'ORDER BY rowid', row_id)
+            api_doc.imports = [DottedName(name) for (name,) in rows]
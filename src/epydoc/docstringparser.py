@@ -29,12 +29,12 @@ __docformat__ = 'epytext en'
 ## Imports
 ######################################################################
 
-import re, sys
+import re, sys, os, io, hashlib, pickle
 from epydoc import markup
 from epydoc.markup import epytext
 from epydoc.apidoc import *
 from epydoc.docintrospecter import introspect_docstring_lineno
-from epydoc.util import py_src_filename
+from epydoc.util import py_src_filename, find_epydoc_class
 from epydoc import log
 import epydoc.docparser
 import builtins
@@ -163,6 +163,18 @@ STANDARD_FIELDS = [
 DEFAULT_DOCFORMAT = 'epytext'
 """The name of the default markup languge used to process docstrings."""
 
+PARSED_DOCSTRING_CACHE = None
+"""A dictionary used by L{parse_and_split} to reuse the results of
+parsing docstrings, or C{None} to disable caching.  Keys are digests
+of the docstring and its markup language; values are pickled
+C{(descr, fields, errors)} tuples.  Since each cache hit is
+unpickled, the parsed docstrings it returns are never shared.
+@see: L{load_parsed_docstring_cache}, L{save_parsed_docstring_cache}"""
+
+_parsed_docstring_keys_used = set()
+"""The keys of L{PARSED_DOCSTRING_CACHE} that were used by
+L{parse_and_split}."""
+
 # [xx] keep track of which ones we've already done, in case we're
 # asked to process one twice?  e.g., for @include we might have to
 # parse the included docstring earlier than we might otherwise..??
@@ -210,15 +222,13 @@ def parse_docstring(api_doc, docindex, suppress_warnings=[]):
     if isinstance(api_doc, RoutineDoc):
         parse_function_signature(api_doc, None, docformat, parse_errors)
 
-    # Parse the docstring.  Any errors encountered are stored as
+    # Parse the docstring, and divide it into a description and a
+    # list of fields.  Any errors encountered are stored as
     # `ParseError` objects in the errors list.
-    parsed_docstring = markup.parse(api_doc.docstring, docformat,
+    descr, fields = parse_and_split(api_doc.docstring, docformat,
                                     parse_errors)
-        
-    # Divide the docstring into a description and a list of
-    # fields.
-    descr, fields = parsed_docstring.split_fields(parse_errors)
     api_doc.descr = descr
+    log.count('docstrings')
 
     field_warnings = []
 
@@ -286,6 +296,146 @@ def parse_docstring(api_doc, docindex, suppress_warnings=[]):
     else:
         report_errors(api_doc, docindex, parse_errors, field_warnings)
 
+def defer_parse_docstring(api_doc, docindex, suppress_warnings=()):
+    """
+    Arrange for L{parse_docstring()} to process the given C{APIDoc}'s
+    docstring the first time that any of the attributes it fills in
+    is used, rather than now.  Any warnings are reported at that
+    time.  See L{APIDoc.defer_docstring_parse()}.
+    """
+    def parse(api_doc):
+        parse_docstring(api_doc, docindex, suppress_warnings)
+    api_doc.defer_docstring_parse(parse)
+
+def parse_and_split(docstring, docformat, parse_errors):
+    """
+    Parse the given docstring using the markup language C{docformat},
+    and split it into a description and a list of fields.  If
+    L{PARSED_DOCSTRING_CACHE} is not C{None}, then it is used to
+    reuse the result of a previous call with the same arguments.
+
+    @return: A tuple C{(descr, fields)}, as returned by
+        L{ParsedDocstring.split_fields()
+        <markup.ParsedDocstring.split_fields>}.
+    @param parse_errors: A list where any errors generated during
+        parsing will be stored.
+    """
+    if PARSED_DOCSTRING_CACHE is None and not _worker_parses:
+        parsed_docstring = markup.parse(docstring, docformat, parse_errors)
+        return parsed_docstring.split_fields(parse_errors)
+
+    key = _parsed_docstring_key(docstring, docformat)
+    if key in _worker_parses:
+        cached = _get_worker_parse(key)
+        if cached is not None and PARSED_DOCSTRING_CACHE is not None:
+            PARSED_DOCSTRING_CACHE[key] = cached
+    else:
+        cached = None
+    if cached is None and PARSED_DOCSTRING_CACHE is not None:
+        cached = PARSED_DOCSTRING_CACHE.get(key)
+    if cached is not None:
+        try:
+            descr, fields, errors = _load_parsed_docstring(cached)
+        except Exception as e:
+            log.debug('Unable to load cached parsed docstring: %s' % e)
+            if PARSED_DOCSTRING_CACHE is not None:
+                PARSED_DOCSTRING_CACHE.pop(key, None)
+        else:
+            markup.MARKUP_LANGUAGES_USED.add(docformat.lower())
+            parse_errors.extend(errors)
+            if PARSED_DOCSTRING_CACHE is not None:
+                _parsed_docstring_keys_used.add(key)
+            return descr, fields
+    if PARSED_DOCSTRING_CACHE is None:
+        parsed_docstring = markup.parse(docstring, docformat, parse_errors)
+        return parsed_docstring.split_fields(parse_errors)
+
+    errors = []
+    parsed_docstring = markup.parse(docstring, docformat, errors)
+    descr, fields = parsed_docstring.split_fields(errors)
+    parse_errors.extend(errors)
+
+    # Only cache the result if the markup language's own parser was
+    # used; otherwise, a warning that should be reported on every run
+    # was generated.
+    if docformat.lower() in markup.MARKUP_LANGUAGES_USED:
+        try:
+            PARSED_DOCSTRING_CACHE[key] = pickle.dumps(
+                (descr, fields, errors), pickle.HIGHEST_PROTOCOL)
+            _parsed_docstring_keys_used.add(key)
+        except Exception as e:
+            log.debug('Unable to cache parsed docstring: %s' % e)
+    return descr, fields
+
+def _parsed_docstring_key(docstring, docformat):
+    """
+    Return the key used by L{PARSED_DOCSTRING_CACHE} for the result
+    of parsing C{docstring} using the markup language C{docformat}.
+    """
+    return hashlib.sha1(('%s\0%s' % (docformat, docstring)).encode(
+        'utf-8', 'surrogatepass')).digest()
+
+class _ParsedDocstringUnpickler(pickle.Unpickler):
+    """
+    An unpickler used to load the entries of
+    L{PARSED_DOCSTRING_CACHE}, and the cache file itself.  Only
+    classes defined by epydoc itself may be loaded, so a tampered
+    cache file can not be used to run arbitrary code.
+    """
+    def find_class(self, module, name):
+        try:
+            return find_epydoc_class(module, name)
+        except ValueError as e:
+            raise pickle.UnpicklingError('%s' % e)
+
+def _load_parsed_docstring(data):
+    """
+    Return the C{(descr, fields, errors)} tuple that was pickled as
+    C{data} by L{parse_and_split()}.
+    """
+    return _ParsedDocstringUnpickler(io.BytesIO(data)).load()
+
+def load_parsed_docstring_cache(filename):
+    """
+    Set L{PARSED_DOCSTRING_CACHE} to the cache that was stored in
+    C{filename} by L{save_parsed_docstring_cache}.  If C{filename}
+    does not exist or can not be read, then start with an empty
+    cache.
+    """
+    global PARSED_DOCSTRING_CACHE
+    PARSED_DOCSTRING_CACHE = {}
+    _parsed_docstring_keys_used.clear()
+    if not os.path.exists(filename): return
+    try:
+        with open(filename, 'rb') as stream:
+            version, cache = _ParsedDocstringUnpickler(stream).load()
+        if version == epydoc.__version__:
+            PARSED_DOCSTRING_CACHE = cache
+    except Exception as e:
+        log.debug('Unable to load parsed docstring cache %s: %s' %
+                  (filename, e))
+
+def save_parsed_docstring_cache(filename):
+    """
+    Write the entries of L{PARSED_DOCSTRING_CACHE} that were used
+    since it was loaded to C{filename}.  Entries for docstrings that
+    were not parsed (e.g., because they were changed or removed) are
+    discarded.
+    """
+    if PARSED_DOCSTRING_CACHE is None: return
+    cache = dict((key, PARSED_DOCSTRING_CACHE[key])
+                 for key in _parsed_docstring_keys_used)
+    tmpname = '%s.%d.tmp' % (filename, os.getpid())
+    try:
+        with open(tmpname, 'wb') as stream:
+            pickle.dump((epydoc.__version__, cache), stream,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpname, filename)
+    except (IOError, OSError, pickle.PicklingError) as e:
+        log.error('Unable to save parsed docstring cache %s: %s' %
+                  (filename, e))
+        if os.path.exists(tmpname): os.remove(tmpname)
+
 def add_metadata_from_var(api_doc, field):
     for varname in field.varnames:
         # Check if api_doc has a variable w/ the given name.
@@ -552,6 +702,130 @@ construct summary descriptions for routines that have empty C{descr},
 but non-empty C{return_descr}."""
 RETURN_PDS._tree.children[0].attribs['inline'] = True
 
+######################################################################
+#{ Parallel Docstring Parsing
+######################################################################
+
+_worker_parses = {}
+"""A dictionary mapping the keys of docstrings that are being parsed
+(or were parsed) by worker processes to their results.  Each value is
+either a pickled C{(descr, fields, errors)} tuple, as stored in
+L{PARSED_DOCSTRING_CACHE}; or a C{(keys, result)} tuple for a batch
+of docstrings whose worker has not been waited for yet.
+@see: L{add_worker_parses}"""
+
+def predict_parse(api_doc, docindex):
+    """
+    Return a tuple C{(key, docstring, docformat)} containing the
+    arguments that L{parse_docstring()} will pass to
+    L{parse_and_split()} when it processes C{api_doc}, and the key
+    that C{parse_and_split()} will use to look up its result; or
+    C{None} if it will not parse anything.
+    This does not modify C{api_doc}.  The prediction may be wrong if
+    C{api_doc} is modified before it is processed (e.g., if its
+    defining module is changed); in that case, the docstring will
+    simply be parsed by C{parse_docstring()} itself.
+    """
+    if (api_doc.metadata is not UNKNOWN or
+        api_doc.docstring in (None, UNKNOWN)):
+        return None
+    docstring = unindent_docstring(api_doc.docstring)
+    # parse_function_signature() removes the signature first.
+    if isinstance(api_doc, RoutineDoc):
+        m = _SIGNATURE_RE.match(docstring)
+        if m is not None: docstring = docstring[m.end():]
+    docformat = get_docformat(api_doc, docindex)
+    return (_parsed_docstring_key(docstring, docformat),
+            docstring, docformat)
+
+def init_worker(debug):
+    """
+    Initialize a worker process that will be used to parse docstrings
+    with L{parse_docstrings_in_worker()}.
+
+    @param debug: The value of C{epydoc.DEBUG} in the main process.
+    """
+    epydoc.DEBUG = debug
+    log.start_recording(log.Logger())
+
+def parse_docstrings_in_worker(items):
+    """
+    Parse and split each docstring in C{items}, and return a
+    dictionary mapping each item's key to its pickled C{(descr,
+    fields, errors)} tuple.  Docstrings whose parsing generated any
+    log messages (e.g., because the markup language's parser could
+    not be used), or whose result can not be pickled, are left out;
+    they will be parsed by the main process instead, so that any
+    messages are reported in the right place.
+
+    @param items: A list of C{(key, docstring, docformat)} tuples,
+        as returned by L{predict_parse()}.
+    """
+    results = {}
+    for key, docstring, docformat in items:
+        recorder = log.MessageRecorder()
+        log.start_recording(recorder)
+        try:
+            errors = []
+            parsed_docstring = markup.parse(docstring, docformat, errors)
+            descr, fields = parsed_docstring.split_fields(errors)
+        except Exception:
+            continue
+        finally:
+            log.end_recording()
+        if recorder.records: continue
+        if docformat.lower() not in markup.MARKUP_LANGUAGES_USED: continue
+        try:
+            results[key] = pickle.dumps((descr, fields, errors),
+                                        pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            pass
+    return results
+
+def add_worker_parses(keys, result):
+    """
+    Register a batch of docstrings that is being parsed by a worker
+    process.  When L{parse_and_split()} needs one of them, it calls
+    C{result()} to wait for the worker to finish.
+
+    @param keys: The keys of the docstrings in the batch.
+    @param result: A function that returns the dictionary returned by
+        L{parse_docstrings_in_worker()} for the batch.
+    """
+    pending = (keys, result)
+    for key in keys:
+        _worker_parses.setdefault(key, pending)
+
+def clear_worker_parses():
+    """
+    Discard the results of any docstrings that were parsed by worker
+    processes.
+    """
+    _worker_parses.clear()
+
+def _get_worker_parse(key):
+    """
+    Return the pickled result of parsing the docstring with the given
+    key in a worker process, or C{None} if it is not available.
+    """
+    value = _worker_parses.get(key)
+    if isinstance(value, tuple):
+        keys, result = value
+        try:
+            results = result()
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            log.debug('Parsing docstrings in a worker process failed: %s'
+                      % e)
+            results = {}
+        for k in keys:
+            if _worker_parses.get(k) is value:
+                if k in results: _worker_parses[k] = results[k]
+                else: del _worker_parses[k]
+        value = _worker_parses.get(key)
+    return value
+
 ######################################################################
 #{ Field Processing Error Messages
 ######################################################################
@@ -703,6 +977,7 @@ def process_undocumented_field(api_doc, docindex, tag, arg, descr):
                     for m in removed:
                         if m.canonical_name.dominates(elt.canonical_name):
                             docindex.root.remove(elt)
+    docindex.invalidate_caches()
 
 def process_group_field(api_doc, docindex, tag, arg, descr):
     """Define a group named C{arg} containing the variables whose
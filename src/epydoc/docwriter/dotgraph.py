@@ -383,6 +383,7 @@ class DotGraph(object):
                 log.debug('Failed dot graph written to %s' % filename)
             return None
 
+        log.count('graphs')
         return result
 
     def to_dotfile(self, size=None):
@@ -1531,8 +1532,8 @@ def get_dot_version():
             else:
                 _dot_version = (0,)
         except OSError as e:
-            log.error('dot executable not found; graphs will not be '
-                      'generated.  Adjust your shell\'s path, or use '
+            log.error('dot executable (%r) not found; graphs will not '
+                      'be generated.  Adjust your shell\'s path, or use '
                       '--dotpath to specify the path to the dot '
                       'executable.' % DOT_COMMAND)
             _dot_version = (0,)
@@ -297,6 +297,14 @@ class HTMLWriter:
         @type src_code_tab_width: C{int}
         @keyword src_code_tab_width: Number of spaces to replace each tab
             with in source code listings.
+        @type release_docs: C{boolean}
+        @keyword release_docs: If true, then write the pages for each
+            module (its module page, the pages for the classes it
+            contains, and its source code page) together, and release
+            the documentation for each object once every page that
+            describes it has been written (see L{APIDoc.release()}).
+            The C{docindex} can not be used to write any other output
+            afterwards.
         """
         self.docindex = docindex
 
@@ -379,6 +387,11 @@ class HTMLWriter:
         self._show_submodule_list = kwargs.get('show_submodule_list', True)
         """If true, the include a list of submodules on the package
         documentation page."""
+
+        self._release_docs = kwargs.get('release_docs', False)
+        """If true, then write the pages for each module together, and
+        release the documentation for each object once it has been
+        written."""
         
         # For use with select_variables():
         if self._show_private:
@@ -643,18 +656,10 @@ class HTMLWriter:
                 filename = 'toc-%s' % urllib.parse.unquote(self.url(doc))
                 self._write(self.write_module_toc, directory, filename, doc)
 
-        # Write the object documentation.
-        for doc in self.module_list:
-            filename = urllib.parse.unquote(self.url(doc))
-            self._write(self.write_module, directory, filename, doc)
-        for doc in self.class_list:
-            filename = urllib.parse.unquote(self.url(doc))
-            self._write(self.write_class, directory, filename, doc)
-
-        # Write source code files.
+        # Build a map from short names to APIDocs, used when linking
+        # names in the source code.
+        name_to_docs = None
         if self._incl_sourcecode:
-            # Build a map from short names to APIDocs, used when
-            # linking names in the source code.
             name_to_docs = {}
             for api_doc in self.indexed_docs:
                 if (api_doc.canonical_name is not None and
@@ -664,11 +669,27 @@ class HTMLWriter:
             # Sort each entry of the name_to_docs list.
             for doc_list in name_to_docs.values():
                 doc_list.sort()
-            # Write the source code for each module.
-            for doc in self.modules_with_sourcecode:
-                filename = urllib.parse.unquote(self.pysrc_url(doc))
-                self._write(self.write_sourcecode, directory, filename, doc,
-                            name_to_docs)
+
+        if self._release_docs:
+            # Write the object documentation & source code files,
+            # module by module.  (The indices are no longer needed.)
+            indices = ident_by_letter = term_by_letter = None
+            self._write_pages_by_module(directory, name_to_docs)
+        else:
+            # Write the object documentation.
+            for doc in self.module_list:
+                filename = urllib.parse.unquote(self.url(doc))
+                self._write(self.write_module, directory, filename, doc)
+            for doc in self.class_list:
+                filename = urllib.parse.unquote(self.url(doc))
+                self._write(self.write_class, directory, filename, doc)
+
+            # Write source code files.
+            if self._incl_sourcecode:
+                for doc in self.modules_with_sourcecode:
+                    filename = urllib.parse.unquote(self.pysrc_url(doc))
+                    self._write(self.write_sourcecode, directory, filename,
+                                doc, name_to_docs)
 
         # Write the auto-redirect page.
         self._write(self.write_redirect_page, directory, 'redirect.html')
@@ -710,10 +731,92 @@ class HTMLWriter:
          ValueDoc.REPR_MAXLINES) = orig_valdoc_defaults
         ParsedEpytextDocstring.SYMBOL_TO_HTML['crarr'] = orig_crarr_html
 
+    def _write_pages_by_module(self, directory, name_to_docs):
+        """
+        Write the page for each module, followed by the pages for the
+        classes that it defines and its source code page.  Release
+        the documentation for each object as soon as all of the pages
+        that describe it have been written.  This is used instead of
+        writing all module pages, then all class pages, when
+        C{release_docs} is true.
+        """
+        # Group the classes by the module that defines them.
+        classes_by_module = {}
+        for doc in self.class_list:
+            module = doc.defining_module
+            if module not in self.module_set: module = None
+            classes_by_module.setdefault(module, []).append(doc)
+
+        # Count the pages that describe each APIDoc.  (UML class
+        # diagrams describe the members of other classes, so nothing
+        # described by a class page is released if they are used.)
+        described = {}
+        refcounts = {}
+        pinned = set()
+        for doc in self.module_list + self.class_list:
+            described[doc] = self._described_docs(doc)
+            for api_doc in described[doc]:
+                refcounts[api_doc] = refcounts.get(api_doc, 0) + 1
+            if (isinstance(doc, ClassDoc) and
+                'umlclasstree' in self._graph_types):
+                pinned.update(described[doc])
+
+        def write_page(write_func, filename, doc):
+            self._write(write_func, directory, filename, doc)
+            for api_doc in described.pop(doc):
+                refcounts[api_doc] -= 1
+                if refcounts[api_doc] == 0 and api_doc not in pinned:
+                    api_doc.release()
+                    log.count('docs_released')
+
+        for module in self.module_list + [None]:
+            if module is not None:
+                write_page(self.write_module,
+                           urllib.parse.unquote(self.url(module)), module)
+            for doc in classes_by_module.get(module, ()):
+                write_page(self.write_class,
+                           urllib.parse.unquote(self.url(doc)), doc)
+            if (self._incl_sourcecode and
+                module in self.modules_with_sourcecode):
+                filename = urllib.parse.unquote(self.pysrc_url(module))
+                self._write(self.write_sourcecode, directory, filename,
+                            module, name_to_docs)
+
+    def _described_docs(self, doc):
+        """
+        Return the set of C{APIDoc}s whose documentation may be used
+        to write the page for the given module or class: the module
+        or class itself, its variables and their values, the
+        variables that they override, and the submodules of a
+        package.
+        """
+        docs = set([doc])
+        if isinstance(doc, ModuleDoc) and doc.submodules not in (None, UNKNOWN):
+            docs.update(doc.submodules)
+        for var_doc in doc.variables.values():
+            docs.add(var_doc)
+            if isinstance(var_doc.overrides, VariableDoc):
+                docs.add(var_doc.overrides)
+                if isinstance(var_doc.overrides.value, ValueDoc):
+                    docs.add(var_doc.overrides.value)
+            val_doc = var_doc.value
+            if not isinstance(val_doc, ValueDoc): continue
+            docs.add(val_doc)
+            if (isinstance(val_doc, RoutineDoc) and
+                val_doc.posarg_defaults not in (None, UNKNOWN)):
+                docs.update([d for d in val_doc.posarg_defaults
+                             if isinstance(d, ValueDoc)])
+            elif isinstance(val_doc, PropertyDoc):
+                docs.update([d for d in (val_doc.fget, val_doc.fset,
+                                         val_doc.fdel)
+                             if isinstance(d, ValueDoc)])
+        return docs
+
     def _write(self, write_func, directory, filename, *args):
         # Display our progress.
         self._files_written += 1
         log.progress(self._files_written/self._num_files, filename)
+        log.count('pages')
         
         path = os.path.join(directory, filename)
         f = codecs.open(path, 'w', 'ascii', errors='xmlcharrefreplace')
@@ -1006,7 +1109,8 @@ class HTMLWriter:
 
         
         out('<ul class="nomargin-top">\n')
-        for doc in sorted(class_set, key=lambda c:c.canonical_name[-1]):
+        for doc in sorted(class_set, key=lambda c:(c.canonical_name[-1],
+                                                   c.canonical_name)):
             # If doc is a subclass of anything that's documented, then
             # we don't need to list it separately; it will be listed
             # under that base.
@@ -2827,7 +2931,7 @@ class HTMLWriter:
         >>> # endif
         >>> if doc.subclasses:
             <ul>
-        >>>   for subclass in sorted(set(doc.subclasses), key=lambda c:c.canonical_name[-1]):
+        >>>   for subclass in sorted(set(doc.subclasses), key=lambda c:(c.canonical_name[-1], c.canonical_name)):
         >>>     if subclass in class_set:
         >>>       self.write_class_tree_item(out, subclass, class_set)
         >>>     #endif
@@ -17,6 +17,7 @@ from html import escape
 import re, codecs
 from epydoc import log
 from epydoc.util import py_src_filename
+from epydoc.sourcecache import get_source
 from epydoc.apidoc import *
 import tokenize, token, keyword
 from io import StringIO
@@ -302,10 +303,6 @@ class PythonSourceColorizer:
     #: definition block.
     END_DEF_BLOCK = '</div>'
 
-    #: A regular expression used to pick out the unicode encoding for
-    #: the source file.
-    UNICODE_CODING_RE = re.compile(b'.*?\n?.*?coding[:=]\s*([-\w.]+)')
-
     #: A configuration constant, used to determine whether or not to add
     #: collapsable <div> elements for definition blocks.
     ADD_DEF_BLOCKS = True
@@ -456,16 +453,13 @@ class PythonSourceColorizer:
         # for each variable.
         self.doclink_targets_cache = {}
 
-        # Load the module's text.
-        with open(self.module_filename, 'rb') as f:
-            self.text = f.read()
-        # Check for a unicode encoding declaration.
-        m = self.UNICODE_CODING_RE.match(self.text)
-        if m:
-            coding = m.group(1).decode()
-        else:
-            coding = 'iso-8859-1'
-        self.text = self.text.decode(coding)
+        # Load the module's text (which is shared with the parser).  If
+        # it can't be decoded, then treat it as latin-1.
+        try:
+            self.text = get_source(self.module_filename).text
+        except UnicodeDecodeError:
+            with open(self.module_filename, 'rb') as f:
+                self.text = f.read().decode('iso-8859-1')
 
         self.text = self.text.expandtabs(self.tab_width).rstrip()+'\n'
 
@@ -170,6 +170,7 @@ class LatexWriter:
         # Display our progress.
         self._files_written += 1
         log.progress(self._files_written/self._num_files, filename)
+        log.count('pages')
         
         path = os.path.join(directory, filename)
         if self._encoding == 'utf-8':
@@ -119,12 +119,42 @@ class Logger:
             that contributed towards that progress.
         """
 
+    #////////////////////////////////////////////////////////////
+    # Counters
+    #////////////////////////////////////////////////////////////
+
+    def count(self, name, n=1):
+        """
+        Record that C{n} more items of the kind C{name} (e.g.,
+        C{'docstrings'} or C{'pages'}) have been processed by the
+        current task.
+        """
+
 class SimpleLogger(Logger):
     def __init__(self, threshold=WARNING):
         self.threshold = threshold
     def log(self, level, message):
         if level >= self.threshold: print(message)
         
+class MessageRecorder(Logger):
+    """
+    A logger that records messages and message blocks, so that they
+    can be reported later using L{replay()}.  Progress updates are
+    not recorded.  This is used to collect the messages generated in
+    worker processes, and to report them in the main process.
+
+    @ivar records: A list of C{(method, arg...)} tuples, one for each
+        call to L{log()}, L{start_block()}, or L{end_block()}.
+    """
+    def __init__(self):
+        self.records = []
+    def log(self, level, message):
+        self.records.append(('log', level, message))
+    def start_block(self, header):
+        self.records.append(('start_block', header))
+    def end_block(self):
+        self.records.append(('end_block',))
+
 ######################################################################
 # Logger Registry
 ######################################################################
@@ -146,6 +176,37 @@ def remove_logger(logger, close_logger=True):
     if close_logger: logger.close()
     _loggers.remove(logger)
 
+_saved_loggers = []
+"""A stack of the logger lists that were replaced by
+L{start_recording}."""
+
+def start_recording(recorder):
+    """
+    Temporarily send all messages and progress updates to the given
+    logger (typically a L{MessageRecorder}), instead of the registered
+    loggers.  Each call
+    to C{start_recording} must be balanced by a call to
+    L{end_recording}.
+    """
+    _saved_loggers.append(_loggers[:])
+    _loggers[:] = [recorder]
+
+def end_recording():
+    """
+    Restore the loggers that were registered when the corresponding
+    call to L{start_recording} was made.
+    """
+    _loggers[:] = _saved_loggers.pop()
+
+def replay(records):
+    """
+    Report the messages and message blocks that were recorded by a
+    L{MessageRecorder} to each registered logger.
+    """
+    for record in records:
+        for logger in _loggers:
+            getattr(logger, record[0])(*record[1:])
+
 ######################################################################
 # Logging Functions
 ######################################################################
@@ -202,5 +263,9 @@ def progress(percent, message=''):
     for logger in _loggers: logger.progress(percent, '%s' % message)
 progress.__doc__ = Logger.progress.__doc__
 
+def count(name, n=1):
+    for logger in _loggers: logger.count(name, n)
+count.__doc__ = Logger.count.__doc__
+
 def close():
     for logger in _loggers: logger.close()
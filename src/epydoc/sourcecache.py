@@ -0,0 +1,328 @@
+# epydoc -- Source file cache
+#
+# Copyright (C) 2005 Edward Loper
+# Author: Edward Loper <edloper@loper.org>
+# URL: <http://epydoc.sf.net>
+#
+# $Id$
+
+"""
+A cache of the Python source files that are read by epydoc.
+
+The source code of a module is used by several parts of epydoc: the
+parser (L{epydoc.docparser}) tokenizes it; the introspecter
+(L{epydoc.docintrospecter}) reads it to find the line numbers of
+docstrings; and the HTML writer colorizes it for the source code pages
+(L{epydoc.docwriter.html_colorize}).  Rather than reading and
+decoding the file each time, they all call L{get_source()}, which
+returns a L{SourceFile} that holds the file's decoded text.  Very
+large files (such as generated modules) are memory-mapped instead,
+and only the lines that are used are decoded (see L{MMAP_THRESHOLD}
+and L{SourceFile.lines}).
+
+The cache holds at most L{MAX_CACHE_SIZE} bytes of source files;
+when it grows larger than that, the least recently used files are
+discarded (and will be read again if they are needed).  A file is
+also read again if it has been modified since it was cached.  The
+number of bytes that are read is kept in L{bytes_read}, and reported
+with L{log.count()} as C{'source_bytes_read'}.
+"""
+__docformat__ = 'epytext en'
+
+######################################################################
+## Imports
+######################################################################
+
+import os, re, io, codecs, hashlib, linecache, mmap, array
+import collections, collections.abc
+from epydoc import log
+
+######################################################################
+## Configuration
+######################################################################
+
+MAX_CACHE_SIZE = 32*1024*1024
+"""The maximum total size, in bytes, of the source files that are
+kept in the cache.  Files that are larger than this are never
+cached."""
+
+DEFAULT_ENCODING = 'utf-8'
+"""The encoding that is used to decode source files that do not
+declare their encoding."""
+
+MMAP_THRESHOLD = 1024*1024
+"""The size, in bytes, at which source files are memory-mapped rather
+than read.  (Files whose encoding does not encode line endings as
+ASCII, such as utf-16, are always read.)"""
+
+_DECODE_CHUNK_SIZE = 1024*1024
+"""The number of bytes of a memory-mapped file that are decoded at a
+time, when checking that it can be decoded."""
+
+_CODING_RE = re.compile(br'coding[:=]\s*([-\w.]+)')
+"""A regular expression used to find an encoding declaration in the
+first two lines of a source file (see
+U{PEP 263<http://www.python.org/peps/pep-0263.html>})."""
+
+######################################################################
+## Source Files
+######################################################################
+
+class SourceFile:
+    """
+    The contents of a Python source file, as read by L{get_source()}.
+
+    Files that are at least L{MMAP_THRESHOLD} bytes long are
+    memory-mapped rather than read; and their lines are only decoded
+    when they are used (see L{lines}).
+
+    @ivar filename: The name of the file.
+    @ivar size: The size of the file, in bytes.
+    @ivar mtime: The modification time of the file when it was read.
+    @ivar digest: The SHA-1 digest of the file's contents, as a
+        hexadecimal string.
+    @ivar declared_encoding: The encoding that the file declares
+        (following PEP 263); or L{DEFAULT_ENCODING} if it does not
+        declare one.
+    @ivar encoding: The encoding that was used to decode the file.
+        This is L{DEFAULT_ENCODING} if the declared encoding is not
+        known.
+    @ivar decode_error: The C{UnicodeDecodeError} that was raised
+        when decoding the file, or C{None} if it was decoded.
+    @ivar mapped: True if the file is memory-mapped.
+    """
+    def __init__(self, filename, data, stat):
+        """
+        @param data: The contents of the file, as a C{bytes} object or
+            a read-only C{mmap}.
+        """
+        self.filename = filename
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.digest = hashlib.sha1(data).hexdigest()
+        self.declared_encoding = self.encoding = _declared_encoding(data)
+        try:
+            codecs.lookup(self.encoding)
+        except LookupError:
+            self.encoding = DEFAULT_ENCODING
+        self.decode_error = None
+        self.mapped = isinstance(data, mmap.mmap)
+        self._data = self._text = None
+        try:
+            if self.mapped:
+                _check_decoding(data, self.encoding)
+                self._data = data
+            else:
+                self._text = data.decode(self.encoding)
+        except UnicodeDecodeError as e:
+            self.decode_error = e
+        self._line_offsets = None
+
+    def __repr__(self):
+        return '<SourceFile %s>' % self.filename
+
+    @property
+    def text(self):
+        """The decoded contents of the file.  Newlines are not
+        translated, and a byte order mark is not removed.  If the file
+        could not be decoded, then L{decode_error} is raised.  (For
+        memory-mapped files, the text is decoded each time it is
+        used, and is not kept.)"""
+        if self.decode_error is not None:
+            raise self.decode_error
+        if self.mapped:
+            return str(self._data, self.encoding)
+        return self._text
+
+    @property
+    def lines(self):
+        """A read-only sequence of the lines in the file, including
+        their line endings (C{'\\n'}, C{'\\r\\n'} or C{'\\r'}).  Each
+        line is decoded when it is used.  If the file could not be
+        decoded, then L{decode_error} is raised."""
+        if self.decode_error is not None:
+            raise self.decode_error
+        if self._line_offsets is None:
+            if self.mapped:
+                newlines = re.finditer(br'\r\n?|\n', self._data)
+                size = len(self._data)
+            else:
+                newlines = re.finditer('\r\n?|\n', self._text)
+                size = len(self._text)
+            offsets = array.array('Q', [0])
+            offsets.extend(m.end() for m in newlines)
+            if offsets[-1] != size:
+                offsets.append(size)
+            self._line_offsets = offsets
+        return SourceLines(self)
+
+    def readlines(self):
+        """
+        Return a list of the lines in the file, with each line
+        ending translated to C{'\\n'} (as they are read by the
+        C{linecache} module).
+        """
+        text = self.text
+        if text.startswith('\ufeff'):
+            text = text[1:]
+        return io.StringIO(text, newline=None).readlines()
+
+class SourceLines(collections.abc.Sequence):
+    """
+    The lines of a L{SourceFile}, which are decoded when they are
+    used.  Indices start at 0, as they do for a list of lines.  The
+    lines are found using an index of their offsets in the file, so
+    getting a line does not depend on the lines before it.
+    """
+    def __init__(self, source):
+        self.source = source
+        self._offsets = source._line_offsets
+        self._len = len(self._offsets) - 1
+        if source.mapped:
+            self._data, self._encoding = source._data, source.encoding
+        else:
+            self._data, self._encoding = source._text, None
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('line index out of range')
+        line = self._data[self._offsets[index]:self._offsets[index+1]]
+        if self._encoding is None:
+            return line
+        return str(line, self._encoding)
+
+    def __repr__(self):
+        return '<SourceLines %s>' % self.source.filename
+
+def _check_decoding(data, encoding):
+    """
+    Check that the given memory-mapped file can be decoded with the
+    given encoding, without keeping the decoded text.
+
+    @raise UnicodeDecodeError: If it can not be decoded.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        for pos in range(0, len(data), _DECODE_CHUNK_SIZE):
+            decoder.decode(data[pos:pos+_DECODE_CHUNK_SIZE])
+        decoder.decode(b'', True)
+    except UnicodeDecodeError:
+        # Decode the whole file, to report the error's position in it.
+        str(data, encoding)
+        raise
+
+def _can_map(encoding):
+    """
+    Return true if files with the given encoding can be memory-mapped:
+    i.e., if their line endings are encoded as ASCII, so that the lines
+    can be found (and decoded separately) without decoding the file.
+    """
+    try:
+        return '\r\n'.encode(encoding) == b'\r\n'
+    except (LookupError, UnicodeError):
+        return False
+
+def _declared_encoding(data):
+    """
+    Return the encoding declared in the first two lines of the given
+    source file contents (a C{bytes} object or an C{mmap}); or
+    L{DEFAULT_ENCODING} if none is declared.
+    """
+    if data[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+        return 'utf-8'
+    end = data.find(b'\n', data.find(b'\n')+1)
+    for line in data[:end if end >= 0 else len(data)].split(b'\n'):
+        m = _CODING_RE.search(line)
+        if m:
+            return m.group(1).decode()
+    return DEFAULT_ENCODING
+
+######################################################################
+## Cache
+######################################################################
+
+_cache = collections.OrderedDict()
+"""The cached L{SourceFile}s, keyed by absolute filename, from least
+to most recently used."""
+
+_cache_size = 0
+"""The total size of the files in L{_cache}."""
+
+bytes_read = 0
+"""The number of bytes that have been read from source files."""
+
+def get_source(filename):
+    """
+    Return a L{SourceFile} with the contents of the given source file;
+    reading it, unless an up-to-date copy is in the cache.
+
+    @raise IOError: If the file can not be read.
+    @rtype: L{SourceFile}
+    """
+    global bytes_read
+    key = os.path.abspath(filename)
+    stat = os.stat(filename)
+    source = _cache.get(key)
+    if source is not None:
+        if source.size == stat.st_size and source.mtime == stat.st_mtime:
+            _cache.move_to_end(key)
+            return source
+        _discard(key)
+
+    with open(filename, 'rb') as f:
+        data = None
+        if stat.st_size and stat.st_size >= MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if not _can_map(_declared_encoding(data)):
+                data.close()
+                data = None
+        if data is None:
+            data = f.read()
+    bytes_read += len(data)
+    log.count('source_bytes_read', len(data))
+    source = SourceFile(filename, data, stat)
+    if source.size <= MAX_CACHE_SIZE:
+        _add(key, source)
+    return source
+
+def _add(key, source):
+    global _cache_size
+    _cache[key] = source
+    _cache_size += source.size
+    while _cache_size > MAX_CACHE_SIZE:
+        _discard(next(iter(_cache)))
+
+def _discard(key):
+    global _cache_size
+    _cache_size -= _cache.pop(key).size
+
+def clear_cache():
+    """
+    Discard all of the files in the cache.
+    """
+    global _cache_size
+    _cache.clear()
+    _cache_size = 0
+
+def update_linecache(filename):
+    """
+    Add the lines of the given source file to the cache of the
+    C{linecache} module (which is used by C{inspect} to find source
+    code), unless it already has them.  Do nothing if the file can not
+    be read or decoded.
+    """
+    if not filename or filename in linecache.cache:
+        return
+    try:
+        source = get_source(filename)
+        lines = source.readlines()
+    except (IOError, UnicodeDecodeError):
+        return
+    linecache.cache[filename] = (source.size, source.mtime, lines, filename)
@@ -0,0 +1,490 @@
+#
+# epydoc -- Performance benchmarks
+# Edward Loper
+#
+# $Id$
+#
+
+"""
+Performance benchmarks for epydoc.  This module generates a synthetic
+python package, whose size and shape are controlled by a few
+parameters (see L{generate_project()}); documents it; and records the
+time spent on each stage of the documentation build (see
+L{run_benchmark()}).  The results are stored as JSON, so that the
+results of different versions of epydoc can be compared (see
+L{compare_results()}).  The benchmarks run offline, and never use
+Graphviz.
+
+To run the benchmarks from the command line, use::
+
+    python -m epydoc.test.benchmark --output results.json
+    python -m epydoc.test.benchmark --compare results.json
+
+@var STAGES: The names of the stages that are timed, in order:
+    C{'parse'} and C{'introspect'} are the times spent building the
+    documentation for the package's modules using only parsing or
+    only introspection; C{'build'} is the time spent doing both; the
+    next stages are the remaining stages of L{build_doc_index()}; and
+    the last stages are the output writers.
+"""
+__docformat__ = 'epytext en'
+
+import os, os.path, sys, json, shutil, tempfile, textwrap, platform
+import optparse
+import epydoc
+from epydoc import log, docparser, docintrospecter, docstringparser
+from epydoc.docbuilder import build_doc_index
+
+######################################################################
+#{ Synthetic Projects
+######################################################################
+
+DEFAULT_PARAMETERS = dict(modules=20, classes=5, methods=5,
+                          docformat='epytext', inheritance_depth=2,
+                          import_fanin=3, reexport_depth=0,
+                          package='epydoc_benchmark')
+"""The default parameters for L{generate_project()}."""
+
+DOCFORMATS = ('epytext', 'restructuredtext', 'javadoc', 'plaintext')
+"""The docstring markup languages that can be used by the synthetic
+projects."""
+
+_DOCSTRINGS = {
+    'epytext': dict(
+        module='Synthetic module C{%(name)s}.\n\n'
+               'This module is used to I{benchmark} epydoc.\n\n'
+               '@author: Epydoc\n@see: L{%(name)s.Class0}',
+        cls='A synthetic class, which is B{not} useful.\n\n'
+            '@ivar value: The value passed to the L{constructor '
+            '<__init__>}.\n@type value: C{int}',
+        method='Compute a value from C{a} and I{b}.\n\n'
+               '  - The first item of a list.\n'
+               '  - The second item of a list.\n\n'
+               '@param a: The first B{argument}.\n@type a: C{int}\n'
+               '@param b: The second argument.\n@type b: C{list}\n'
+               '@return: The L{value} of this object.\n@rtype: C{int}'),
+    'restructuredtext': dict(
+        module='Synthetic module ``%(name)s``.\n\n'
+               'This module is used to *benchmark* epydoc.\n\n'
+               ':author: Epydoc\n:see: `%(name)s.Class0`',
+        cls='A synthetic class, which is **not** useful.\n\n'
+            ':ivar value: The value passed to the `constructor '
+            '<__init__>`.\n:type value: ``int``',
+        method='Compute a value from ``a`` and *b*.\n\n'
+               '- The first item of a list.\n'
+               '- The second item of a list.\n\n'
+               ':param a: The first **argument**.\n:type a: ``int``\n'
+               ':param b: The second argument.\n:type b: ``list``\n'
+               ':return: The `value` of this object.\n:rtype: ``int``'),
+    'javadoc': dict(
+        module='Synthetic module <code>%(name)s</code>.\n\n'
+               'This module is used to <i>benchmark</i> epydoc.\n\n'
+               '@author Epydoc\n@see %(name)s.Class0',
+        cls='A synthetic class, which is <b>not</b> useful.',
+        method='Compute a value from <code>a</code> and <i>b</i>.\n'
+               '@param a The first <b>argument</b>.\n'
+               '@param b The second argument.\n'
+               '@return The {@link value} of this object.'),
+    'plaintext': dict(
+        module='Synthetic module %(name)s.\n\n'
+               'This module is used to benchmark epydoc.',
+        cls='A synthetic class, which is not useful.',
+        method='Compute a value from a and b.\n\n'
+               'The result is the value of this object.'),
+    }
+
+def generate_project(directory, modules=20, classes=5, methods=5,
+                     docformat='epytext', inheritance_depth=2,
+                     import_fanin=3, reexport_depth=0,
+                     package='epydoc_benchmark'):
+    """
+    Write a synthetic python package to C{directory}, and return the
+    name of the package's directory.
+
+    @param modules: The number of modules in the package.
+    @param classes: The number of classes in each module.
+    @param methods: The number of methods in each class (not
+        counting the constructor).
+    @param docformat: The markup language used by the docstrings;
+        one of L{DOCFORMATS}.
+    @param inheritance_depth: The length of each chain of classes
+        that are derived from each other.  The first class of each
+        chain is derived from a class in another module (if
+        C{import_fanin>0}), or from C{object}.
+    @param import_fanin: The number of modules that each module
+        imports names from.
+    @param reexport_depth: The number of nested subpackages (named
+        C{api1}, C{api2}, etc.) that re-export the package's contents.  The innermost
+        subpackage imports the modules and everything they define;
+        and each other subpackage imports everything from the
+        subpackage it contains.  This gives each object one name for
+        each subpackage.
+    @param package: The name of the package.
+    """
+    if docformat not in DOCFORMATS:
+        raise ValueError('Unknown docformat %r' % docformat)
+    pkg_dir = os.path.join(directory, package)
+    if not os.path.exists(pkg_dir):
+        os.makedirs(pkg_dir)
+    names = ['module%d' % i for i in range(modules)]
+    _write_source(pkg_dir, '__init__', _package_source(
+        package, names, docformat))
+    for i, name in enumerate(names):
+        imports = names[max(0, i-import_fanin):i]
+        _write_source(pkg_dir, name, _module_source(
+            package, name, imports, classes, methods, docformat,
+            inheritance_depth))
+    layer_dir = pkg_dir
+    for depth in range(1, reexport_depth+1):
+        layer_dir = os.path.join(layer_dir, 'api%d' % depth)
+        if not os.path.exists(layer_dir):
+            os.makedirs(layer_dir)
+        _write_source(layer_dir, '__init__', _reexport_source(
+            package, names, docformat, depth, reexport_depth))
+    return pkg_dir
+
+def _write_source(pkg_dir, name, source):
+    out = open(os.path.join(pkg_dir, name+'.py'), 'w')
+    try:
+        out.write(source)
+    finally:
+        out.close()
+
+def _docstring(docformat, kind, indent, **names):
+    """
+    Return a docstring literal of the given kind (C{'module'},
+    C{'cls'}, or C{'method'}), indented by C{indent} spaces.
+    """
+    s = _DOCSTRINGS[docformat][kind] % names
+    return textwrap.indent('"""\n%s\n"""\n' % s, ' '*indent)
+
+def _package_source(package, names, docformat):
+    lines = [_docstring(docformat, 'module', 0, name=package),
+             '__docformat__ = %r\n' % docformat,
+             '__all__ = %r\n' % names]
+    for name in names:
+        lines.append('from %s import %s\n' % (package, name))
+    return ''.join(lines)
+
+def _reexport_source(package, names, docformat, depth, reexport_depth):
+    layer = '.'.join([package] + ['api%d' % d for d in range(1, depth+1)])
+    lines = [_docstring(docformat, 'module', 0, name=layer),
+             '__docformat__ = %r\n' % docformat]
+    if depth == reexport_depth:
+        lines.append('from %s import %s\n' % (package, ', '.join(names)))
+        for name in names:
+            lines.append('from %s.%s import *\n' % (package, name))
+    else:
+        lines.append('from %s.api%d import *\n' % (layer, depth+1))
+    return ''.join(lines)
+
+def _module_source(package, name, imports, classes, methods, docformat,
+                   inheritance_depth):
+    lines = [_docstring(docformat, 'module', 0, name=name),
+             '__docformat__ = %r\n' % docformat,
+             'import os, sys\n']
+    for other in imports:
+        lines.append('from %s.%s import Class0 as %s_Class0\n' %
+                     (package, other, other))
+    lines.append('\n#: The number of instances created by this module.\n'
+                 'COUNT = 0\n\n'
+                 'TABLE = {%r: (1, 2.5, None), %r: [os.sep, sys.version]}\n'
+                 '"""A table of values."""\n\n' % (name, 'other'))
+    lines.append('def function(a, b=None, *args, **kwargs):\n')
+    lines.append(_docstring(docformat, 'method', 4))
+    lines.append('    return [x for x in args if x != a]\n\n')
+    for k in range(classes):
+        if k % (inheritance_depth+1):
+            base = 'Class%d' % (k-1)
+        elif imports:
+            base = '%s_Class0' % imports[k % len(imports)]
+        else:
+            base = 'object'
+        lines.append('class Class%d(%s):\n' % (k, base))
+        lines.append(_docstring(docformat, 'cls', 4))
+        lines.append('    #: The default value.\n'
+                     '    default = %d\n\n' % k)
+        lines.append('    def __init__(self, value=None):\n'
+                     '        global COUNT\n'
+                     '        COUNT += 1\n'
+                     '        self.value = value or self.default\n\n')
+        for m in range(methods):
+            lines.append('    def method%d(self, a, b=(1, 2)):\n' % m)
+            lines.append(_docstring(docformat, 'method', 8))
+            lines.append('        result = self.value\n'
+                         '        for item in b:\n'
+                         '            if item > a:\n'
+                         '                result += item * %d\n'
+                         '            else:\n'
+                         '                result -= a\n'
+                         '        return result\n\n' % m)
+    return ''.join(lines)
+
+######################################################################
+#{ Running Benchmarks
+######################################################################
+
+STAGES = ['parse', 'introspect', 'build', 'merge', 'link', 'index',
+          'overrides', 'docstrings', 'inherit', 'group',
+          'html', 'latex', 'text']
+
+WRITERS = ('html', 'latex', 'text')
+"""The output writers that can be timed."""
+
+_STAGE_NAMES = {
+    'Building documentation': 'build',
+    'Merging parsed & introspected information': 'merge',
+    'Linking imported variables': 'link',
+    'Indexing documentation': 'index',
+    'Checking for overridden methods': 'overrides',
+    'Parsing docstrings': 'docstrings',
+    'Inheriting documentation': 'inherit',
+    'Sorting & Grouping': 'group',
+    'Writing HTML docs': 'html',
+    'Writing LaTeX docs': 'latex',
+    'Writing text docs': 'text',
+    }
+"""Maps the task names reported by L{build_doc_index()} (and by
+L{_write_docs()}) to the names of the stages in L{STAGES}."""
+
+FORMAT_VERSION = 1
+"""The version of the JSON format used to store benchmark results.
+It should be incremented whenever the meaning of the results
+changes, so that incomparable results are not compared."""
+
+def run_benchmark(directory=None, repeat=3, writers=WRITERS,
+                  **parameters):
+    """
+    Generate a synthetic project, document it C{repeat} times, and
+    return a dictionary describing how long each stage took.  The
+    time reported for each stage is the shortest time taken by any
+    repetition.
+
+    @param directory: The directory where the project is written.
+        If not specified, then a temporary directory is used, and
+        deleted afterwards.
+    @param writers: The output writers that should be timed.
+    @param parameters: Parameters for L{generate_project()}.
+    """
+    params = dict(DEFAULT_PARAMETERS)
+    params.update(parameters)
+    tmp_dir = None
+    if directory is None:
+        directory = tmp_dir = tempfile.mkdtemp()
+    try:
+        pkg_dir = generate_project(directory, **params)
+        stages = {}
+        for i in range(repeat):
+            for name, stage in _run_once(pkg_dir, params['package'],
+                                         writers).items():
+                if name not in stages:
+                    stages[name] = stage
+                else:
+                    for key in ('wall_time', 'cpu_time'):
+                        stages[name][key] = min(stages[name][key],
+                                                stage[key])
+                    stages[name]['peak_rss'] = stage['peak_rss']
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return dict(format='epydoc-benchmark', format_version=FORMAT_VERSION,
+                epydoc_version=epydoc.__version__,
+                python_version=platform.python_version(),
+                platform=platform.platform(), repeat=repeat,
+                parameters=params, stages=stages)
+
+def _run_once(pkg_dir, package, writers):
+    """
+    Document the package in C{pkg_dir} once, and return a dictionary
+    mapping each stage's name to its statistics (as recorded by a
+    L{StatsLogger<epydoc.cli.StatsLogger>}).
+    """
+    stages = {}
+    # Time the parser and the introspecter separately.
+    for stage, kwargs in [('parse', dict(introspect=False)),
+                          ('introspect', dict(parse=False))]:
+        stats = _build(pkg_dir, package, kwargs)[1]
+        stages[stage] = stats['Building documentation']
+    # Time the remaining stages and the writers.
+    docindex, stats = _build(pkg_dir, package, {}, writers)
+    for name, stage in stats.items():
+        stages[_STAGE_NAMES[name]] = stage
+    return stages
+
+def _build(pkg_dir, package, kwargs, writers=()):
+    """
+    Build the documentation for the package in C{pkg_dir}, starting
+    from a clean state; and write it using the given writers.
+    Return a tuple C{(docindex, stats)}, where C{stats} maps the name
+    of each task that reported its progress to its statistics.
+    """
+    from epydoc.cli import StatsLogger
+    docparser._moduledoc_cache.clear()
+    docintrospecter.clear_cache()
+    docstringparser.PARSED_DOCSTRING_CACHE = None
+    for name in list(sys.modules):
+        if name == package or name.startswith(package+'.'):
+            del sys.modules[name]
+    logger = StatsLogger(None)
+    log.start_recording(logger)
+    try:
+        docindex = build_doc_index([pkg_dir], **kwargs)
+        if docindex is None:
+            raise ValueError('Unable to document %s' % pkg_dir)
+        for writer in writers:
+            _write_docs(docindex, writer)
+    finally:
+        log.end_recording()
+    return docindex, dict([(stage.pop('name'), stage)
+                           for stage in logger.stages])
+
+def _write_docs(docindex, writer):
+    """
+    Write the documentation in C{docindex} to a temporary directory,
+    using the given writer (one of L{WRITERS}).  No graphs are
+    generated.
+    """
+    out_dir = tempfile.mkdtemp()
+    try:
+        if writer == 'html':
+            from epydoc.docwriter.html import HTMLWriter
+            log.start_progress('Writing HTML docs')
+            HTMLWriter(docindex, include_timestamp=False).write(out_dir)
+        elif writer == 'latex':
+            from epydoc.docwriter.latex import LatexWriter
+            log.start_progress('Writing LaTeX docs')
+            LatexWriter(docindex).write(out_dir)
+        elif writer == 'text':
+            from epydoc.docwriter.plaintext import PlaintextWriter
+            log.start_progress('Writing text docs')
+            plaintext_writer = PlaintextWriter()
+            for api_doc in docindex.root:
+                plaintext_writer.write(api_doc)
+                log.count('pages')
+        else:
+            raise ValueError('Unknown writer %r' % writer)
+        log.end_progress()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+######################################################################
+#{ Comparing Results
+######################################################################
+
+def compare_results(baseline, results, tolerance=1.25,
+                    min_difference=0.05):
+    """
+    Compare two sets of benchmark results, and return a tuple
+    C{(report, slower)}, where C{report} is a list of lines
+    comparing the wall time of each stage, and C{slower} is a list
+    of the stages that took more than C{tolerance} times as long in
+    C{results} as in C{baseline}.  Stages whose times differ by less
+    than C{min_difference} seconds are never considered slower, since
+    such short times are dominated by noise.
+
+    @raise ValueError: If the results can not be compared, because
+        they use different formats, or different parameters.
+    """
+    for key in ('format', 'format_version', 'parameters'):
+        if baseline.get(key) != results.get(key):
+            raise ValueError('The results can not be compared: their '
+                             '%s differ' % key.replace('_', ' '))
+    report = ['%-12s %10s %10s %8s' % ('Stage', 'Baseline', 'Current',
+                                       'Ratio')]
+    slower = []
+    for stage in STAGES:
+        if stage not in baseline['stages'] or stage not in results['stages']:
+            continue
+        old = baseline['stages'][stage]['wall_time']
+        new = results['stages'][stage]['wall_time']
+        ratio = new / max(old, 1e-6)
+        is_slower = ratio > tolerance and new-old >= min_difference
+        if is_slower:
+            slower.append(stage)
+        report.append('%-12s %9.3fs %9.3fs %7.2fx%s' %
+                      (stage, old, new, ratio, is_slower and '  SLOWER' or ''))
+    return report, slower
+
+def format_results(results):
+    """
+    Return a list of lines summarizing the given benchmark results.
+    """
+    lines = ['%-12s %10s %10s  %s' % ('Stage', 'Wall', 'CPU', 'Counts')]
+    for stage in STAGES:
+        if stage not in results['stages']: continue
+        stats = results['stages'][stage]
+        counts = ', '.join(['%s=%s' % item for item in
+                            sorted(stats['counts'].items())])
+        lines.append('%-12s %9.3fs %9.3fs  %s' %
+                     (stage, stats['wall_time'], stats['cpu_time'], counts))
+    return lines
+
+######################################################################
+#{ Command Line Interface
+######################################################################
+
+def main(argv=None):
+    optparser = optparse.OptionParser(
+        usage='%prog [options]',
+        description='Benchmark epydoc on a synthetic python package.')
+    for name in ('modules', 'classes', 'methods', 'inheritance_depth',
+                 'import_fanin', 'reexport_depth'):
+        optparser.add_option('--'+name.replace('_', '-'), type='int',
+            dest=name, metavar='N', default=DEFAULT_PARAMETERS[name],
+            help='Synthetic project parameter (default: %default).')
+    optparser.add_option('--docformat', choices=DOCFORMATS,
+        default=DEFAULT_PARAMETERS['docformat'],
+        help=('The docstring markup language: %s (default: %%default).'
+              % ', '.join(DOCFORMATS)))
+    optparser.add_option('--repeat', type='int', default=3, metavar='N',
+        help='The number of times to document the project; the fastest '
+        'time for each stage is reported (default: %default).')
+    optparser.add_option('--writers', default=','.join(WRITERS),
+        help='A comma-separated list of the output writers to time '
+        '(default: %default).')
+    optparser.add_option('--directory', metavar='DIR',
+        help='Write the synthetic project to DIR, and keep it.')
+    optparser.add_option('--output', '-o', metavar='FILE',
+        help='Write the results to FILE, in JSON format.')
+    optparser.add_option('--compare', metavar='FILE',
+        help='Compare the results with the results in FILE, and exit '
+        'with status 1 if any stage is slower than the tolerance.')
+    optparser.add_option('--tolerance', type='float', default=1.25,
+        help='The largest acceptable ratio between the current time and '
+        'the baseline time for each stage (default: %default).')
+    options, args = optparser.parse_args(argv)
+    if args:
+        optparser.error('Unexpected arguments: %s' % ' '.join(args))
+    writers = [w for w in options.writers.split(',') if w]
+    for writer in writers:
+        if writer not in WRITERS:
+            optparser.error('Unknown writer %r' % writer)
+
+    params = dict([(name, getattr(options, name))
+                   for name in DEFAULT_PARAMETERS if name != 'package'])
+    results = run_benchmark(options.directory, options.repeat, writers,
+                            **params)
+    print('\n'.join(format_results(results)))
+    if options.output:
+        out = open(options.output, 'w')
+        try:
+            json.dump(results, out, indent=2, sort_keys=True)
+            out.write('\n')
+        finally:
+            out.close()
+    if options.compare:
+        baseline = json.load(open(options.compare))
+        try:
+            report, slower = compare_results(baseline, results,
+                                             options.tolerance)
+        except ValueError as e:
+            print('Error: %s' % e, file=sys.stderr)
+            return 2
+        print()
+        print('\n'.join(report))
+        if slower:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,10 +13,11 @@ Miscellaneous utility functions that are used by multiple modules.
     py_src_filename
 @group Text processing: wordwrap, decode_with_backslashreplace,
     plaintext_to_html
+@group Unpickling: find_epydoc_class
 """
 __docformat__ = 'epytext en'
 
-import os, os.path, re, sys
+import os, os.path, re, sys, importlib
 
 ######################################################################
 ## Python Source Types
@@ -89,6 +90,32 @@ def munge_script_name(filename):
     name = re.sub(r'\W', '_', name)
     return 'script-'+name
 
+######################################################################
+## Unpickling
+######################################################################
+
+def find_epydoc_class(module_name, name):
+    """
+    Return the class named C{name} that is defined by the epydoc module
+    named C{module_name}.  This is used by unpicklers that may only
+    load epydoc's own classes.  Dotted names are refused, since they
+    could reach any value through the attributes of an epydoc module
+    (such as the modules that it imports); and so is any value that is
+    not a class whose own module and name are the ones requested.
+
+    @raise ValueError: If there is no such class.
+    """
+    if module_name.split('.')[0] != 'epydoc' or '.' in name:
+        raise ValueError('Unexpected class %s.%s' % (module_name, name))
+    try:
+        value = getattr(importlib.import_module(module_name), name)
+    except (ImportError, AttributeError):
+        raise ValueError('Class %s.%s not found' % (module_name, name))
+    if (not isinstance(value, type) or value.__module__ != module_name or
+        value.__qualname__ != name):
+        raise ValueError('Unexpected class %s.%s' % (module_name, name))
+    return value
+
 ######################################################################
 ## Text Processing
 ######################################################################